@@ -34,7 +34,11 @@ def create_app(config_name=None):
     # Initialize extensions with app
     db.init_app(app)
     bcrypt.init_app(app)
-    sess.init_app(app)
+    if app.config.get('SESSION_TYPE') == 'sqlite':
+        from utils.sqlite_session import init_sqlite_session
+        init_sqlite_session(app)
+    else:
+        sess.init_app(app)
     
     # Enable CORS for all domains on all routes
     CORS(app, supports_credentials=True)
@@ -157,7 +161,19 @@ def create_app(config_name=None):
                 return jsonify({'status': 'healthy', 'message': 'Database connection OK'})
             except Exception as e:
                 return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
-    
+
+    # Session store metrics endpoint
+    @app.route('/health/sessions')
+    def session_health():
+        """Session count and size for the SQLite session store"""
+        get_metrics = getattr(app.session_interface, 'get_metrics', None)
+        if get_metrics is None:
+            return jsonify({'status': 'unavailable', 'session_type': app.config.get('SESSION_TYPE')})
+        try:
+            return jsonify({'status': 'healthy', **get_metrics()})
+        except Exception as e:
+            return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+
     # Root endpoint handled by templates blueprint
     
     # Create database tables
@@ -165,6 +181,8 @@ def create_app(config_name=None):
         try:
             db.create_all()
             print("Database tables created successfully!")
+            from utils.student_search import ensure_student_search_index
+            app.extensions['student_search_fts'] = ensure_student_search_index(db.engine)
         except Exception as e:
             print(f"Error creating database tables: {str(e)}")
     
@@ -177,6 +195,12 @@ def create_app(config_name=None):
                 print("✅ Automatic database backup scheduler started")
                 print("   - Weekly backup: Every Sunday at 2:00 AM")
                 print("   - Daily backup: Every day at 3:00 AM")
+                from utils.fee_sweeper import init_fee_sweeper
+                init_fee_sweeper(app, backup_scheduler.scheduler)
+                print(f"   - Overdue fee sweep: Every day at {app.config['FEE_SWEEP_HOUR']}:30 AM")
+                from utils.exam_sweeper import init_exam_sweeper
+                init_exam_sweeper(app, backup_scheduler.scheduler)
+                print(f"   - Exam deadline sweep: Every {app.config['EXAM_SWEEP_INTERVAL_SECONDS']} seconds")
         except Exception as e:
             print(f"⚠️  Warning: Backup scheduler not started: {e}")
     
@@ -10,10 +10,44 @@ class Config:
     APP_NAME = 'SmartGardenHub'
     
     # Session configuration
-    SESSION_TYPE = 'filesystem'
+    # 'sqlite' keeps sessions in a WAL-mode SQLite file shared by all workers
+    SESSION_TYPE = os.environ.get('SESSION_TYPE', 'sqlite')
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
-    SESSION_FILE_THRESHOLD = 500
+    SESSION_CLEANUP_N_REQUESTS = 1000  # Purge expired sessions on ~1 in N requests
+    SESSION_SQLITE_CLEANUP_BATCH = 500  # Rows deleted per cleanup transaction
+    
+    # Authentication mode: 'session' loads the user row on every request,
+    # 'claims' trusts signed session claims and checks a short-TTL validity cache
+    AUTH_MODE = os.environ.get('AUTH_MODE', 'session')
+    AUTH_CLAIMS_MAX_AGE = int(os.environ.get('AUTH_CLAIMS_MAX_AGE', 12 * 60 * 60))  # Re-issue claims after 12h
+    USER_VALIDITY_TTL = int(os.environ.get('USER_VALIDITY_TTL', 30))  # Seconds
+    
+    # Login password verification: hashing slots shared by all workers, throttling and negative cache
+    LOGIN_VERIFY_SLOTS = int(os.environ.get('LOGIN_VERIFY_SLOTS', 4))  # Concurrent hash checks across all workers
+    LOGIN_NEGATIVE_CACHE_TTL = 60  # Seconds a failed phone/password pair is rejected without hashing
+    LOGIN_MAX_FAILURES = 5  # Failed attempts per phone per window
+    LOGIN_THROTTLE_WINDOW = 300  # Seconds
+    
+    # Fee summary cache per (batch, month, year); checked against the fees' version on every read,
+    # the TTL only refreshes date-dependent figures (overdue, recent payments)
+    FEE_SUMMARY_CACHE_TTL = int(os.environ.get('FEE_SUMMARY_CACHE_TTL', 300))  # Seconds
+    
+    # Results analytics per (batch, year); slices are checked against the results' version on every read,
+    # the TTL only refreshes renamed students and batches
+    RESULTS_ANALYTICS_CACHE_TTL = int(os.environ.get('RESULTS_ANALYTICS_CACHE_TTL', 3600))  # Seconds
+    
+    # Nightly overdue fee sweep (runs with the backup scheduler)
+    FEE_SWEEP_HOUR = int(os.environ.get('FEE_SWEEP_HOUR', 1))  # Runs at HH:30
+    FEE_OVERDUE_GRACE_DAYS = int(os.environ.get('FEE_OVERDUE_GRACE_DAYS', 0))
+    FEE_LATE_FEE_AMOUNT = float(os.environ.get('FEE_LATE_FEE_AMOUNT', 0))  # Flat BDT per overdue fee
+    FEE_LATE_FEE_PERCENT = float(os.environ.get('FEE_LATE_FEE_PERCENT', 0))  # Percent of the fee amount
+    FEE_REMINDER_SMS_ENABLED = os.environ.get('FEE_REMINDER_SMS_ENABLED', 'false').lower() == 'true'
+    FEE_REMINDER_CHUNK_SIZE = 100
+    
+    # Online exam deadline sweep (runs with the backup scheduler)
+    EXAM_SWEEP_INTERVAL_SECONDS = int(os.environ.get('EXAM_SWEEP_INTERVAL_SECONDS', 60))
+    EXAM_SWEEP_GRACE_MINUTES = int(os.environ.get('EXAM_SWEEP_GRACE_MINUTES', 2))  # Lets the browser's own auto-submit land first
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
@@ -24,6 +58,12 @@ class Config:
     instance_dir = base_dir / 'instance'
     instance_dir.mkdir(exist_ok=True)
     
+    # Pre-serialized exam question payloads shared by all workers
+    EXAM_PAYLOAD_CACHE_DIR = os.environ.get('EXAM_PAYLOAD_CACHE_DIR', str(instance_dir / 'exam_payloads'))
+    
+    # Lock files backing LOGIN_VERIFY_SLOTS
+    LOGIN_VERIFY_SLOT_DIR = os.environ.get('LOGIN_VERIFY_SLOT_DIR', str(instance_dir / 'login_slots'))
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
@@ -39,6 +79,7 @@ class DevelopmentConfig(Config):
     db_path = Config.instance_dir / 'database.db'
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
     DATABASE_PATH = str(db_path)
+    SESSION_SQLITE_PATH = str(Config.instance_dir / 'sessions.db')
     
     # Enable query logging in development
     SQLALCHEMY_ECHO = True
@@ -55,6 +96,7 @@ class ProductionConfig(Config):
     
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
     DATABASE_PATH = str(db_path)
+    SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH', str(db_path.parent / 'sessions.db'))
     
     # Production backup settings
     BACKUP_DIR = os.environ.get('BACKUP_DIR', '/var/www/saroyarsir/backups')
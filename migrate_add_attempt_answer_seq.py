@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Database migration for batched exam autosave and the deadline sweeper
+Adds the answer_seq column to student_exam_attempts (the last client
+autosave sequence applied, used to ignore replayed flushes), the
+(exam_id, student_id, status) index the autosave UPDATE looks attempts up by
+and the (status, start_time) index the deadline sweeper scans.
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+from sqlalchemy import text
+
+ATTEMPT_INDEXES = [
+    ('ix_attempts_exam_student_status', 'exam_id, student_id, status'),  # Autosave lookups
+    ('ix_attempts_status_start', 'status, start_time'),  # Deadline sweep
+]
+
+
+def migrate_add_attempt_answer_seq():
+    """Add answer_seq column and lookup indexes to student_exam_attempts"""
+    try:
+        app = create_app()
+
+        with app.app_context():
+            print("Starting migration: Add answer_seq to student_exam_attempts...")
+
+            inspector = db.inspect(db.engine)
+            existing_columns = [col['name'] for col in inspector.get_columns('student_exam_attempts')]
+
+            if 'answer_seq' in existing_columns:
+                print("✅ answer_seq column already exists.")
+            else:
+                sql = "ALTER TABLE student_exam_attempts ADD COLUMN answer_seq INTEGER NOT NULL DEFAULT 0"
+                print(f"Executing: {sql}")
+                db.session.execute(text(sql))
+
+            existing_indexes = [index['name'] for index in inspector.get_indexes('student_exam_attempts')]
+            for name, columns in ATTEMPT_INDEXES:
+                if name in existing_indexes:
+                    print(f"✅ {name} already exists.")
+                    continue
+                sql = f"CREATE INDEX {name} ON student_exam_attempts ({columns})"
+                print(f"Executing: {sql}")
+                db.session.execute(text(sql))
+
+            db.session.commit()
+            print("✅ Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return False
+
+if __name__ == '__main__':
+    print("🚀 Starting exam autosave migration...")
+    print("=" * 50)
+
+    if not migrate_add_attempt_answer_seq():
+        print("\n❌ Migration failed! Please check the error messages above.")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("✅ Students' answers can now be flushed in batches via /api/exam/<id>/autosave")
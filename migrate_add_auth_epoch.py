@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the auth_epoch column to the users table
+The epoch is embedded in signed session claims (AUTH_MODE=claims) and bumped
+whenever a user is deactivated, archived or changes password.
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+from sqlalchemy import text
+
+
+def migrate_add_auth_epoch():
+    """Add auth_epoch column to users table"""
+    try:
+        app = create_app()
+
+        with app.app_context():
+            print("Starting migration: Add auth_epoch to users...")
+
+            inspector = db.inspect(db.engine)
+            existing_columns = [col['name'] for col in inspector.get_columns('users')]
+
+            if 'auth_epoch' in existing_columns:
+                print("✅ auth_epoch column already exists. Migration not needed.")
+                return True
+
+            sql = "ALTER TABLE users ADD COLUMN auth_epoch INTEGER NOT NULL DEFAULT 0"
+            print(f"Executing: {sql}")
+            db.session.execute(text(sql))
+            db.session.commit()
+
+            print("✅ Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return False
+
+if __name__ == '__main__':
+    print("🚀 Starting users auth_epoch migration...")
+    print("=" * 50)
+
+    if not migrate_add_auth_epoch():
+        print("\n❌ Migration failed! Please check the error messages above.")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("✅ Set AUTH_MODE=claims to authenticate requests from signed session claims")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Database migration for per-attempt exam shuffling
+Adds online_exams.shuffle_questions (teacher opt-in) and
+student_exam_attempts.shuffle_version (the exam version an attempt's
+question/option order is seeded with; NULL keeps the original order).
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+from sqlalchemy import text
+
+NEW_COLUMNS = [
+    ('online_exams', 'shuffle_questions', 'BOOLEAN NOT NULL DEFAULT 0'),
+    ('student_exam_attempts', 'shuffle_version', 'VARCHAR(32)'),
+]
+
+
+def migrate_add_exam_shuffle():
+    """Add shuffle columns to online_exams and student_exam_attempts"""
+    try:
+        app = create_app()
+
+        with app.app_context():
+            print("Starting migration: Add exam shuffle columns...")
+
+            inspector = db.inspect(db.engine)
+            for table, column, definition in NEW_COLUMNS:
+                existing_columns = [col['name'] for col in inspector.get_columns(table)]
+                if column in existing_columns:
+                    print(f"✅ {table}.{column} already exists.")
+                    continue
+                sql = f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                print(f"Executing: {sql}")
+                db.session.execute(text(sql))
+
+            db.session.commit()
+            print("✅ Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return False
+
+if __name__ == '__main__':
+    print("🚀 Starting exam shuffle migration...")
+    print("=" * 50)
+
+    if not migrate_add_exam_shuffle():
+        print("\n❌ Migration failed! Please check the error messages above.")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("✅ Teachers can now create exams with per-student question order")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the fee billing period columns and index
+period_year / period_month are virtual generated columns computed from
+due_date, so existing rows need no backfill: building the composite
+(batch_id, period_year, period_month, user_id) index reads every fee once.
+"""
+
+import os
+import sqlite3
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, Fee
+from sqlalchemy import text
+
+PERIOD_COLUMNS = ('period_year', 'period_month')
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_fees_batch_period_user ON fees (batch_id, period_year, period_month, user_id)"
+CHECK_SQL = "EXPLAIN QUERY PLAN SELECT id FROM fees WHERE batch_id = 1 AND period_year = 2025 AND period_month = 1"
+
+
+def migrate_add_fee_periods():
+    """Add period_year/period_month generated columns and the period index to fees"""
+    try:
+        # ALTER TABLE ... ADD COLUMN ... GENERATED needs SQLite 3.31+
+        if sqlite3.sqlite_version_info < (3, 31, 0):
+            print(f"❌ SQLite {sqlite3.sqlite_version} does not support generated columns (3.31+ required)")
+            return False
+
+        app = create_app()
+
+        with app.app_context():
+            print("Starting migration: Add fee period columns...")
+
+            inspector = db.inspect(db.engine)
+            existing_columns = [col['name'] for col in inspector.get_columns('fees')]
+
+            for column in PERIOD_COLUMNS:
+                if column in existing_columns:
+                    print(f"⏭️  {column} already exists")
+                    continue
+                expression = Fee.__table__.c[column].computed.sqltext
+                sql = f"ALTER TABLE fees ADD COLUMN {column} INTEGER GENERATED ALWAYS AS ({expression}) VIRTUAL"
+                print(f"Executing: {sql}")
+                db.session.execute(text(sql))
+
+            print(f"Executing: {INDEX_SQL}")
+            db.session.execute(text(INDEX_SQL))
+            db.session.commit()
+
+            fee_count = db.session.execute(text("SELECT COUNT(*) FROM fees")).scalar()
+            unmatched = db.session.execute(text(
+                "SELECT COUNT(*) FROM fees WHERE period_year IS NULL OR period_month NOT BETWEEN 1 AND 12"
+            )).scalar()
+            plan = ' / '.join(row[-1] for row in db.session.execute(text(CHECK_SQL)))
+            print(f"📊 {fee_count} fees indexed by period, {unmatched} with an unreadable due_date")
+            print(f"🔍 Query plan: {plan}")
+
+            print("✅ Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return False
+
+if __name__ == '__main__':
+    print("🚀 Starting fee period migration...")
+    print("=" * 50)
+
+    if not migrate_add_fee_periods():
+        print("\n❌ Migration failed! Please check the error messages above.")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("✅ Fee grids and summaries now filter fees by indexed period columns")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Database migration to add normalized E.164 phone columns to the users table
+Adds phone_e164, guardian_phone_e164 and emergency_contact_e164 with indexes
+and backfills them from the existing raw phone fields.
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+from utils.phone import normalize_phone
+from sqlalchemy import text
+
+# raw column -> normalized column
+PHONE_COLUMNS = {
+    'phoneNumber': 'phone_e164',
+    'guardian_phone': 'guardian_phone_e164',
+    'emergency_contact': 'emergency_contact_e164',
+}
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def migrate_add_phone_e164():
+    """Add, index and backfill the normalized phone columns"""
+    try:
+        app = create_app()
+
+        with app.app_context():
+            print("Starting migration: Add normalized E.164 phone columns to users...")
+
+            inspector = db.inspect(db.engine)
+            existing_columns = [col['name'] for col in inspector.get_columns('users')]
+
+            for normalized_column in PHONE_COLUMNS.values():
+                if normalized_column not in existing_columns:
+                    sql = f"ALTER TABLE users ADD COLUMN {normalized_column} VARCHAR(16)"
+                    print(f"Executing: {sql}")
+                    db.session.execute(text(sql))
+                else:
+                    print(f"- {normalized_column} column already exists")
+
+                sql = f"CREATE INDEX IF NOT EXISTS ix_users_{normalized_column} ON users ({normalized_column})"
+                print(f"Executing: {sql}")
+                db.session.execute(text(sql))
+
+            db.session.commit()
+
+            # Backfill in chunks so large user tables don't need one huge transaction
+            print("\nBackfilling normalized phone numbers...")
+            raw_select = ', '.join(f'"{raw}"' for raw in PHONE_COLUMNS)
+            set_clause = ', '.join(f"{normalized} = :{normalized}" for normalized in PHONE_COLUMNS.values())
+            update_sql = text(f"UPDATE users SET {set_clause} WHERE id = :id")
+
+            last_id = 0
+            updated = 0
+            invalid = 0
+            while True:
+                rows = db.session.execute(
+                    text(f"SELECT id, {raw_select} FROM users WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {'last_id': last_id, 'limit': BACKFILL_CHUNK_SIZE}
+                ).fetchall()
+                if not rows:
+                    break
+
+                params = []
+                for row in rows:
+                    values = {'id': row[0]}
+                    for index, normalized in enumerate(PHONE_COLUMNS.values(), start=1):
+                        values[normalized] = normalize_phone(row[index])
+                        if row[index] and not values[normalized]:
+                            invalid += 1
+                    params.append(values)
+
+                db.session.execute(update_sql, params)
+                db.session.commit()
+
+                updated += len(rows)
+                last_id = rows[-1][0]
+                print(f"  - {updated} users processed")
+
+            print(f"✅ Migration completed successfully! {updated} users backfilled")
+            if invalid:
+                print(f"⚠️  {invalid} phone values could not be normalized and were left empty")
+
+            return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return False
+
+if __name__ == '__main__':
+    print("🚀 Starting users phone normalization migration...")
+    print("=" * 50)
+
+    if not migrate_add_phone_e164():
+        print("\n❌ Migration failed! Please check the error messages above.")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("✅ Login and SMS recipient lookups now use the indexed E.164 columns")
+    print("\n🎯 Next steps:")
+    print("1. Restart the Flask server")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+One-time migration of the local student password store
+Imports student_passwords.json into the indexed SQLite store used by
+utils/password_manager.py and renames the JSON file so it isn't imported twice.
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.password_manager import PASSWORD_FILE, PASSWORD_DB, import_json_passwords
+
+
+def migrate_student_passwords(json_path=PASSWORD_FILE):
+    """Import the JSON password file into SQLite"""
+    try:
+        print("Starting migration: student_passwords.json -> SQLite...")
+
+        if not os.path.exists(json_path):
+            print(f"✅ {json_path} not found. Migration not needed.")
+            return True
+
+        imported, skipped = import_json_passwords(json_path)
+        print(f"  - {imported} passwords imported into {PASSWORD_DB}")
+        if skipped:
+            print(f"  - {skipped} entries skipped (already in the store or missing a hash)")
+
+        archived_path = json_path + '.imported'
+        os.replace(json_path, archived_path)
+        print(f"  - Legacy file moved to {archived_path}")
+
+        print("✅ Migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("🚀 Starting student password store migration...")
+    print("=" * 50)
+
+    if not migrate_student_passwords(*sys.argv[1:2]):
+        print("\n❌ Migration failed! Please check the error messages above.")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("✅ Student passwords are now read from the SQLite store")
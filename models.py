@@ -5,7 +5,8 @@ MySQL/SQLAlchemy implementation of the complete schema
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, date
 from enum import Enum
-from sqlalchemy import Numeric
+from sqlalchemy import Numeric, func, case
+from sqlalchemy.orm import validates
 import json
 
 db = SQLAlchemy()
@@ -80,6 +81,10 @@ class User(db.Model):
     guardian_phone = db.Column(db.String(20), nullable=True)
     mother_name = db.Column(db.String(200), nullable=True)
     emergency_contact = db.Column(db.String(20), nullable=True)
+    # Normalized E.164 mirrors of the phone fields, kept in sync by _sync_phone_e164
+    phone_e164 = db.Column(db.String(16), nullable=True, index=True)
+    guardian_phone_e164 = db.Column(db.String(16), nullable=True, index=True)
+    emergency_contact_e164 = db.Column(db.String(16), nullable=True, index=True)
     sms_count = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
     last_login = db.Column(db.DateTime, nullable=True)
@@ -87,6 +92,7 @@ class User(db.Model):
     archived_at = db.Column(db.DateTime, nullable=True)
     archived_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     archive_reason = db.Column(db.Text, nullable=True)
+    auth_epoch = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # Bumped to revoke session claims
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -100,6 +106,14 @@ class User(db.Model):
     monthly_results = db.relationship('MonthlyResult', back_populates='user')
     created_exams = db.relationship('Exam', back_populates='created_by_user')
     
+    @validates('phoneNumber', 'guardian_phone', 'emergency_contact')
+    def _sync_phone_e164(self, key, value):
+        """Keep the indexed E.164 columns in step with the raw phone fields"""
+        from utils.phone import normalize_phone
+        normalized_field = 'phone_e164' if key == 'phoneNumber' else f'{key}_e164'
+        setattr(self, normalized_field, normalize_phone(value))
+        return value
+    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -131,6 +145,8 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.phone}: {self.full_name}>'
 
+EMPTY_BATCH_COUNTS = {'total': 0, 'active': 0, 'active_unarchived': 0, 'active_students': 0, 'archived': 0}
+
 class Batch(db.Model):
     """Batch/Class model"""
     __tablename__ = 'batches'
@@ -165,7 +181,44 @@ class Batch(db.Model):
     @property
     def current_students(self):
         """Count of currently enrolled students"""
-        return len([s for s in self.students if s.is_active])
+        return Batch.student_counts([self.id]).get(self.id, EMPTY_BATCH_COUNTS)['active']
+    
+    @staticmethod
+    def student_counts(batch_ids=None):
+        """
+        Enrollment counts per batch from one grouped COUNT over user_batches
+        Returns {batch_id: {'active', 'active_unarchived', 'active_students',
+        'archived', 'total'}} without loading any User rows. 'active' and
+        'active_unarchived' count enrolled users of any role, as
+        current_students always has; the other three count students only.
+        Batches without enrolled users are omitted.
+        """
+        is_student = User.role == UserRole.STUDENT
+        query = db.session.query(
+            user_batches.c.batch_id,
+            func.sum(case((is_student, 1), else_=0)),
+            func.sum(case((User.is_active == True, 1), else_=0)),
+            func.sum(case(((User.is_active == True) & (User.is_archived == False), 1), else_=0)),
+            func.sum(case((is_student & (User.is_active == True), 1), else_=0)),
+            func.sum(case((is_student & (User.is_archived == True), 1), else_=0))
+        ).join(User, User.id == user_batches.c.user_id)\
+         .group_by(user_batches.c.batch_id)
+        
+        if batch_ids is not None:
+            if not batch_ids:
+                return {}
+            query = query.filter(user_batches.c.batch_id.in_(batch_ids))
+        
+        return {
+            batch_id: {
+                'total': total or 0,
+                'active': active or 0,
+                'active_unarchived': active_unarchived or 0,
+                'active_students': active_students or 0,
+                'archived': archived or 0
+            }
+            for batch_id, total, active, active_unarchived, active_students, archived in query
+        }
     
     @property
     def monthly_fee(self):
@@ -300,10 +353,26 @@ class Fee(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Billing period, generated from due_date (stored as YYYY-MM-DD) so period
+    # filters are index lookups instead of per-row date extraction
+    period_year = db.Column(db.Integer, db.Computed("CAST(substr(due_date, 1, 4) AS INTEGER)", persisted=False))
+    period_month = db.Column(db.Integer, db.Computed("CAST(substr(due_date, 6, 2) AS INTEGER)", persisted=False))
+    
     # Relationships
     user = db.relationship('User', back_populates='fees')
     batch = db.relationship('Batch', back_populates='fees')
     
+    __table_args__ = (
+        db.Index('ix_fees_batch_period_user', 'batch_id', 'period_year', 'period_month', 'user_id'),
+    )
+    
+    @staticmethod
+    def in_period(year, month=None):
+        """Equality predicates on the indexed period columns"""
+        if month:
+            return (Fee.period_year == year, Fee.period_month == month)
+        return (Fee.period_year == year,)
+    
     def __repr__(self):
         return f'<Fee {self.user_id} - {self.amount}>'
 
@@ -663,6 +732,7 @@ class OnlineExam(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     allow_retake = db.Column(db.Boolean, default=True)
+    shuffle_questions = db.Column(db.Boolean, default=False, nullable=False, server_default='0')  # Per-attempt question/option order
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -691,6 +761,7 @@ class OnlineExam(db.Model):
             'creator_name': f"{self.creator.first_name} {self.creator.last_name}" if self.creator else 'Unknown',
             'is_active': self.is_active,
             'allow_retake': self.allow_retake,
+            'shuffle_questions': bool(self.shuffle_questions),
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -746,10 +817,17 @@ class StudentExamAttempt(db.Model):
     percentage = db.Column(db.Float, nullable=True)
     status = db.Column(db.String(20), default='in_progress')  # 'in_progress', 'submitted', 'auto_submitted'
     time_taken_minutes = db.Column(db.Integer, nullable=True)
+    answer_seq = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # Last autosave sequence applied
+    shuffle_version = db.Column(db.String(32), nullable=True)  # Exam version the attempt's shuffle is seeded with
     
     # Relationships
     student = db.relationship('User', foreign_keys=[student_id])
     
+    __table_args__ = (
+        db.Index('ix_attempts_exam_student_status', 'exam_id', 'student_id', 'status'),
+        db.Index('ix_attempts_status_start', 'status', 'start_time'),
+    )
+    
     def __repr__(self):
         return f'<StudentExamAttempt Student:{self.student_id} Exam:{self.exam_id} Attempt:{self.attempt_number}>'
     
@@ -2,7 +2,7 @@
 Reset all student passwords to last 4 digits of parent phone
 """
 import sqlite3
-from werkzeug.security import generate_password_hash
+from utils.bulk_credentials import hash_passwords, print_progress
 
 def reset_passwords():
     """Reset all student passwords to last 4 digits of parent phone"""
@@ -20,7 +20,7 @@ def reset_passwords():
         """)
         
         students = cursor.fetchall()
-        updated_count = 0
+        updates = []
         
         for student_id, first_name, last_name, guardian_phone, phone_number in students:
             # Use guardian_phone if available, otherwise phoneNumber
@@ -28,21 +28,26 @@ def reset_passwords():
             
             if parent_phone and len(parent_phone) >= 4:
                 # Generate password as last 4 digits
-                new_password = parent_phone[-4:]
-                password_hash = generate_password_hash(new_password)
-                
-                # Update password
-                cursor.execute("""
-                    UPDATE users 
-                    SET password_hash = ?
-                    WHERE id = ?
-                """, (password_hash, student_id))
-                
-                print(f"✅ Updated: {first_name} {last_name} - Phone: {parent_phone} - Password: {new_password}")
-                updated_count += 1
+                updates.append((student_id, first_name, last_name, parent_phone, parent_phone[-4:]))
             else:
                 print(f"⚠️  Skipped: {first_name} {last_name} - No valid phone number")
         
+        # Hash every new password in parallel across CPU cores
+        password_hashes = hash_passwords(
+            [new_password for *_, new_password in updates],
+            progress=print_progress()
+        )
+        
+        cursor.executemany("""
+            UPDATE users 
+            SET password_hash = ?
+            WHERE id = ?
+        """, [(password_hash, update[0]) for update, password_hash in zip(updates, password_hashes)])
+        
+        for student_id, first_name, last_name, parent_phone, new_password in updates:
+            print(f"✅ Updated: {first_name} {last_name} - Phone: {parent_phone} - Password: {new_password}")
+        updated_count = len(updates)
+        
         conn.commit()
         print(f"\n✅ Successfully updated {updated_count} student passwords!")
         print("\n📝 Password Format: Last 4 digits of parent phone number")
@@ -3,31 +3,25 @@ Authentication Routes
 Login, logout, and session management
 """
 from flask import Blueprint, request, jsonify, session, redirect, url_for, flash
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import generate_password_hash
 from models import db, User, UserRole
-from utils.auth import login_required, require_role
+from utils.auth import login_required, require_role, get_current_identity, clear_current_identity
+from utils.session_claims import issue_session_claims, claims_mode_enabled
 from utils.response import success_response, error_response
-import re
+from utils.phone import normalize_phone
+from utils.password_verifier import password_verifier, check_password, VerifierBusy, LoginThrottled
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
-def validate_phone(phone):
-    """Validate Bangladeshi phone number format"""
-    # Remove any spaces or special characters
-    phone = re.sub(r'[^\d]', '', phone)
-    
-    # Check if it's a valid Bangladeshi number
-    if phone.startswith('880'):
-        phone = phone[3:]  # Remove country code
-    elif phone.startswith('+880'):
-        phone = phone[4:]  # Remove country code with +
-    
-    # Should be 11 digits starting with 01
-    if len(phone) == 11 and phone.startswith('01'):
-        return phone
-    
-    return None
+def _login_error(message, status_code, retry_after):
+    """Login rejection that tells the client when to retry"""
+    if request.is_json:
+        response, status_code = error_response(message, status_code)
+        response.headers['Retry-After'] = str(retry_after)
+        return response, status_code
+    flash(message, 'error')
+    return redirect(url_for('templates.login'))
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -53,63 +47,64 @@ def login():
                 flash('Phone number and password are required.', 'error')
                 return redirect(url_for('templates.login'))
         
-        # Validate and format phone number
-        formatted_phone = validate_phone(phone)
-        if not formatted_phone:
+        # Validate and normalize phone number (indexed E.164 lookup)
+        phone_e164 = normalize_phone(phone)
+        if not phone_e164:
             if request.is_json:
                 return error_response('Invalid phone number format', 400)
             else:
                 flash('Invalid phone number format. Please enter a valid Bangladeshi number.', 'error')
                 return redirect(url_for('templates.login'))
         
+        # Refuse phones with too many recent failures before any lookup or hashing
+        try:
+            password_verifier.check_throttle(phone_e164)
+        except LoginThrottled as e:
+            return _login_error('Too many failed login attempts. Please try again later.', 429, e.retry_after)
+        
         # Find user by phone - for students, try guardian_phone field first
-        user = User.query.filter_by(phoneNumber=formatted_phone).first()
+        user = User.query.filter_by(phone_e164=phone_e164).first()
+        password_valid = False
         
-        # If not found by phoneNumber, try finding students by guardian_phone
-        if not user:
-            students_with_guardian = User.query.filter(
-                User.guardian_phone == formatted_phone,
-                User.role == UserRole.STUDENT
-            ).all()
+        try:
+            if not user:
+                # Multiple students can share same guardian phone: resolve the
+                # active candidates first, then hash until one matches
+                # (or accept the "student123" default for the first student)
+                students_with_guardian = User.query.filter(
+                    User.guardian_phone_e164 == phone_e164,
+                    User.role == UserRole.STUDENT,
+                    User.is_active == True
+                ).order_by(User.id).all()
+                
+                if students_with_guardian and password == "student123":
+                    user = students_with_guardian[0]
+                    password_valid = True
+                else:
+                    for student in students_with_guardian:
+                        if password_verifier.verify(phone_e164, student.password_hash, password):
+                            user = student
+                            password_valid = True
+                            break
             
-            if students_with_guardian:
-                # Multiple students can share same guardian phone
-                # Check password for each and login the first valid one
-                # OR if password is "student123", allow access to select student
-                for student in students_with_guardian:
-                    if password == "student123" or check_password_hash(student.password_hash, password):
-                        user = student
-                        break
-        
-        if not user:
-            if request.is_json:
-                return error_response('Invalid phone number or password', 401)
-            else:
-                flash('Invalid phone number or password. Please try again.', 'error')
-                return redirect(url_for('templates.login'))
-        
-        if not user.is_active:
+            elif user.is_active:
+                if user.role == UserRole.STUDENT and password == "student123":
+                    # For students, ALWAYS accept "student123" as default password
+                    password_valid = True
+                else:
+                    password_valid = password_verifier.verify(phone_e164, user.password_hash, password)
+        except VerifierBusy:
+            return _login_error('Server is busy. Please try again in a moment.', 503, 1)
+        
+        if user and not user.is_active:
             if request.is_json:
                 return error_response('Account is deactivated', 401)
             else:
                 flash('Account is deactivated. Please contact administrator.', 'error')
                 return redirect(url_for('templates.login'))
         
-        # Check password based on user role
-        password_valid = False
-        
-        if user.role == UserRole.STUDENT:
-            # For students, ALWAYS accept "student123" as default password
-            password_valid = (
-                password == "student123" or 
-                check_password_hash(user.password_hash, password)
-            )
-        else:
-            # For teachers and super users, check hashed password
-            if user.password_hash:
-                password_valid = check_password_hash(user.password_hash, password)
-        
-        if not password_valid:
+        if not user or not password_valid:
+            password_verifier.record_failure(phone_e164)
             # Handle error response based on request type
             if request.is_json:
                 return error_response('Invalid phone number or password', 401)
@@ -118,6 +113,8 @@ def login():
                 flash('Invalid phone number or password. Please try again.', 'error')
                 return redirect(url_for('templates.login'))
         
+        password_verifier.record_success(phone_e164)
+        
         # Update last login
         user.last_login = datetime.utcnow()
         db.session.commit()
@@ -149,6 +146,9 @@ def login():
         session['user_id'] = user.id
         session['user_role'] = user.role.value
         session.permanent = True
+        clear_current_identity()
+        if claims_mode_enabled():
+            issue_session_claims(user)
         
         # Prepare user data for response
         user_data = {
@@ -234,6 +234,7 @@ def logout():
         
         # Clear session
         session.clear()
+        clear_current_identity()
         
         return success_response('Logout successful')
         
@@ -245,8 +246,8 @@ def logout():
 def get_current_user():
     """Get current user information"""
     try:
-        user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        identity = get_current_identity()
+        user = identity.user if identity else None
         
         if not user:
             return error_response('User not found', 404)
@@ -288,8 +289,8 @@ def get_current_user():
 def change_password():
     """Change user password (for teachers and super users only)"""
     try:
-        user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        identity = get_current_identity()
+        user = identity.user if identity else None
         
         if not user:
             return error_response('User not found', 404)
@@ -305,7 +306,7 @@ def change_password():
             return error_response('Current password and new password are required', 400)
         
         # Verify current password
-        if not user.password_hash or not check_password_hash(user.password_hash, current_password):
+        if not check_password(user.password_hash, current_password):
             return error_response('Current password is incorrect', 401)
         
         # Validate new password
@@ -317,6 +318,10 @@ def change_password():
         user.updated_at = datetime.utcnow()
         db.session.commit()
         
+        # Password change revokes other sessions; keep this one signed in
+        if claims_mode_enabled():
+            issue_session_claims(user)
+        
         return success_response('Password changed successfully')
         
     except Exception as e:
@@ -332,9 +337,9 @@ def check_session():
         if not user_id:
             return error_response('No active session', 401)
         
-        user = User.query.get(user_id)
+        identity = get_current_identity()
         
-        if not user or not user.is_active:
+        if not identity or not identity.is_active:
             session.clear()
             return error_response('Invalid session', 401)
         
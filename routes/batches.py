@@ -3,10 +3,11 @@ Batch Management Routes
 CRUD operations for batches and student enrollment
 """
 from flask import Blueprint, request
-from models import db, Batch, User, UserRole, user_batches
+from models import db, Batch, User, UserRole, user_batches, EMPTY_BATCH_COUNTS
 from utils.auth import login_required, require_role, get_current_user
 from utils.response import success_response, error_response, paginated_response, serialize_batch
-from sqlalchemy import or_
+from utils.session_claims import user_validity_cache
+from sqlalchemy import or_, select, update
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -44,9 +45,13 @@ def get_batches():
             error_out=False
         )
         
+        # One grouped COUNT for the whole page instead of loading students
+        student_counts = Batch.student_counts([batch.id for batch in pagination.items])
+        
         batches_data = []
         for batch in pagination.items:
-            batch_info = serialize_batch(batch)
+            counts = student_counts.get(batch.id, EMPTY_BATCH_COUNTS)
+            batch_info = serialize_batch(batch, student_count=counts['active'])
             
             # Extract class from description if available
             if ' - ' in batch.description:
@@ -54,7 +59,7 @@ def get_batches():
                 batch_info['class'] = class_name
             
             # Add current student count
-            batch_info['currentStudents'] = len([s for s in batch.students if s.is_active])
+            batch_info['currentStudents'] = counts['active']
             batch_info['maxStudents'] = batch.max_students or 50
             
             batches_data.append(batch_info)
@@ -286,15 +291,15 @@ def delete_batch(batch_id):
             return error_response('Batch not found', 404)
         
         # Check if batch has students enrolled
-        active_students = [s for s in batch.students if s.is_active]
+        active_students = batch.current_students
         if active_students:
-            return error_response(f'Cannot delete batch with {len(active_students)} active students. Please remove students first.', 400)
+            return error_response(f'Cannot delete batch with {active_students} active students. Please remove students first.', 400)
         
         # Hard delete - permanently remove from database
         batch_name = batch.name
         
         # Remove all student associations first
-        batch.students.clear()
+        db.session.execute(user_batches.delete().where(user_batches.c.batch_id == batch.id))
         
         # Delete the batch permanently
         db.session.delete(batch)
@@ -462,6 +467,7 @@ def get_active_batches():
     """Get all active batches (simplified list) - excludes archived"""
     try:
         batches = Batch.query.filter_by(is_active=True, is_archived=False).order_by(Batch.name).all()
+        student_counts = Batch.student_counts([batch.id for batch in batches])
         
         batches_data = []
         for batch in batches:
@@ -472,7 +478,7 @@ def get_active_batches():
                 'fee_amount': float(batch.fee_amount),
                 'start_date': batch.start_date.isoformat(),
                 'end_date': batch.end_date.isoformat() if batch.end_date else None,
-                'student_count': len([s for s in batch.students if s.is_active and not s.is_archived])
+                'student_count': student_counts.get(batch.id, EMPTY_BATCH_COUNTS)['active_unarchived']
             }
             batches_data.append(batch_data)
         
@@ -485,6 +491,10 @@ def get_active_batches():
 # ARCHIVE MANAGEMENT ROUTES
 # ============================================================================
 
+def _batch_member_ids(batch_id):
+    """Subquery of user ids enrolled in the batch"""
+    return select(user_batches.c.user_id).where(user_batches.c.batch_id == batch_id)
+
 @batches_bp.route('/<int:batch_id>/archive', methods=['POST'])
 @login_required
 @require_role(UserRole.TEACHER, UserRole.SUPER_USER)
@@ -510,17 +520,28 @@ def archive_batch(batch_id):
         batch.archived_by = current_user.id
         batch.archive_reason = reason
         
-        # Archive all students in this batch
-        archived_students_count = 0
-        for student in batch.students:
-            if not student.is_archived and student.role == UserRole.STUDENT:
-                student.is_archived = True
-                student.archived_at = datetime.utcnow()
-                student.archived_by = current_user.id
-                student.archive_reason = f"Archived with batch: {batch.name}"
-                archived_students_count += 1
+        # Archive all students in this batch with one UPDATE
+        now = datetime.utcnow()
+        archived_students_count = db.session.execute(
+            update(User)
+            .where(
+                User.id.in_(_batch_member_ids(batch.id)),
+                User.role == UserRole.STUDENT,
+                User.is_archived == False
+            )
+            .values(
+                is_archived=True,
+                archived_at=now,
+                archived_by=current_user.id,
+                archive_reason=f"Archived with batch: {batch.name}",
+                auth_epoch=User.auth_epoch + 1,  # Bulk UPDATEs skip the ORM revocation hook
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
         
         db.session.commit()
+        user_validity_cache.clear()
         
         return success_response('Batch and students archived successfully', {
             'batch_id': batch.id,
@@ -559,20 +580,30 @@ def restore_batch(batch_id):
         batch.archived_by = None
         batch.archive_reason = None
         
-        # Restore students if requested
+        # Restore students if requested - only those archived with this batch
         restored_students_count = 0
         if restore_students:
-            for student in batch.students:
-                if student.is_archived and student.role == UserRole.STUDENT:
-                    # Only restore if archived with this batch
-                    if student.archive_reason and f"Archived with batch: {batch.name}" in student.archive_reason:
-                        student.is_archived = False
-                        student.archived_at = None
-                        student.archived_by = None
-                        student.archive_reason = None
-                        restored_students_count += 1
+            restored_students_count = db.session.execute(
+                update(User)
+                .where(
+                    User.id.in_(_batch_member_ids(batch.id)),
+                    User.role == UserRole.STUDENT,
+                    User.is_archived == True,
+                    User.archive_reason.contains(f"Archived with batch: {batch.name}", autoescape=True)
+                )
+                .values(
+                    is_archived=False,
+                    archived_at=None,
+                    archived_by=None,
+                    archive_reason=None,
+                    auth_epoch=User.auth_epoch + 1,
+                    updated_at=datetime.utcnow()
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
         
         db.session.commit()
+        user_validity_cache.clear()
         
         return success_response('Batch restored successfully', {
             'batch_id': batch.id,
@@ -591,24 +622,29 @@ def get_archived_batches():
     """Get all archived batches"""
     try:
         batches = Batch.query.filter_by(is_archived=True).order_by(Batch.archived_at.desc()).all()
+        student_counts = Batch.student_counts([batch.id for batch in batches])
+        
+        # Names of the users who archived these batches, in one column query
+        archiver_ids = {batch.archived_by for batch in batches if batch.archived_by}
+        archiver_names = {
+            user_id: f"{first_name} {last_name}"
+            for user_id, first_name, last_name in db.session.query(User.id, User.first_name, User.last_name)
+                .filter(User.id.in_(archiver_ids))
+        } if archiver_ids else {}
         
         batches_data = []
         for batch in batches:
-            batch_data = serialize_batch(batch)
+            counts = student_counts.get(batch.id, EMPTY_BATCH_COUNTS)
+            batch_data = serialize_batch(batch, student_count=counts['active'])
             batch_data['archived_at'] = batch.archived_at.isoformat() if batch.archived_at else None
             batch_data['archive_reason'] = batch.archive_reason
             
             # Get archived by user info
-            if batch.archived_by:
-                archived_by_user = User.query.get(batch.archived_by)
-                batch_data['archived_by_name'] = archived_by_user.full_name if archived_by_user else 'Unknown'
-            else:
-                batch_data['archived_by_name'] = 'Unknown'
+            batch_data['archived_by_name'] = archiver_names.get(batch.archived_by, 'Unknown')
             
             # Count archived students in this batch
-            archived_student_count = len([s for s in batch.students if s.is_archived and s.role == UserRole.STUDENT])
-            batch_data['archived_students_count'] = archived_student_count
-            batch_data['total_students_count'] = len([s for s in batch.students if s.role == UserRole.STUDENT])
+            batch_data['archived_students_count'] = counts['archived']
+            batch_data['total_students_count'] = counts['total']
             
             batches_data.append(batch_data)
         
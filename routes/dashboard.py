@@ -3,8 +3,8 @@ Dashboard API Routes
 Statistics and overview data for dashboard
 """
 from flask import Blueprint, jsonify, session
-from models import User, Batch, db, UserRole
-from utils.auth import login_required, require_role
+from models import User, Batch, db, UserRole, EMPTY_BATCH_COUNTS
+from utils.auth import login_required, require_role, get_current_user
 from utils.response import success_response, error_response
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -25,22 +25,26 @@ def get_dashboard_stats():
         # SMS count (placeholder for now - you can implement proper SMS tracking)
         sms_count = 0  # This would need proper SMS service integration
         
-        # Get recent students (last 5)
-        recent_students = User.query.filter_by(role=UserRole.STUDENT, is_active=True)\
-                             .order_by(User.created_at.desc())\
-                             .limit(5).all()
+        # Get recent students (last 5) - only the columns shown
+        recent_students = db.session.query(
+            User.id, User.first_name, User.last_name, User.phoneNumber, User.email, User.created_at
+        ).filter(User.role == UserRole.STUDENT, User.is_active == True)\
+         .order_by(User.created_at.desc())\
+         .limit(5).all()
         
-        # Get all batches with student counts (for detailed data)
+        # Get all batches with student counts (one grouped COUNT, no student rows)
         all_batches_data = []
-        batches = Batch.query.all()  # Get all batches, not just active ones
+        student_counts = Batch.student_counts()
+        batches = db.session.query(
+            Batch.id, Batch.name, Batch.description, Batch.fee_amount, Batch.is_active
+        ).all()  # Get all batches, not just active ones
         for batch in batches:
-            student_count = len([s for s in batch.students if s.role == UserRole.STUDENT and s.is_active])
             all_batches_data.append({
                 'id': batch.id,
                 'name': batch.name,
                 'description': batch.description,
-                'student_count': student_count,
-                'fee_amount': float(batch.fee_amount),
+                'student_count': student_counts.get(batch.id, EMPTY_BATCH_COUNTS)['active_students'],
+                'fee_amount': float(batch.fee_amount or 0),
                 'is_active': batch.is_active
             })
         
@@ -74,8 +78,7 @@ def get_dashboard_stats():
 def get_overview():
     """Get dashboard overview data"""
     try:
-        user_id = session.get('user_id')
-        current_user = User.query.get(user_id)
+        current_user = get_current_user()
         
         if current_user.role == UserRole.STUDENT:
             # Student overview
@@ -6,7 +6,8 @@ from flask import Blueprint, request, session
 from models import db, Fee, User, Batch, UserRole, FeeStatus
 from utils.auth import login_required, require_role, get_current_user, check_batch_access
 from utils.response import success_response, error_response, paginated_response, serialize_fee
-from sqlalchemy import or_, and_, func, extract
+from utils.fee_summary import fee_summary_cache
+from sqlalchemy import or_, and_, func
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 import calendar
@@ -50,12 +51,9 @@ def get_fees():
         
         # Filter by month/year
         if month and year:
-            query = query.filter(
-                extract('month', Fee.due_date) == month,
-                extract('year', Fee.due_date) == year
-            )
+            query = query.filter(*Fee.in_period(year, month))
         elif year:
-            query = query.filter(extract('year', Fee.due_date) == year)
+            query = query.filter(*Fee.in_period(year))
         
         # Filter overdue fees
         if overdue_only:
@@ -551,8 +549,7 @@ def create_monthly_fees(batch_id):
             existing_fee = Fee.query.filter(
                 Fee.user_id == student.id,
                 Fee.batch_id == batch_id,
-                extract('month', Fee.due_date) == month,
-                extract('year', Fee.due_date) == year
+                *Fee.in_period(year, month)
             ).first()
             
             if existing_fee:
@@ -607,81 +604,7 @@ def get_fee_summary():
         month = request.args.get('month', type=int)
         year = request.args.get('year', type=int)
         
-        base_query = Fee.query
-        
-        # Filter by batch
-        if batch_id:
-            base_query = base_query.filter(Fee.batch_id == batch_id)
-        
-        # Filter by month/year
-        if month and year:
-            base_query = base_query.filter(
-                extract('month', Fee.due_date) == month,
-                extract('year', Fee.due_date) == year
-            )
-        elif year:
-            base_query = base_query.filter(extract('year', Fee.due_date) == year)
-        
-        # Calculate statistics
-        total_fees = base_query.count()
-        
-        paid_fees = base_query.filter(Fee.status == FeeStatus.PAID).count()
-        pending_fees = base_query.filter(Fee.status == FeeStatus.PENDING).count()
-        overdue_fees = base_query.filter(
-            Fee.status == FeeStatus.PENDING,
-            Fee.due_date < date.today()
-        ).count()
-        
-        # Calculate amounts
-        total_amount = base_query.with_entities(
-            func.sum(Fee.amount + Fee.late_fee - Fee.discount)
-        ).scalar() or 0
-        
-        paid_amount = base_query.filter(Fee.status == FeeStatus.PAID).with_entities(
-            func.sum(Fee.amount + Fee.late_fee - Fee.discount)
-        ).scalar() or 0
-        
-        pending_amount = base_query.filter(Fee.status == FeeStatus.PENDING).with_entities(
-            func.sum(Fee.amount + Fee.late_fee - Fee.discount)
-        ).scalar() or 0
-        
-        # Collection rate
-        collection_rate = (paid_amount / total_amount * 100) if total_amount > 0 else 0
-        
-        # Recent payments
-        recent_payments = Fee.query.filter(
-            Fee.status == FeeStatus.PAID,
-            Fee.paid_date >= date.today() - timedelta(days=30)
-        )
-        
-        if batch_id:
-            recent_payments = recent_payments.filter(Fee.batch_id == batch_id)
-        
-        recent_payments = recent_payments.order_by(Fee.paid_date.desc()).limit(10).all()
-        
-        recent_payments_data = []
-        for fee in recent_payments:
-            payment_data = {
-                'id': fee.id,
-                'amount': float(fee.amount + fee.late_fee - fee.discount),
-                'paid_date': fee.paid_date.isoformat(),
-                'student_name': fee.user.full_name,
-                'batch_name': fee.batch.name,
-                'payment_method': fee.payment_method
-            }
-            recent_payments_data.append(payment_data)
-        
-        summary = {
-            'total_fees': total_fees,
-            'paid_fees': paid_fees,
-            'pending_fees': pending_fees,
-            'overdue_fees': overdue_fees,
-            'total_amount': float(total_amount),
-            'paid_amount': float(paid_amount),
-            'pending_amount': float(pending_amount),
-            'collection_rate': round(collection_rate, 2),
-            'recent_payments': recent_payments_data
-        }
+        summary = fee_summary_cache.get(batch_id, month, year)
         
         return success_response('Fee summary retrieved', {'summary': summary})
         
@@ -718,7 +641,7 @@ def get_monthly_fees():
         # Get fees for the year
         fees_query = Fee.query.filter(
             Fee.batch_id == batch_id,
-            extract('year', Fee.due_date) == year
+            *Fee.in_period(year)
         ).all()
         
         # Create a lookup dictionary for fees
@@ -826,8 +749,7 @@ def save_monthly_fee():
         existing_fee = Fee.query.filter(
             Fee.user_id == student_id,
             Fee.batch_id == batch.id,
-            extract('month', Fee.due_date) == month,
-            extract('year', Fee.due_date) == year
+            *Fee.in_period(year, month)
         ).first()
         
         if existing_fee:
@@ -945,8 +867,7 @@ def save_monthly_fee_noauth():
         existing_fee = Fee.query.filter(
             Fee.user_id == student_id,
             Fee.batch_id == batch.id,
-            extract('month', Fee.due_date) == month,
-            extract('year', Fee.due_date) == year
+            *Fee.in_period(year, month)
         ).first()
 
         if existing_fee:
@@ -1017,7 +938,7 @@ def get_monthly_fees_noauth():
         # Get fees for the year
         fees_query = Fee.query.filter(
             Fee.batch_id == batch_id,
-            extract('year', Fee.due_date) == year
+            *Fee.in_period(year)
         ).all()
         
         # Create a lookup dictionary for fees
@@ -1,11 +1,15 @@
 """
 Fee Management Routes - Completely rewritten for clarity and reliability
 """
-from flask import Blueprint, request, jsonify
-from models import db, User, Batch, Fee, UserRole, FeeStatus
-from sqlalchemy import extract
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from models import db, User, Batch, Fee, UserRole, FeeStatus, user_batches
+from utils.auth import login_required, require_role
+from utils.fee_summary import fee_summary_cache
+from utils.fee_sweeper import sweep_overdue_fees
+from utils.fee_export import fee_export_statement, iter_fee_rows, iter_csv, iter_xlsx, xlsx_available
 from datetime import datetime, date
 from decimal import Decimal
+from sqlalchemy import insert
 import calendar
 
 fees_bp = Blueprint('fees', __name__)
@@ -87,7 +91,7 @@ def load_monthly_fees():
         # Get all fees for this batch and year
         fees = Fee.query.filter(
             Fee.batch_id == batch_id,
-            extract('year', Fee.due_date) == year
+            *Fee.in_period(year)
         ).all()
         
         # Create a lookup dictionary: student_id -> month -> fee_data
@@ -233,8 +237,7 @@ def save_monthly_fee():
         existing_fee = Fee.query.filter(
             Fee.user_id == student_id,
             Fee.batch_id == batch_id,
-            extract('month', Fee.due_date) == month,
-            extract('year', Fee.due_date) == year
+            *Fee.in_period(year, month)
         ).first()
         
         if existing_fee:
@@ -306,6 +309,319 @@ def save_monthly_fee():
         return error_response(f'Failed to save fee: {str(e)}', 500)
 
 
+# Largest number of cells accepted by one save-monthly-batch request
+MAX_BATCH_CHANGES = 2000
+
+
+def _parse_fee_change(change, default_year):
+    """Validate one grid cell change; returns (key, amount, status) or raises ValueError"""
+    if not isinstance(change, dict):
+        raise ValueError('Change must be an object')
+    try:
+        student_id = int(change.get('student_id'))
+        month = int(change.get('month'))
+        year = int(change.get('year') or default_year)
+        amount = float(change.get('amount'))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid data types')
+    
+    if not (1 <= month <= 12):
+        raise ValueError('Month must be between 1 and 12')
+    if not (2020 <= year <= 2030):
+        raise ValueError('Year must be between 2020 and 2030')
+    if amount < 0:
+        raise ValueError('Amount cannot be negative')
+    
+    status = change.get('status')
+    if status is not None:
+        try:
+            status = FeeStatus(str(status).lower())
+        except ValueError:
+            raise ValueError(f'Invalid status: {status}')
+    
+    return (student_id, year, month), amount, status
+
+
+@fees_bp.route('/save-monthly-batch', methods=['POST'])
+@login_required
+@require_role(UserRole.TEACHER, UserRole.SUPER_USER)
+def save_monthly_fees_batch():
+    """
+    Save many fee grid cells in one transaction
+    POST /api/fees/save-monthly-batch
+    
+    Request body:
+    {
+        "batch_id": 1,
+        "year": 2025,
+        "changes": [
+            {"student_id": 1, "month": 1, "amount": 500},
+            {"student_id": 2, "month": 1, "amount": 500, "status": "paid"},
+            {"student_id": 3, "month": 2, "amount": 0}
+        ]
+    }
+    
+    Same rules as save-monthly for each cell (amount 0 deletes the fee).
+    Students and existing fees are looked up with one query each, and a
+    failing cell doesn't stop the others.
+    
+    Returns:
+    {
+        "success": true,
+        "data": {
+            "results": [
+                {"student_id": 1, "month": 1, "year": 2025, "success": true,
+                 "action": "created", "fee_id": 123, "amount": 500, "status": "pending"},
+                {"student_id": 9, "month": 1, "year": 2025, "success": false,
+                 "error": "Student is not enrolled in this batch"}
+            ],
+            "saved": 1,
+            "failed": 1
+        }
+    }
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return error_response('Request body is required', 400)
+        
+        try:
+            batch_id = int(data.get('batch_id'))
+        except (ValueError, TypeError):
+            return error_response('batch_id is required', 400)
+        
+        changes = data.get('changes')
+        if not isinstance(changes, list) or not changes:
+            return error_response('changes must be a non-empty list', 400)
+        if len(changes) > MAX_BATCH_CHANGES:
+            return error_response(f'At most {MAX_BATCH_CHANGES} changes per request', 400)
+        
+        batch = db.session.get(Batch, batch_id)
+        if not batch:
+            return error_response('Batch not found', 404)
+        
+        default_year = data.get('year') or datetime.now().year
+        
+        # Validate cells; a later change to the same cell replaces an earlier one
+        results = []
+        cells = {}
+        for change in changes:
+            try:
+                key, amount, status = _parse_fee_change(change, default_year)
+            except ValueError as e:
+                raw = change if isinstance(change, dict) else {}
+                results.append({
+                    'student_id': raw.get('student_id'),
+                    'month': raw.get('month'),
+                    'year': raw.get('year') or default_year,
+                    'success': False,
+                    'error': str(e)
+                })
+                continue
+            cells.pop(key, None)
+            cells[key] = (amount, status)
+        
+        student_ids = {student_id for student_id, _, _ in cells}
+        years = {year for _, year, _ in cells}
+        
+        enrolled = set()
+        existing = {}
+        if cells:
+            # Active students of this batch among the requested ids
+            enrolled = set(db.session.scalars(
+                db.select(user_batches.c.user_id)
+                .join(User, User.id == user_batches.c.user_id)
+                .where(
+                    user_batches.c.batch_id == batch_id,
+                    user_batches.c.user_id.in_(student_ids),
+                    User.role == UserRole.STUDENT,
+                    User.is_active == True
+                )
+            ))
+            
+            # Existing fees for those students and years
+            for fee in Fee.query.filter(
+                Fee.batch_id == batch_id,
+                Fee.period_year.in_(years),
+                Fee.user_id.in_(student_ids)
+            ).order_by(Fee.id):
+                existing.setdefault((fee.user_id, fee.period_year, fee.period_month), fee)
+        
+        today = date.today()
+        now = datetime.utcnow()
+        updated = []
+        created = {}
+        for (student_id, year, month), (amount, status) in cells.items():
+            result = {'student_id': student_id, 'month': month, 'year': year}
+            results.append(result)
+            
+            if student_id not in enrolled:
+                result.update(success=False, error='Student not found, inactive or not enrolled in this batch')
+                continue
+            
+            fee = existing.get((student_id, year, month))
+            if fee is None and amount == 0:
+                result.update(success=True, action='unchanged', fee_id=None)
+            elif fee is None:
+                status = status or FeeStatus.PENDING
+                due_date = date(year, month, calendar.monthrange(year, month)[1])
+                created[(student_id, year, month)] = (result, {
+                    'user_id': student_id,
+                    'batch_id': batch_id,
+                    'amount': Decimal(str(amount)),
+                    'exam_fee': Decimal('0'),
+                    'other_fee': Decimal('0'),
+                    'late_fee': Decimal('0'),
+                    'discount': Decimal('0'),
+                    'due_date': due_date,
+                    'paid_date': today if status == FeeStatus.PAID else None,
+                    'status': status,
+                    'notes': f'Monthly fee for {calendar.month_name[month]} {year}',
+                    'created_at': now,
+                    'updated_at': now
+                })
+                result.update(success=True, action='created', amount=amount, status=status.value)
+            elif amount == 0:
+                db.session.delete(fee)
+                result.update(success=True, action='deleted', fee_id=None)
+            else:
+                fee.amount = Decimal(str(amount))
+                fee.updated_at = now
+                if status is not None and status != fee.status:
+                    fee.status = status
+                    fee.paid_date = (fee.paid_date or today) if status == FeeStatus.PAID else None
+                result.update(success=True, action='updated', fee_id=fee.id,
+                              amount=float(fee.amount), status=fee.status.value)
+        
+        if created:
+            # New fees go in with one executemany
+            db.session.execute(insert(Fee.__table__), [row for _, row in created.values()])
+            for fee_id, student_id, year, month in db.session.execute(
+                db.select(Fee.id, Fee.user_id, Fee.period_year, Fee.period_month)
+                .where(
+                    Fee.batch_id == batch_id,
+                    Fee.period_year.in_(years),
+                    Fee.user_id.in_({key[0] for key in created})
+                ).order_by(Fee.id)
+            ):
+                if (student_id, year, month) in created:
+                    created[(student_id, year, month)][0]['fee_id'] = fee_id
+        
+        db.session.commit()
+        
+        succeeded = sum(1 for result in results if result['success'])
+        return success_response(f'Saved {succeeded} of {len(results)} fee(s)', {
+            'results': results,
+            'saved': succeeded,
+            'failed': len(results) - succeeded,
+            'batch_id': batch_id
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving fees: {str(e)}")
+        return error_response(f'Failed to save fees: {str(e)}', 500)
+
+
+@fees_bp.route('/reports/summary', methods=['GET'])
+@login_required
+@require_role(UserRole.TEACHER, UserRole.SUPER_USER)
+def get_fee_summary():
+    """
+    Fee collection summary and statistics
+    GET /api/fees/reports/summary?batch_id=1&month=1&year=2025
+    
+    Cached per (batch_id, month, year); saving a fee clears the affected entries.
+    """
+    try:
+        batch_id = request.args.get('batch_id', type=int)
+        month = request.args.get('month', type=int)
+        year = request.args.get('year', type=int)
+        
+        if month is not None and not (1 <= month <= 12):
+            return error_response('Month must be between 1 and 12', 400)
+        
+        summary = fee_summary_cache.get(batch_id, month, year)
+        return success_response('Fee summary retrieved', {'summary': summary})
+        
+    except Exception as e:
+        return error_response(f'Failed to get fee summary: {str(e)}', 500)
+
+
+@fees_bp.route('/overdue-sweep', methods=['GET', 'POST'])
+@login_required
+@require_role(UserRole.TEACHER, UserRole.SUPER_USER)
+def overdue_sweep():
+    """
+    Overdue fee sweep (also runs nightly)
+    GET  /api/fees/overdue-sweep - dry run: what would be marked overdue and who would be reminded
+    POST /api/fees/overdue-sweep - mark overdue, apply late fees, send reminders if enabled
+    """
+    try:
+        report = sweep_overdue_fees(dry_run=request.method == 'GET')
+        return success_response('Overdue sweep report' if report['dry_run'] else 'Overdue sweep completed', report)
+    except Exception as e:
+        db.session.rollback()
+        return error_response(f'Failed to sweep overdue fees: {str(e)}', 500)
+
+
+@fees_bp.route('/export', methods=['GET'])
+@login_required
+@require_role(UserRole.TEACHER, UserRole.SUPER_USER)
+def export_fees():
+    """
+    Export the fee ledger
+    GET /api/fees/export?batch_id=1&year=2025&format=csv
+    
+    batch_id: optional, all batches when omitted
+    year: optional, one year or a comma-separated list (2024,2025)
+    status: optional, pending / paid / overdue
+    format: csv (default, streamed as rows are read) or xlsx (needs openpyxl)
+    """
+    try:
+        batch_id = request.args.get('batch_id', type=int)
+        export_format = request.args.get('format', 'csv').lower()
+        
+        try:
+            years = [int(y) for y in request.args.get('year', '').split(',') if y.strip()]
+        except ValueError:
+            return error_response('year must be a year or a comma-separated list of years', 400)
+        
+        status = request.args.get('status')
+        if status:
+            try:
+                status = FeeStatus(status.lower())
+            except ValueError:
+                return error_response(f'Invalid status: {status}', 400)
+        
+        if export_format not in ('csv', 'xlsx'):
+            return error_response('format must be csv or xlsx', 400)
+        if export_format == 'xlsx' and not xlsx_available():
+            return error_response('XLSX export is not available on this server (openpyxl is not installed)', 501)
+        
+        if batch_id and not db.session.get(Batch, batch_id):
+            return error_response('Batch not found', 404)
+        
+        rows = iter_fee_rows(fee_export_statement(batch_id, years, status))
+        filename = f"fees_{f'batch{batch_id}' if batch_id else 'all'}_{'-'.join(map(str, years)) or 'all'}.{export_format}"
+        
+        if export_format == 'xlsx':
+            body = iter_xlsx(rows)
+            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        else:
+            body = iter_csv(rows)
+            mimetype = 'text/csv; charset=utf-8'
+        
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+        
+    except Exception as e:
+        return error_response(f'Failed to export fees: {str(e)}', 500)
+
+
 @fees_bp.route('/test', methods=['GET'])
 def test_endpoint():
     """Simple test endpoint to verify routes are working"""
@@ -314,6 +630,10 @@ def test_endpoint():
         'available_endpoints': [
             'GET /api/fees/load-monthly?batch_id=X&year=Y',
             'POST /api/fees/save-monthly',
+            'POST /api/fees/save-monthly-batch',
+            'GET /api/fees/reports/summary?batch_id=X&month=M&year=Y',
+            'GET|POST /api/fees/overdue-sweep',
+            'GET /api/fees/export?batch_id=X&year=Y&format=csv|xlsx',
             'GET /api/fees/test'
         ]
     })
@@ -7,6 +7,7 @@ from models import (db, MonthlyExam, IndividualExam, MonthlyMark, Batch, User,
                    UserRole, Settings, SmsLog, SmsStatus, Attendance, AttendanceStatus, MonthlyRanking)
 from utils.auth import login_required, require_role, get_current_user
 from utils.response import success_response, error_response
+from utils.phone import normalize_phone, e164_to_local
 from services.sms_service import send_bulk_notification
 from sqlalchemy import func, desc, case, and_, or_
 from datetime import datetime, date, timedelta
@@ -15,7 +16,6 @@ import calendar
 import logging
 import requests
 import os
-import re
 
 logger = logging.getLogger(__name__)
 
@@ -1678,23 +1678,6 @@ def get_subject_wise_marks(exam_id, user_id):
     
     return subject_marks
 
-def validate_phone_number(phone):
-    """Validate and format phone number"""
-    # Remove any non-digit characters
-    phone = re.sub(r'[^\d]', '', phone)
-    
-    # Handle country code
-    if phone.startswith('880'):
-        phone = phone[3:]
-    elif phone.startswith('+880'):
-        phone = phone[4:]
-    
-    # Validate Bangladesh mobile number format
-    if len(phone) == 11 and phone.startswith('01'):
-        return phone
-    
-    return None
-
 def get_sms_template(template_type):
     """Get SMS template - uses centralized utility"""
     from utils.sms_templates import get_sms_template as get_template_util
@@ -1708,19 +1691,8 @@ def get_default_template(template_type):
 def get_target_phone(student):
     """Get the target phone number for SMS (prefer guardian phone)"""
     try:
-        # Prefer guardian phone if available
-        if hasattr(student, 'guardian_phone') and student.guardian_phone:
-            formatted_phone = validate_phone_number(student.guardian_phone)
-            if formatted_phone:
-                return formatted_phone
-        
-        # Fall back to student phone
-        if student.phoneNumber:
-            formatted_phone = validate_phone_number(student.phoneNumber)
-            if formatted_phone:
-                return formatted_phone
-        
-        return None
+        # Prefer guardian phone, fall back to student phone (stored normalized columns)
+        return e164_to_local(student.guardian_phone_e164 or student.phone_e164)
         
     except Exception as e:
         logger.warning(f"Error getting target phone for student {student.id}: {e}")
@@ -1766,7 +1738,8 @@ def send_sms_notification(phone, message, current_user):
         api_url = "http://bulksmsbd.net/api/smsapi"
         
         # Format phone number
-        formatted_phone = validate_phone_number(phone)
+        phone_e164 = normalize_phone(phone)
+        formatted_phone = e164_to_local(phone_e164)
         if not formatted_phone:
             return {'success': False, 'error': 'Invalid phone number format'}
         
@@ -1788,9 +1761,9 @@ def send_sms_notification(phone, message, current_user):
         )
         
         # Find user by phone number for logging
-        user = User.query.filter_by(phoneNumber=formatted_phone).first()
-        if user:
-            sms_log.user_id = user.id
+        user_row = db.session.query(User.id).filter(User.phone_e164 == phone_e164).first()
+        if user_row:
+            sms_log.user_id = user_row.id
         
         # Send SMS
         response = requests.post(api_url, data=payload, timeout=30)
@@ -2,13 +2,18 @@
 Results Management Routes
 Monthly result calculation and reporting
 """
-from flask import Blueprint, request
-from models import db, MonthlyResult, User, Batch, ExamSubmission, Attendance, Fee, UserRole, AttendanceStatus, FeeStatus
+from flask import Blueprint, request, make_response
+from models import (db, MonthlyResult, User, Batch, ExamSubmission, Attendance, Fee, UserRole, AttendanceStatus,
+                    FeeStatus, SubmissionStatus, exam_batches, user_batches)
 from utils.auth import login_required, require_role, get_current_user, check_batch_access
 from utils.response import success_response, error_response, paginated_response
-from sqlalchemy import or_, and_, func, extract, case
-from datetime import datetime, date
+from utils.results_analytics import results_analytics_cache
+from sqlalchemy import or_, and_, func, case, select, update, bindparam
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, date, timedelta
 import calendar
+import hashlib
 
 results_bp = Blueprint('results', __name__)
 
@@ -27,6 +32,77 @@ def calculate_grade(percentage):
     else:
         return 'F'
 
+def _result_remarks(exam_percentage, attendance_percentage, fee_status):
+    """Remarks text for a monthly result"""
+    remarks = []
+    if exam_percentage >= 90:
+        remarks.append('Excellent performance')
+    elif exam_percentage >= 80:
+        remarks.append('Very good performance')
+    elif exam_percentage >= 70:
+        remarks.append('Good performance')
+    elif exam_percentage >= 60:
+        remarks.append('Satisfactory performance')
+    elif exam_percentage < 50:
+        remarks.append('Needs improvement')
+    
+    if attendance_percentage < 75:
+        remarks.append('Poor attendance')
+    elif attendance_percentage >= 95:
+        remarks.append('Excellent attendance')
+    
+    if fee_status == 'pending':
+        remarks.append('Fees pending')
+    
+    return '; '.join(remarks) if remarks else None
+
+def _batch_student_ids(batch_id):
+    """Select of the active student ids enrolled in a batch"""
+    return select(user_batches.c.user_id)\
+        .join(User, User.id == user_batches.c.user_id)\
+        .where(user_batches.c.batch_id == batch_id, User.role == UserRole.STUDENT, User.is_active == True)\
+        .order_by(user_batches.c.user_id)
+
+def _upsert_monthly_results():
+    """INSERT ... ON CONFLICT (unique_monthly_result) DO UPDATE for executemany"""
+    table = MonthlyResult.__table__
+    update_columns = ['total_exams', 'total_marks', 'obtained_marks', 'percentage', 'grade',
+                      'attendance_percentage', 'fee_status', 'remarks', 'calculated_at']
+    if db.engine.dialect.name == 'mysql':
+        statement = mysql_insert(table)
+        return statement.on_duplicate_key_update({c: statement.inserted[c] for c in update_columns})
+    statement = sqlite_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=['user_id', 'batch_id', 'month', 'year'],
+        set_={c: statement.excluded[c] for c in update_columns}
+    )
+
+def _rank_monthly_results(batch_id, month, year, student_ids):
+    """Competition ranking (1, 1, 3) by percentage: one window-function select and one executemany update"""
+    ranked = db.session.execute(
+        select(
+            MonthlyResult.id.label('result_id'),
+            func.rank().over(order_by=MonthlyResult.percentage.desc()).label('position')
+        ).where(
+            MonthlyResult.batch_id == batch_id,
+            MonthlyResult.month == month,
+            MonthlyResult.year == year,
+            MonthlyResult.user_id.in_(student_ids)
+        )
+    ).mappings().all()
+    if ranked:
+        table = MonthlyResult.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('result_id')).values(rank=bindparam('position')),
+            [dict(row) for row in ranked]
+        )
+
+def _conditional(response, etag):
+    """Tag a JSON response with an ETag; answers 304 when the client's copy is current"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @results_bp.route('', methods=['GET'])
 @login_required
 def get_monthly_results():
@@ -156,13 +232,11 @@ def calculate_monthly_results():
         if not batch:
             return error_response('Batch not found', 404)
         
-        # Get all students in batch
-        students = User.query.filter(
-            User.role == UserRole.STUDENT,
-            User.is_active == True
-        ).join(User.batches).filter(Batch.id == batch_id).all()
+        # Active students of the batch
+        student_ids = _batch_student_ids(batch_id)
+        student_id_list = db.session.scalars(student_ids).all()
         
-        if not students:
+        if not student_id_list:
             return error_response('No active students found in this batch', 404)
         
         # Calculate date range for the month
@@ -170,132 +244,71 @@ def calculate_monthly_results():
         last_day = calendar.monthrange(year, month)[1]
         end_date = date(year, month, last_day)
         
-        calculated_results = []
-        
-        for student in students:
-            # Check if result already exists
-            existing_result = MonthlyResult.query.filter_by(
-                user_id=student.id,
-                batch_id=batch_id,
-                month=month,
-                year=year
-            ).first()
-            
-            # Get exam submissions for the month
-            exam_submissions = db.session.query(ExamSubmission).join(
-                ExamSubmission.exam
-            ).filter(
-                ExamSubmission.user_id == student.id,
-                ExamSubmission.status == 'submitted',
-                func.date(ExamSubmission.submitted_at) >= start_date,
-                func.date(ExamSubmission.submitted_at) <= end_date
-            ).join(
-                ExamSubmission.exam.batches.any(Batch.id == batch_id)
-            ).all()
-            
-            # Calculate exam statistics
-            total_exams = len(exam_submissions)
-            total_marks = sum(submission.total_marks for submission in exam_submissions)
-            obtained_marks = sum(submission.obtained_marks for submission in exam_submissions)
+        # One grouped query per source, keyed by user_id
+        exam_stats = {row.user_id: row for row in db.session.query(
+            ExamSubmission.user_id,
+            func.count(ExamSubmission.id).label('total_exams'),
+            func.coalesce(func.sum(ExamSubmission.total_marks), 0).label('total_marks'),
+            func.coalesce(func.sum(ExamSubmission.obtained_marks), 0).label('obtained_marks')
+        ).join(exam_batches, exam_batches.c.exam_id == ExamSubmission.exam_id).filter(
+            exam_batches.c.batch_id == batch_id,
+            ExamSubmission.user_id.in_(student_ids),
+            ExamSubmission.status == SubmissionStatus.SUBMITTED,
+            ExamSubmission.submitted_at >= start_date,
+            ExamSubmission.submitted_at < end_date + timedelta(days=1)
+        ).group_by(ExamSubmission.user_id)}
+        
+        attendance_stats = dict(db.session.query(
+            Attendance.user_id,
+            func.sum(case((Attendance.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE]), 1), else_=0))
+            * 100.0 / func.count(Attendance.id)
+        ).filter(
+            Attendance.batch_id == batch_id,
+            Attendance.user_id.in_(student_ids),
+            Attendance.date >= start_date,
+            Attendance.date <= end_date
+        ).group_by(Attendance.user_id).all())
+        
+        fee_stats = {user_id: 'paid' if paid == count else 'pending' for user_id, count, paid in db.session.query(
+            Fee.user_id,
+            func.count(Fee.id),
+            func.sum(case((Fee.status == FeeStatus.PAID, 1), else_=0))
+        ).filter(
+            Fee.batch_id == batch_id,
+            *Fee.in_period(year, month),
+            Fee.user_id.in_(student_ids)
+        ).group_by(Fee.user_id)}
+        
+        calculated_at = datetime.utcnow()
+        rows = []
+        for student_id in student_id_list:
+            exams = exam_stats.get(student_id)
+            total_exams = exams.total_exams if exams else 0
+            total_marks = int(exams.total_marks) if exams else 0
+            obtained_marks = int(exams.obtained_marks) if exams else 0
             exam_percentage = (obtained_marks / total_marks * 100) if total_marks > 0 else 0
+            attendance_percentage = float(attendance_stats.get(student_id) or 0)
+            fee_status = fee_stats.get(student_id, 'no_fees')
             
-            # Calculate attendance for the month
-            attendance_records = Attendance.query.filter(
-                Attendance.user_id == student.id,
-                Attendance.batch_id == batch_id,
-                Attendance.date >= start_date,
-                Attendance.date <= end_date
-            ).all()
-            
-            if attendance_records:
-                present_count = len([a for a in attendance_records if a.status in [AttendanceStatus.PRESENT, AttendanceStatus.LATE]])
-                attendance_percentage = (present_count / len(attendance_records) * 100)
-            else:
-                attendance_percentage = 0
-            
-            # Check fee status for the month
-            fee_records = Fee.query.filter(
-                Fee.user_id == student.id,
-                Fee.batch_id == batch_id,
-                extract('month', Fee.due_date) == month,
-                extract('year', Fee.due_date) == year
-            ).all()
-            
-            if fee_records:
-                paid_fees = [f for f in fee_records if f.status == FeeStatus.PAID]
-                fee_status = 'paid' if len(paid_fees) == len(fee_records) else 'pending'
-            else:
-                fee_status = 'no_fees'
-            
-            # Calculate grade
-            grade = calculate_grade(exam_percentage)
-            
-            # Generate remarks
-            remarks = []
-            if exam_percentage >= 90:
-                remarks.append('Excellent performance')
-            elif exam_percentage >= 80:
-                remarks.append('Very good performance')
-            elif exam_percentage >= 70:
-                remarks.append('Good performance')
-            elif exam_percentage >= 60:
-                remarks.append('Satisfactory performance')
-            elif exam_percentage < 50:
-                remarks.append('Needs improvement')
-            
-            if attendance_percentage < 75:
-                remarks.append('Poor attendance')
-            elif attendance_percentage >= 95:
-                remarks.append('Excellent attendance')
-            
-            if fee_status == 'pending':
-                remarks.append('Fees pending')
-            
-            remarks_text = '; '.join(remarks) if remarks else None
-            
-            # Create or update monthly result
-            if existing_result:
-                existing_result.total_exams = total_exams
-                existing_result.total_marks = total_marks
-                existing_result.obtained_marks = obtained_marks
-                existing_result.percentage = round(exam_percentage, 2)
-                existing_result.grade = grade
-                existing_result.attendance_percentage = round(attendance_percentage, 2)
-                existing_result.fee_status = fee_status
-                existing_result.remarks = remarks_text
-                existing_result.calculated_at = datetime.utcnow()
-                result = existing_result
-            else:
-                result = MonthlyResult(
-                    user_id=student.id,
-                    batch_id=batch_id,
-                    month=month,
-                    year=year,
-                    total_exams=total_exams,
-                    total_marks=total_marks,
-                    obtained_marks=obtained_marks,
-                    percentage=round(exam_percentage, 2),
-                    grade=grade,
-                    attendance_percentage=round(attendance_percentage, 2),
-                    fee_status=fee_status,
-                    remarks=remarks_text
-                )
-                db.session.add(result)
-            
-            calculated_results.append(result)
-        
-        # Calculate ranks based on percentage
-        calculated_results.sort(key=lambda x: x.percentage, reverse=True)
-        
-        current_rank = 1
-        prev_percentage = None
-        
-        for i, result in enumerate(calculated_results):
-            if prev_percentage is not None and result.percentage < prev_percentage:
-                current_rank = i + 1
-            result.rank = current_rank
-            prev_percentage = result.percentage
+            rows.append({
+                'user_id': student_id,
+                'batch_id': batch_id,
+                'month': month,
+                'year': year,
+                'total_exams': total_exams,
+                'total_marks': total_marks,
+                'obtained_marks': obtained_marks,
+                'percentage': round(exam_percentage, 2),
+                'grade': calculate_grade(exam_percentage),
+                'attendance_percentage': round(attendance_percentage, 2),
+                'fee_status': fee_status,
+                'remarks': _result_remarks(exam_percentage, attendance_percentage, fee_status),
+                'calculated_at': calculated_at
+            })
         
+        # Insert or update every result in one statement, then rank with a window function
+        db.session.execute(_upsert_monthly_results(), rows)
+        _rank_monthly_results(batch_id, month, year, student_ids)
         db.session.commit()
         
         result_summary = {
@@ -304,12 +317,12 @@ def calculate_monthly_results():
             'month': month,
             'year': year,
             'month_name': calendar.month_name[month],
-            'total_students': len(calculated_results),
+            'total_students': len(rows),
             'calculated_at': datetime.utcnow().isoformat()
         }
         
         return success_response(
-            f'Monthly results calculated for {len(calculated_results)} students', 
+            f'Monthly results calculated for {len(rows)} students', 
             {'summary': result_summary}, 
             201
         )
@@ -407,6 +420,20 @@ def get_my_results():
         if year:
             query = query.filter(MonthlyResult.year == year)
         
+        # Summary and version of the student's results in one aggregate query;
+        # an unchanged version answers 304 without loading the rows
+        total_months, avg_percentage, avg_attendance, last_calculated = query.with_entities(
+            func.count(MonthlyResult.id),
+            func.avg(MonthlyResult.percentage),
+            func.avg(MonthlyResult.attendance_percentage),
+            func.max(MonthlyResult.calculated_at)
+        ).one()
+        etag = hashlib.sha1(
+            f"{current_user.id}:{batch_id}:{year}:{total_months}:{last_calculated}".encode('utf-8')
+        ).hexdigest()
+        if etag in request.if_none_match:
+            return _conditional(make_response('', 304), etag)
+        
         # Join with batch and order by month/year
         query = query.join(Batch).order_by(
             MonthlyResult.year.desc(),
@@ -440,27 +467,18 @@ def get_my_results():
             }
             results_data.append(result_data)
         
-        # Calculate overall statistics
-        if results_data:
-            avg_percentage = sum(r['percentage'] for r in results_data) / len(results_data)
-            best_performance = max(results_data, key=lambda x: x['percentage'])
-            avg_attendance = sum(r['attendance_percentage'] for r in results_data) / len(results_data)
-        else:
-            avg_percentage = 0
-            best_performance = None
-            avg_attendance = 0
-        
         summary = {
-            'total_months': len(results_data),
-            'average_percentage': round(avg_percentage, 2),
-            'best_performance': best_performance,
-            'average_attendance': round(avg_attendance, 2)
+            'total_months': total_months,
+            'average_percentage': round(float(avg_percentage or 0), 2),
+            'best_performance': max(results_data, key=lambda x: x['percentage']) if results_data else None,
+            'average_attendance': round(float(avg_attendance or 0), 2)
         }
         
-        return success_response('Student results retrieved', {
+        response, status = success_response('Student results retrieved', {
             'results': results_data,
             'summary': summary
         })
+        return _conditional(response, etag)
         
     except Exception as e:
         return error_response(f'Failed to get student results: {str(e)}', 500)
@@ -474,85 +492,16 @@ def get_results_analytics():
         batch_id = request.args.get('batch_id', type=int)
         year = request.args.get('year', datetime.now().year, type=int)
         
-        base_query = MonthlyResult.query.filter(MonthlyResult.year == year)
-        
         if batch_id:
             batch = Batch.query.filter_by(id=batch_id, is_active=True).first()
             if not batch:
                 return error_response('Batch not found', 404)
-            base_query = base_query.filter(MonthlyResult.batch_id == batch_id)
-        
-        # Monthly performance trends
-        monthly_stats = db.session.query(
-            MonthlyResult.month,
-            func.avg(MonthlyResult.percentage).label('avg_percentage'),
-            func.avg(MonthlyResult.attendance_percentage).label('avg_attendance'),
-            func.count(MonthlyResult.id).label('student_count')
-        ).filter(
-            MonthlyResult.year == year
-        )
-        
-        if batch_id:
-            monthly_stats = monthly_stats.filter(MonthlyResult.batch_id == batch_id)
-        
-        monthly_stats = monthly_stats.group_by(MonthlyResult.month).order_by(MonthlyResult.month).all()
-        
-        monthly_trends = []
-        for stat in monthly_stats:
-            monthly_trends.append({
-                'month': stat.month,
-                'month_name': calendar.month_name[stat.month],
-                'avg_percentage': round(float(stat.avg_percentage), 2),
-                'avg_attendance': round(float(stat.avg_attendance), 2),
-                'student_count': stat.student_count
-            })
-        
-        # Grade distribution
-        grade_distribution = db.session.query(
-            MonthlyResult.grade,
-            func.count(MonthlyResult.id).label('count')
-        ).filter(MonthlyResult.year == year)
-        
-        if batch_id:
-            grade_distribution = grade_distribution.filter(MonthlyResult.batch_id == batch_id)
-        
-        grade_distribution = grade_distribution.group_by(MonthlyResult.grade).all()
-        
-        grade_stats = [{'grade': grade.grade, 'count': grade.count} for grade in grade_distribution]
-        
-        # Top performers
-        top_performers = base_query.join(User).order_by(
-            MonthlyResult.percentage.desc()
-        ).limit(10).all()
         
-        top_performers_data = []
-        for result in top_performers:
-            top_performers_data.append({
-                'student_name': result.user.full_name,
-                'batch_name': result.batch.name if result.batch else 'Unknown',
-                'month': calendar.month_name[result.month],
-                'percentage': result.percentage,
-                'grade': result.grade,
-                'rank': result.rank
-            })
-        
-        # Overall statistics
-        total_results = base_query.count()
-        avg_performance = base_query.with_entities(func.avg(MonthlyResult.percentage)).scalar() or 0
-        avg_attendance = base_query.with_entities(func.avg(MonthlyResult.attendance_percentage)).scalar() or 0
-        
-        analytics = {
-            'year': year,
-            'batch_id': batch_id,
-            'total_results': total_results,
-            'average_performance': round(float(avg_performance), 2),
-            'average_attendance': round(float(avg_attendance), 2),
-            'monthly_trends': monthly_trends,
-            'grade_distribution': grade_stats,
-            'top_performers': top_performers_data
-        }
+        # Month series, grade histogram and top performers, precomputed per (batch, year)
+        analytics, etag = results_analytics_cache.get(batch_id, year)
         
-        return success_response('Results analytics retrieved', {'analytics': analytics})
+        response, status = success_response('Results analytics retrieved', {'analytics': analytics})
+        return _conditional(response, etag)
         
     except Exception as e:
         return error_response(f'Failed to get results analytics: {str(e)}', 500)
\ No newline at end of file
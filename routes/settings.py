@@ -4,7 +4,7 @@ Application settings and configuration
 """
 from flask import Blueprint, request, session
 from models import db, User, UserRole
-from utils.auth import login_required, require_role
+from utils.auth import login_required, require_role, get_current_user
 from utils.response import success_response, error_response
 
 settings_bp = Blueprint('settings', __name__)
@@ -14,8 +14,7 @@ settings_bp = Blueprint('settings', __name__)
 def get_settings():
     """Get application settings"""
     try:
-        user_id = session.get('user_id')
-        current_user = User.query.get(user_id)
+        current_user = get_current_user()
         
         # Basic settings that can be displayed
         settings = {
@@ -65,8 +64,7 @@ def update_settings():
 def get_profile_settings():
     """Get user profile settings"""
     try:
-        user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -93,8 +91,7 @@ def get_profile_settings():
 def update_profile_settings():
     """Update user profile settings"""
     try:
-        user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -2,21 +2,92 @@
 Simple Online Exams Routes - Teacher & Student Side
 Routes for creating and taking simple MCQ exams
 """
-from flask import Blueprint, request, jsonify, session
-from models import db, OnlineExam, ExamQuestion, StudentExamAttempt, Batch, User
-from utils.auth import login_required, get_current_user
+from flask import Blueprint, Response, request, jsonify, session
+from models import db, OnlineExam, ExamQuestion, StudentExamAttempt, Batch, User, UserRole
+from utils.auth import login_required, get_current_user, get_current_identity, get_current_user_id, get_current_user_role
+from utils.exam_payload_cache import exam_payload_cache, exam_payload_version, exam_related_names, payload_response_body
+from utils.exam_scoring import load_answer_key, attempt_vector, score_vector, score_percentage, regrade_exam
+from utils.exam_shuffle import attempt_permutations, unshuffle_answers
+from utils.exam_sweeper import attempt_expired, sweep_expired_attempts
+from utils.item_analysis import item_analysis_cache
+from sqlalchemy import func, update
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 import json
 
 simple_exams_bp = Blueprint('simple_exams', __name__)
 
+VALID_ANSWERS = ('A', 'B', 'C', 'D')
+MAX_AUTOSAVE_ANSWERS = 100  # Answer changes accepted per autosave flush
+
+
+def _parse_answer_deltas(answers):
+    """
+    Normalise {question_number: answer} from an autosave flush
+    A null answer clears the question. Raises ValueError on bad input.
+    """
+    if not isinstance(answers, dict):
+        raise ValueError('answers must be an object of question_number: answer')
+    if len(answers) > MAX_AUTOSAVE_ANSWERS:
+        raise ValueError(f'At most {MAX_AUTOSAVE_ANSWERS} answers per save')
+
+    delta = {}
+    for question_number, answer in answers.items():
+        try:
+            question_number = int(question_number)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid question number: {question_number}')
+        if question_number < 1:
+            raise ValueError(f'Invalid question number: {question_number}')
+        if answer is not None:
+            answer = str(answer).upper()
+            if answer not in VALID_ANSWERS:
+                raise ValueError(f'Question {question_number} has invalid answer')
+        delta[str(question_number)] = answer
+    return delta
+
+
+def _exam_payload_response(fields, payload):
+    """JSON response of fields plus the cached exam/questions payload"""
+    return Response(payload_response_body(fields, payload), mimetype='application/json')
+
+
+def _attempt_payload(payload, names, attempt_id, shuffle_version):
+    """The exam payload (with its related names) in an attempt's question and option order"""
+    if not shuffle_version:
+        return payload.render(names)
+    return payload.render(names, *attempt_permutations(attempt_id, shuffle_version, payload.question_count))
+
+
+def _merge_answers(exam_id, student_id, delta, seq=None):
+    """
+    Merge answer changes into the in-progress attempt with a single UPDATE
+    The JSON is patched in the database, so the attempt row is never loaded.
+    With seq, only a flush newer than the last applied one is written.
+    Returns the number of attempts updated.
+    """
+    merge_patch = func.json_merge_patch if db.engine.dialect.name == 'mysql' else func.json_patch
+    values = {'answers': merge_patch(func.coalesce(StudentExamAttempt.answers, '{}'), json.dumps(delta))}
+    statement = update(StudentExamAttempt).where(
+        StudentExamAttempt.exam_id == exam_id,
+        StudentExamAttempt.student_id == student_id,
+        StudentExamAttempt.status == 'in_progress'
+    )
+    if seq is not None:
+        statement = statement.where(StudentExamAttempt.answer_seq < seq)
+        values['answer_seq'] = seq
+
+    result = db.session.execute(statement.values(**values).execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
+
 # ============= TEACHER ROUTES =============
 
 @simple_exams_bp.route('/api/simple-exams', methods=['GET'])
 @login_required
 def get_exams():
     """Get all exams created by current teacher"""
-    if get_current_user().role != 'teacher':
+    if get_current_user_role() != UserRole.TEACHER:
         return jsonify({'error': 'Access denied'}), 403
     
     exams = OnlineExam.query.filter_by(created_by=get_current_user().id).order_by(OnlineExam.created_at.desc()).all()
@@ -31,11 +102,11 @@ def get_exam(exam_id):
     exam = OnlineExam.query.get_or_404(exam_id)
     
     # Check permission
-    if get_current_user().role == 'teacher' and exam.created_by != get_current_user().id:
+    if get_current_user_role() == UserRole.TEACHER and exam.created_by != get_current_user().id:
         return jsonify({'error': 'Access denied'}), 403
     
     exam_data = exam.to_dict()
-    exam_data['questions'] = [q.to_dict(include_answer=get_current_user().role == 'teacher') for q in exam.questions]
+    exam_data['questions'] = [q.to_dict(include_answer=get_current_user_role() == UserRole.TEACHER) for q in exam.questions]
     
     return jsonify(exam_data)
 
@@ -43,7 +114,7 @@ def get_exam(exam_id):
 @login_required
 def create_exam():
     """Create a new online exam with questions"""
-    if get_current_user().role != 'teacher':
+    if get_current_user_role() != UserRole.TEACHER:
         return jsonify({'error': 'Access denied'}), 403
     
     data = request.json
@@ -76,7 +147,8 @@ def create_exam():
             total_questions=len(questions),
             pass_marks=data.get('pass_marks', 40),
             created_by=get_current_user().id,
-            allow_retake=data.get('allow_retake', True)
+            allow_retake=data.get('allow_retake', True),
+            shuffle_questions=data.get('shuffle_questions') in (True, 'true', 1, '1')
         )
         db.session.add(exam)
         db.session.flush()  # Get exam.id
@@ -122,7 +194,7 @@ def create_exam():
 @login_required
 def delete_exam(exam_id):
     """Delete an exam"""
-    if get_current_user().role != 'teacher':
+    if get_current_user_role() != UserRole.TEACHER:
         return jsonify({'error': 'Access denied'}), 403
     
     exam = OnlineExam.query.get_or_404(exam_id)
@@ -135,6 +207,8 @@ def delete_exam(exam_id):
         # Questions and attempts will be cascade deleted
         db.session.delete(exam)
         db.session.commit()
+        exam_payload_cache.invalidate(exam_id)
+        item_analysis_cache.invalidate(exam_id)
         
         return jsonify({'message': 'Exam deleted successfully'})
         
@@ -142,11 +216,82 @@ def delete_exam(exam_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@simple_exams_bp.route('/api/simple-exams/<int:exam_id>/regrade', methods=['POST'])
+@login_required
+def regrade_exam_attempts(exam_id):
+    """
+    Re-score all submitted attempts of an exam
+    Optional body {answer_key: {question_number: 'A'|'B'|'C'|'D'}} corrects
+    the key first; both happen in one transaction.
+    """
+    if get_current_user_role() != UserRole.TEACHER:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    exam = OnlineExam.query.get_or_404(exam_id)
+    
+    # Check permission
+    if exam.created_by != get_current_user_id():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    corrections = (request.get_json(silent=True) or {}).get('answer_key') or {}
+    if not isinstance(corrections, dict):
+        return jsonify({'error': 'answer_key must be an object of question_number: answer'}), 400
+    
+    try:
+        if corrections:
+            try:
+                corrections = {int(number): str(answer).upper() for number, answer in corrections.items()}
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid question number in answer_key'}), 400
+            if any(answer not in VALID_ANSWERS for answer in corrections.values()):
+                return jsonify({'error': 'Correct answers must be A, B, C or D'}), 400
+            
+            questions = ExamQuestion.query.filter(
+                ExamQuestion.exam_id == exam_id,
+                ExamQuestion.question_number.in_(corrections)
+            ).all()
+            if len(questions) != len(corrections):
+                return jsonify({'error': 'answer_key refers to questions not in this exam'}), 400
+            for question in questions:
+                question.correct_answer = corrections[question.question_number]
+            db.session.flush()
+        
+        report = regrade_exam(exam)
+        db.session.commit()
+        
+        return jsonify({'message': 'Exam re-graded', 'corrected': len(corrections), **report})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@simple_exams_bp.route('/api/simple-exams/<int:exam_id>/item-analysis', methods=['GET'])
+@login_required
+def get_item_analysis(exam_id):
+    """Difficulty, discrimination and distractor statistics per question"""
+    if get_current_user_role() != UserRole.TEACHER:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    exam = OnlineExam.query.get_or_404(exam_id)
+    
+    # Check permission
+    if exam.created_by != get_current_user_id():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        return jsonify({
+            'exam_id': exam_id,
+            'title': exam.title,
+            'analysis': item_analysis_cache.get(exam_id)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @simple_exams_bp.route('/api/simple-exams/<int:exam_id>/results', methods=['GET'])
 @login_required
 def get_exam_results(exam_id):
     """Get all student results for an exam"""
-    if get_current_user().role != 'teacher':
+    if get_current_user_role() != UserRole.TEACHER:
         return jsonify({'error': 'Access denied'}), 403
     
     exam = OnlineExam.query.get_or_404(exam_id)
@@ -161,13 +306,18 @@ def get_exam_results(exam_id):
     ).order_by(StudentExamAttempt.submit_time.desc()).all()
     
     results = []
+    question_numbers = load_answer_key(exam_id).numbers
     for attempt in attempts:
         student = User.query.get(attempt.student_id)
+        attempt_data = attempt.to_dict()
+        attempt_data['answers'] = unshuffle_answers(
+            attempt_data['answers'], attempt.id, attempt.shuffle_version, question_numbers
+        )
         results.append({
-            'attempt': attempt.to_dict(),
+            'attempt': attempt_data,
             'student': {
                 'id': student.id,
-                'name': student.name,
+                'name': student.full_name,
                 'guardian_phone': student.guardian_phone
             }
         })
@@ -181,7 +331,7 @@ def get_exam_results(exam_id):
 @login_required
 def get_batches():
     """Get all batches for dropdown"""
-    if get_current_user().role != 'teacher':
+    if get_current_user_role() != UserRole.TEACHER:
         return jsonify({'error': 'Access denied'}), 403
     
     batches = Batch.query.filter_by(is_active=True).all()
@@ -195,11 +345,11 @@ def get_batches():
 @login_required
 def get_my_exams():
     """Get all available exams for current student"""
-    if get_current_user().role != 'student':
+    if get_current_user_role() != UserRole.STUDENT:
         return jsonify({'error': 'Access denied'}), 403
     
     # Get student's batch
-    student_batches = [e.batch_id for e in get_current_user().enrollments if e.is_active]
+    student_batches = get_current_identity().batch_ids
     
     if not student_batches:
         return jsonify({'exams': []})
@@ -231,37 +381,47 @@ def get_my_exams():
 @login_required
 def start_exam(exam_id):
     """Start an exam (create attempt record)"""
-    if get_current_user().role != 'student':
+    if get_current_user_role() != UserRole.STUDENT:
         return jsonify({'error': 'Access denied'}), 403
     
-    exam = OnlineExam.query.get_or_404(exam_id)
+    # Batch and creator come in the same query: their names are added to the cached payload
+    exam = OnlineExam.query.options(
+        joinedload(OnlineExam.batch), joinedload(OnlineExam.creator)
+    ).filter_by(id=exam_id).first_or_404()
     
     # Check if exam is active
     if not exam.is_active:
         return jsonify({'error': 'Exam is not active'}), 400
     
     # Check if student can take exam
-    student_batches = [e.batch_id for e in get_current_user().enrollments if e.is_active]
+    student_batches = get_current_identity().batch_ids
     if exam.batch_id not in student_batches:
         return jsonify({'error': 'You are not enrolled in this exam batch'}), 403
     
+    # Exam and questions (without answers), serialized once per exam version
+    payload = exam_payload_cache.get(exam)
+    names = exam_related_names(exam)
+    
     # Check for existing attempts
     last_attempt = StudentExamAttempt.query.filter_by(
         exam_id=exam_id,
-        student_id=get_current_user().id
+        student_id=get_current_user_id()
     ).order_by(StudentExamAttempt.attempt_number.desc()).first()
     
+    # An attempt left open past its deadline is auto-submitted before deciding
+    if last_attempt and last_attempt.status == 'in_progress' and attempt_expired(last_attempt, exam):
+        sweep_expired_attempts(exam_id=exam_id)
+        db.session.refresh(last_attempt)
+    
     # If in progress, resume
     if last_attempt and last_attempt.status == 'in_progress':
-        questions = [q.to_dict(include_answer=False) for q in sorted(exam.questions, key=lambda x: x.question_number)]
-        return jsonify({
+        return _exam_payload_response({
             'message': 'Resuming exam',
             'attempt_id': last_attempt.id,
-            'exam': exam.to_dict(),
-            'questions': questions,
             'existing_answers': last_attempt.get_answers(),
+            'answer_seq': last_attempt.answer_seq,
             'start_time': last_attempt.start_time.isoformat()
-        })
+        }, _attempt_payload(payload, names, last_attempt.id, last_attempt.shuffle_version))
     
     # Check if can retake
     if last_attempt and last_attempt.status in ['submitted', 'auto_submitted']:
@@ -271,31 +431,33 @@ def start_exam(exam_id):
     # Create new attempt
     attempt_number = (last_attempt.attempt_number + 1) if last_attempt else 1
     
+    start_time = datetime.utcnow()
+    # Shuffled exams seed each attempt's order with the exam version it started on
+    shuffle_version = exam_payload_version(exam) if exam.shuffle_questions else None
     attempt = StudentExamAttempt(
         exam_id=exam_id,
-        student_id=get_current_user().id,
+        student_id=get_current_user_id(),
         attempt_number=attempt_number,
-        status='in_progress'
+        start_time=start_time,
+        status='in_progress',
+        shuffle_version=shuffle_version
     )
     db.session.add(attempt)
+    db.session.flush()
+    attempt_id = attempt.id
     db.session.commit()
     
-    # Return exam with questions (without answers) - sorted by question number
-    questions = [q.to_dict(include_answer=False) for q in sorted(exam.questions, key=lambda x: x.question_number)]
-    
-    return jsonify({
+    return _exam_payload_response({
         'message': 'Exam started',
-        'attempt_id': attempt.id,
-        'exam': exam.to_dict(),
-        'questions': questions,
-        'start_time': attempt.start_time.isoformat()
-    })
+        'attempt_id': attempt_id,
+        'start_time': start_time.isoformat()
+    }, _attempt_payload(payload, names, attempt_id, shuffle_version))
 
 @simple_exams_bp.route('/api/exam/<int:exam_id>/save-answer', methods=['POST'])
 @login_required
 def save_answer(exam_id):
-    """Save student answer (auto-save)"""
-    if get_current_user().role != 'student':
+    """Save a single student answer (prefer the batched autosave)"""
+    if get_current_user_role() != UserRole.STUDENT:
         return jsonify({'error': 'Access denied'}), 403
     
     data = request.json
@@ -305,32 +467,85 @@ def save_answer(exam_id):
     if not question_number or not answer:
         return jsonify({'error': 'Question number and answer required'}), 400
     
-    # Get active attempt
-    attempt = StudentExamAttempt.query.filter_by(
+    try:
+        delta = _parse_answer_deltas({question_number: answer})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        if not _merge_answers(exam_id, get_current_user_id(), delta):
+            return jsonify({'error': 'No active attempt found'}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({'message': 'Answer saved'})
+
+@simple_exams_bp.route('/api/exam/<int:exam_id>/autosave', methods=['POST'])
+@login_required
+def autosave_answers(exam_id):
+    """
+    Save a batch of answer changes (autosave)
+    Body: {seq, answers: {question_number: 'A'|'B'|'C'|'D'|null}}. The client
+    sends every change not yet acknowledged with an increasing seq, so a
+    replayed or out-of-date flush is acknowledged without being written.
+    """
+    if get_current_user_role() != UserRole.STUDENT:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    seq = data.get('seq')
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+        return jsonify({'error': 'seq must be a positive integer'}), 400
+    
+    try:
+        delta = _parse_answer_deltas(data.get('answers', {}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    student_id = get_current_user_id()
+    try:
+        if _merge_answers(exam_id, student_id, delta, seq):
+            return jsonify({'message': 'Answers saved', 'seq': seq, 'saved': len(delta)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    # Nothing written: either this seq was already applied or there is no active attempt
+    applied_seq = db.session.query(StudentExamAttempt.answer_seq).filter_by(
         exam_id=exam_id,
-        student_id=get_current_user().id,
+        student_id=student_id,
         status='in_progress'
-    ).order_by(StudentExamAttempt.start_time.desc()).first()
+    ).order_by(StudentExamAttempt.start_time.desc()).limit(1).scalar()
     
-    if not attempt:
+    if applied_seq is None:
         return jsonify({'error': 'No active attempt found'}), 404
     
-    # Update answers JSON
-    answers = attempt.get_answers()
-    answers[str(question_number)] = answer.upper()
-    attempt.set_answers(answers)
-    
-    db.session.commit()
-    
-    return jsonify({'message': 'Answer saved'})
+    return jsonify({'message': 'Already saved', 'seq': applied_seq, 'duplicate': True})
 
 @simple_exams_bp.route('/api/exam/<int:exam_id>/submit', methods=['POST'])
 @login_required
 def submit_exam(exam_id):
-    """Submit exam and calculate score"""
-    if get_current_user().role != 'student':
+    """
+    Submit exam and calculate score
+    Optional body: {answers: {...}} with changes not yet acknowledged by
+    autosave; they are merged before scoring so the last answers count.
+    """
+    if get_current_user_role() != UserRole.STUDENT:
         return jsonify({'error': 'Access denied'}), 403
     
+    data = request.get_json(silent=True) or {}
+    try:
+        delta = _parse_answer_deltas(data.get('answers') or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if delta:
+        try:
+            _merge_answers(exam_id, get_current_user_id(), delta)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
     # Get active attempt
     attempt = StudentExamAttempt.query.filter_by(
         exam_id=exam_id,
@@ -346,20 +561,12 @@ def submit_exam(exam_id):
 def calculate_and_submit(attempt, auto_submit=False):
     """Calculate score and submit attempt"""
     exam = attempt.exam
-    student_answers = attempt.get_answers()
-    
-    # Calculate score
-    correct_count = 0
     total_questions = exam.total_questions
     
-    for question in exam.questions:
-        student_answer = student_answers.get(str(question.question_number), '').upper()
-        if student_answer == question.correct_answer:
-            correct_count += 1
-    
-    # Calculate percentage
-    score = correct_count
-    percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
+    # Compare the answer vector with the exam's key
+    key = load_answer_key(exam.id)
+    score = score_vector(key, attempt_vector(key, attempt.id, attempt.answers, attempt.shuffle_version))
+    percentage = score_percentage(score, total_questions)
     
     # Calculate time taken
     time_taken = int((datetime.utcnow() - attempt.start_time).total_seconds() / 60)
@@ -367,7 +574,7 @@ def calculate_and_submit(attempt, auto_submit=False):
     # Update attempt
     attempt.submit_time = datetime.utcnow()
     attempt.score = score
-    attempt.percentage = round(percentage, 2)
+    attempt.percentage = percentage
     attempt.time_taken_minutes = time_taken
     attempt.status = 'auto_submitted' if auto_submit else 'submitted'
     
@@ -377,7 +584,7 @@ def calculate_and_submit(attempt, auto_submit=False):
         'message': 'Exam submitted successfully' + (' (auto-submitted)' if auto_submit else ''),
         'score': score,
         'total_questions': total_questions,
-        'percentage': round(percentage, 2),
+        'percentage': percentage,
         'passed': percentage >= exam.pass_marks,
         'time_taken': time_taken,
         'can_retake': exam.allow_retake
@@ -387,7 +594,7 @@ def calculate_and_submit(attempt, auto_submit=False):
 @login_required
 def get_result(exam_id):
     """Get detailed result with explanations"""
-    if get_current_user().role != 'student':
+    if get_current_user_role() != UserRole.STUDENT:
         return jsonify({'error': 'Access denied'}), 403
     
     # Get last submitted attempt
@@ -402,11 +609,15 @@ def get_result(exam_id):
         return jsonify({'error': 'No submitted attempt found'}), 404
     
     exam = attempt.exam
-    student_answers = attempt.get_answers()
+    questions = sorted(exam.questions, key=lambda x: x.question_number)
+    # Shuffled attempts are shown with the options in their original order
+    student_answers = unshuffle_answers(
+        attempt.get_answers(), attempt.id, attempt.shuffle_version, [q.question_number for q in questions]
+    )
     
     # Build detailed results
     question_results = []
-    for question in sorted(exam.questions, key=lambda x: x.question_number):
+    for question in questions:
         student_answer = student_answers.get(str(question.question_number), '').upper()
         is_correct = student_answer == question.correct_answer
         
@@ -6,11 +6,11 @@ from flask import Blueprint, request, jsonify, session
 from models import db, SmsLog, User, Batch, UserRole, SmsStatus, user_batches
 from utils.auth import login_required, require_role, get_current_user
 from utils.response import success_response, error_response, paginated_response
+from utils.phone import normalize_phone, e164_to_local, gateway_phone
 from sqlalchemy import or_, func, extract
 from datetime import datetime, date, timedelta
 import requests
 import os
-import re
 
 sms_bp = Blueprint('sms', __name__)
 
@@ -96,23 +96,6 @@ def count_sms_characters(text):
             count += 1  # English and other characters count as 1
     return count
 
-def validate_phone_number(phone):
-    """Validate and format phone number"""
-    # Remove any non-digit characters
-    phone = re.sub(r'[^\d]', '', phone)
-    
-    # Handle country code
-    if phone.startswith('880'):
-        phone = phone[3:]
-    elif phone.startswith('+880'):
-        phone = phone[4:]
-    
-    # Validate Bangladesh mobile number format
-    if len(phone) == 11 and phone.startswith('01'):
-        return phone
-    
-    return None
-
 def send_sms_via_api(phone, message):
     """Send SMS using BulkSMSBD API - Hardcoded Configuration"""
     try:
@@ -121,14 +104,10 @@ def send_sms_via_api(phone, message):
         sender_id = '8809617628909'
         api_url = 'http://bulksmsbd.net/api/smsapi'
         
-        # Format phone number - remove any spaces or special characters
-        formatted_phone = phone.strip().replace(' ', '').replace('-', '').replace('+', '')
-        
-        # Ensure phone starts with 88 for Bangladesh
-        if formatted_phone.startswith('0'):
-            formatted_phone = '88' + formatted_phone
-        elif not formatted_phone.startswith('88'):
-            formatted_phone = '88' + formatted_phone
+        # Format phone number for the gateway (8801XXXXXXXXX)
+        formatted_phone = gateway_phone(phone)
+        if not formatted_phone:
+            return {'success': False, 'error': 'Invalid phone number format'}
         
         # Build URL with GET parameters
         params = {
@@ -196,6 +175,15 @@ def send_sms_via_api(phone, message):
     except Exception as e:
         return {'success': False, 'error': f'SMS API error: {str(e)}'}
 
+def resolve_user_ids_by_phone(phone_numbers):
+    """Map E.164 phone numbers to user IDs with a single indexed query"""
+    if not phone_numbers:
+        return {}
+    rows = db.session.query(User.id, User.phone_e164).filter(
+        User.phone_e164.in_(list(phone_numbers))
+    ).all()
+    return {row.phone_e164: row.id for row in rows}
+
 @sms_bp.route('/send', methods=['POST'])
 @login_required
 @require_role(UserRole.TEACHER, UserRole.SUPER_USER)
@@ -220,25 +208,23 @@ def send_sms():
         if char_count > 130:
             return error_response(f'Message exceeds character limit. Current: {char_count}/130 characters', 400)
         
-        # Collect phone numbers
-        phone_numbers = []
+        # Collect phone numbers (E.164)
+        phone_numbers = set()
         
         # Add direct phone numbers
         for phone in recipients:
-            formatted_phone = validate_phone_number(phone)
-            if formatted_phone:
-                phone_numbers.append(formatted_phone)
+            phone_e164 = normalize_phone(phone)
+            if phone_e164:
+                phone_numbers.add(phone_e164)
         
-        # Add phone numbers from user IDs
+        # Add stored normalized phone numbers from user IDs
         if user_ids:
-            users = User.query.filter(User.id.in_(user_ids), User.is_active == True).all()
-            for user in users:
-                formatted_phone = validate_phone_number(user.phone)
-                if formatted_phone:
-                    phone_numbers.append(formatted_phone)
+            rows = db.session.query(User.phone_e164).filter(
+                User.id.in_(user_ids), User.is_active == True, User.phone_e164.isnot(None)
+            ).all()
+            phone_numbers.update(row.phone_e164 for row in rows)
         
-        # Remove duplicates
-        phone_numbers = list(set(phone_numbers))
+        phone_numbers = list(phone_numbers)
         
         if not phone_numbers:
             return error_response('No valid phone numbers found', 400)
@@ -252,22 +238,23 @@ def send_sms():
         failed_count = 0
         sms_logs = []
         
-        for phone in phone_numbers:
+        # Resolve recipient users with one indexed lookup
+        user_ids_by_phone = resolve_user_ids_by_phone(phone_numbers)
+        
+        for phone_e164 in phone_numbers:
+            phone = e164_to_local(phone_e164)
+            
             # Create SMS log entry
             sms_log = SmsLog(
                 phone_number=phone,
                 message=message,
                 sent_by=current_user.id,
-                status=SmsStatus.PENDING
+                status=SmsStatus.PENDING,
+                user_id=user_ids_by_phone.get(phone_e164)
             )
             
-            # Find user by phone number
-            user = User.query.filter_by(phone=phone).first()
-            if user:
-                sms_log.user_id = user.id
-            
             # Send SMS
-            result = send_sms_via_api(phone, message)
+            result = send_sms_via_api(phone_e164, message)
             
             if result['success']:
                 sms_log.status = SmsStatus.SENT
@@ -339,23 +326,19 @@ def send_batch_sms():
             User.is_active == True
         ).join(user_batches).filter(user_batches.c.batch_id.in_(batch_ids)).distinct().all()
         
-        # Collect phone numbers
-        phone_numbers = []
+        # Collect stored normalized phone numbers (E.164)
+        phone_numbers = set()
         
         for student in students:
             # Add student's phone number
-            formatted_phone = validate_phone_number(student.phone)
-            if formatted_phone:
-                phone_numbers.append(formatted_phone)
+            if student.phone_e164:
+                phone_numbers.add(student.phone_e164)
             
             # Add guardian's phone number if requested
-            if include_guardians and student.guardian_phone:
-                guardian_phone = validate_phone_number(student.guardian_phone)
-                if guardian_phone:
-                    phone_numbers.append(guardian_phone)
+            if include_guardians and student.guardian_phone_e164:
+                phone_numbers.add(student.guardian_phone_e164)
         
-        # Remove duplicates
-        phone_numbers = list(set(phone_numbers))
+        phone_numbers = list(phone_numbers)
         
         if not phone_numbers:
             return error_response('No valid phone numbers found in selected batches', 400)
@@ -368,22 +351,23 @@ def send_batch_sms():
         sent_count = 0
         failed_count = 0
         
-        for phone in phone_numbers:
+        # Resolve recipient users with one indexed lookup
+        user_ids_by_phone = resolve_user_ids_by_phone(phone_numbers)
+        
+        for phone_e164 in phone_numbers:
+            phone = e164_to_local(phone_e164)
+            
             # Create SMS log entry
             sms_log = SmsLog(
                 phone_number=phone,
                 message=message,
                 sent_by=current_user.id,
-                status=SmsStatus.PENDING
+                status=SmsStatus.PENDING,
+                user_id=user_ids_by_phone.get(phone_e164)
             )
             
-            # Find user by phone number
-            user = User.query.filter_by(phone=phone).first()
-            if user:
-                sms_log.user_id = user.id
-            
             # Send SMS
-            result = send_sms_via_api(phone, message)
+            result = send_sms_via_api(phone_e164, message)
             
             if result['success']:
                 sms_log.status = SmsStatus.SENT
@@ -905,7 +889,7 @@ def send_bulk_sms():
         valid_recipients = []
         invalid_recipients = []
         for student in recipients:
-            phone = validate_phone_number(student.phoneNumber or '')
+            phone = e164_to_local(student.phone_e164)
             if phone:
                 valid_recipients.append((student, phone))
             else:
@@ -1071,7 +1055,7 @@ def send_bulk_sms_noauth():
 
         valid_recipients = []
         for student in recipients:
-            phone = validate_phone_number(student.phoneNumber or '')
+            phone = e164_to_local(student.phone_e164)
             if phone:
                 valid_recipients.append((student, phone))
 
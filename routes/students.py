@@ -2,16 +2,20 @@
 Student Management Routes
 CRUD operations specifically for student management from teacher dashboard
 """
-from flask import Blueprint, request, session
+from flask import Blueprint, request, session, current_app
 from flask_bcrypt import generate_password_hash
-from models import db, User, UserRole, Batch, user_batches
+from models import (db, User, UserRole, Batch, user_batches, Fee, FeeStatus, Attendance, AttendanceStatus,
+                    MonthlyExam, IndividualExam, MonthlyMark, MonthlyRanking)
 from utils.auth import login_required, require_role, get_current_user
 from utils.response import success_response, error_response, serialize_user
-from sqlalchemy import or_
-import re
+from utils.phone import local_phone, normalize_phone
+from utils.student_import import import_students, iter_csv_rows
+from utils.student_search import build_match_query, encode_cursor, decode_cursor, MATCH_FILTER
+from sqlalchemy import or_, text, tuple_, func, case, select
+from sqlalchemy.orm import selectinload
 import secrets
 import string
-from datetime import datetime
+from datetime import datetime, date
 
 students_bp = Blueprint('students', __name__)
 
@@ -22,24 +26,136 @@ def generate_password(length=8):
 
 def validate_phone(phone):
     """Validate and format phone number"""
-    phone = re.sub(r'[^\d]', '', phone)
+    return local_phone(phone)
+
+# Sparse fields for the paginated student list -> columns they need
+STUDENT_LIST_FIELDS = {
+    'id': (User.id,),
+    'firstName': (User.first_name,),
+    'lastName': (User.last_name,),
+    'phoneNumber': (User.phoneNumber,),
+    'email': (User.email,),
+    'studentId': (User.id, User.created_at),
+    'isActive': (User.is_active,),
+    'guardianName': (User.guardian_name,),
+    'guardianPhone': (User.guardian_phone,),
+    'motherName': (User.mother_name,),
+    'address': (User.address,),
+    'school': (User.address,),
+    'batchId': (),
+    'batch': (),
+}
+
+def _student_batches(student_ids):
+    """First enrolled batch per student, in one query"""
+    rows = db.session.query(user_batches.c.user_id, Batch.id, Batch.name, Batch.description)\
+        .join(Batch, Batch.id == user_batches.c.batch_id)\
+        .filter(user_batches.c.user_id.in_(student_ids))\
+        .order_by(user_batches.c.user_id, user_batches.c.enrollment_date, Batch.id)
+    batches = {}
+    for user_id, batch_id, name, description in rows:
+        batches.setdefault(user_id, {'id': batch_id, 'name': name, 'description': description})
+    return batches
+
+def _search_students():
+    """
+    Paginated student search
+    q: full-text query (FTS5 prefix match on name, phone, guardian, student id)
+    limit/cursor: keyset pagination ordered by name; pass back nextCursor
+    fields: comma-separated subset of STUDENT_LIST_FIELDS
+    batch_id, archived: filters
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    batch_id = request.args.get('batch_id', type=int)
+    archived = request.args.get('archived', 'false').lower() == 'true'
+    search = (request.args.get('q') or request.args.get('search') or '').strip()
+    
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(STUDENT_LIST_FIELDS)
+    unknown = [f for f in fields if f not in STUDENT_LIST_FIELDS]
+    if unknown:
+        return error_response(f'Unknown fields: {", ".join(unknown)}', 400)
+    
+    columns = [User.id, User.first_name, User.last_name]
+    for field in fields:
+        columns.extend(c for c in STUDENT_LIST_FIELDS[field] if c not in columns)
+    
+    query = db.session.query(*columns).filter(User.role == UserRole.STUDENT, User.is_archived == archived)
+    if not archived:
+        query = query.filter(User.is_active == True)
+    
+    if batch_id:
+        query = query.filter(User.id.in_(
+            db.session.query(user_batches.c.user_id).filter(user_batches.c.batch_id == batch_id)
+        ))
+    
+    if search:
+        if current_app.extensions.get('student_search_fts'):
+            match = build_match_query(search)
+            if match:
+                query = query.filter(text(MATCH_FILTER).bindparams(fts_match=match))
+        else:
+            query = query.filter(or_(
+                User.first_name.ilike(f'%{search}%'),
+                User.last_name.ilike(f'%{search}%'),
+                User.phoneNumber.ilike(f'%{search}%'),
+                User.guardian_name.ilike(f'%{search}%'),
+                User.guardian_phone.ilike(f'%{search}%')
+            ))
     
-    if phone.startswith('880'):
-        phone = phone[3:]
-    elif phone.startswith('+880'):
-        phone = phone[4:]
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            first_name, last_name, last_id = decode_cursor(cursor)
+        except ValueError:
+            return error_response('Invalid cursor', 400)
+        query = query.filter(tuple_(User.first_name, User.last_name, User.id) > tuple_(first_name, last_name, last_id))
     
-    if len(phone) == 11 and phone.startswith('01'):
-        return phone
+    rows = query.order_by(User.first_name, User.last_name, User.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    return None
+    batches = _student_batches([row.id for row in rows]) if rows and ('batch' in fields or 'batchId' in fields) else {}
+    
+    students_data = []
+    for row in rows:
+        values = {
+            'id': lambda: row.id,
+            'firstName': lambda: row.first_name,
+            'lastName': lambda: row.last_name,
+            'phoneNumber': lambda: row.phoneNumber or '',
+            'email': lambda: row.email,
+            'studentId': lambda: f"STU{(row.created_at or datetime.now()).year}{row.id:04d}",
+            'isActive': lambda: row.is_active,
+            'guardianName': lambda: row.guardian_name or '',
+            'guardianPhone': lambda: row.guardian_phone or '',
+            'motherName': lambda: row.mother_name or '',
+            'address': lambda: row.address or '',
+            'school': lambda: row.address or '',
+            'batch': lambda: batches.get(row.id),
+            'batchId': lambda: batches[row.id]['id'] if row.id in batches else None,
+        }
+        students_data.append({field: values[field]() for field in fields})
+    
+    next_cursor = encode_cursor([rows[-1].first_name, rows[-1].last_name, rows[-1].id]) if has_more else None
+    
+    return success_response('Students retrieved successfully', {
+        'students': students_data,
+        'nextCursor': next_cursor,
+        'hasMore': has_more
+    })
 
 @students_bp.route('', methods=['GET'])
 @login_required
 @require_role(UserRole.TEACHER, UserRole.SUPER_USER)
 def get_students():
-    """Get all students with their batch information (excludes archived)"""
+    """
+    Get all students with their batch information (excludes archived)
+    Passing q, limit, cursor or fields switches to the paginated search.
+    """
     try:
+        if any(param in request.args for param in ('q', 'limit', 'cursor', 'fields')):
+            return _search_students()
+        
         batch_id = request.args.get('batch_id', type=int)
         search = request.args.get('search', '').strip()
         
@@ -140,7 +256,7 @@ def create_student():
             
             # Check how many students already use this guardian phone
             existing_count = User.query.filter(
-                User.guardian_phone == guardian_phone_validated,
+                User.guardian_phone_e164 == normalize_phone(guardian_phone_validated),
                 User.role == UserRole.STUDENT
             ).count()
             
@@ -436,110 +552,254 @@ def reset_student_password(student_id):
         db.session.rollback()
         return error_response(f'Failed to reset password: {str(e)}', 500)
 
+PROFILE_SECTIONS = ('profile', 'batches', 'fees', 'attendance', 'marks', 'rankings')
+
+def _fee_total():
+    """amount + exam_fee + other_fee + late_fee - discount, as SQL"""
+    return (func.coalesce(Fee.amount, 0) + func.coalesce(Fee.exam_fee, 0) + func.coalesce(Fee.other_fee, 0)
+            + func.coalesce(Fee.late_fee, 0) - func.coalesce(Fee.discount, 0))
+
+def _profile_fees(student_id, recent):
+    """Fee totals in one conditional-aggregate query plus the most recent fees"""
+    total = _fee_total()
+    is_overdue = or_(Fee.status == FeeStatus.OVERDUE, (Fee.status == FeeStatus.PENDING) & (Fee.due_date < date.today()))
+    summary = db.session.query(
+        func.count(Fee.id),
+        func.coalesce(func.sum(total), 0),
+        func.coalesce(func.sum(case((Fee.status == FeeStatus.PAID, total), else_=0)), 0),
+        func.coalesce(func.sum(case((Fee.status != FeeStatus.PAID, total), else_=0)), 0),
+        func.coalesce(func.sum(case((is_overdue, 1), else_=0)), 0)
+    ).filter(Fee.user_id == student_id).one()
+    
+    rows = db.session.query(Fee, Batch.name)\
+        .join(Batch, Batch.id == Fee.batch_id)\
+        .filter(Fee.user_id == student_id)\
+        .order_by(Fee.due_date.desc(), Fee.id.desc())\
+        .limit(recent).all()
+    
+    return {
+        'summary': {
+            'totalFees': summary[0],
+            'totalAmount': float(summary[1]),
+            'paidAmount': float(summary[2]),
+            'dueAmount': float(summary[3]),
+            'overdueCount': int(summary[4])
+        },
+        'recent': [{
+            'id': fee.id,
+            'batchId': fee.batch_id,
+            'batchName': batch_name,
+            'amount': float(fee.amount or 0),
+            'examFee': float(fee.exam_fee or 0),
+            'otherFee': float(fee.other_fee or 0),
+            'lateFee': float(fee.late_fee or 0),
+            'discount': float(fee.discount or 0),
+            'dueDate': fee.due_date.isoformat() if fee.due_date else None,
+            'paidDate': fee.paid_date.isoformat() if fee.paid_date else None,
+            'status': fee.status.value if fee.status else None
+        } for fee, batch_name in rows]
+    }
+
+def _profile_attendance(student_id, recent):
+    """Attendance counts per status in one grouped query plus the most recent days"""
+    counts = {status.value: 0 for status in AttendanceStatus}
+    for status, count in db.session.query(Attendance.status, func.count(Attendance.id))\
+            .filter(Attendance.user_id == student_id).group_by(Attendance.status):
+        counts[status.value] = count
+    
+    total_days = sum(counts.values())
+    present_days = counts['present'] + counts['late']
+    
+    rows = db.session.query(Attendance.date, Attendance.status, Attendance.batch_id, Batch.name)\
+        .join(Batch, Batch.id == Attendance.batch_id)\
+        .filter(Attendance.user_id == student_id)\
+        .order_by(Attendance.date.desc())\
+        .limit(recent).all()
+    
+    return {
+        'summary': {
+            'totalDays': total_days,
+            'presentDays': counts['present'],
+            'absentDays': counts['absent'],
+            'lateDays': counts['late'],
+            'attendancePercentage': round(present_days / total_days * 100, 1) if total_days else 0
+        },
+        'recent': [{
+            'date': row.date.isoformat(),
+            'status': row.status.value,
+            'batchId': row.batch_id,
+            'batchName': row.name
+        } for row in rows]
+    }
+
+def _profile_marks(student_id):
+    """Monthly exam marks grouped by monthly exam, in one joined query"""
+    rows = db.session.query(
+        MonthlyExam.id, MonthlyExam.title, MonthlyExam.month, MonthlyExam.year,
+        IndividualExam.id.label('exam_id'), IndividualExam.title.label('exam_title'), IndividualExam.subject,
+        MonthlyMark.marks_obtained, MonthlyMark.total_marks, MonthlyMark.percentage,
+        MonthlyMark.grade, MonthlyMark.is_absent
+    ).join(MonthlyExam, MonthlyExam.id == MonthlyMark.monthly_exam_id)\
+        .join(IndividualExam, IndividualExam.id == MonthlyMark.individual_exam_id)\
+        .filter(MonthlyMark.user_id == student_id)\
+        .order_by(MonthlyExam.year.desc(), MonthlyExam.month.desc(), MonthlyExam.id.desc(), IndividualExam.order_index)
+    
+    exams = {}
+    for row in rows:
+        exam = exams.setdefault(row.id, {
+            'monthlyExamId': row.id,
+            'title': row.title,
+            'month': row.month,
+            'year': row.year,
+            'marks': []
+        })
+        exam['marks'].append({
+            'examId': row.exam_id,
+            'title': row.exam_title,
+            'subject': row.subject,
+            'marksObtained': row.marks_obtained,
+            'totalMarks': row.total_marks,
+            'percentage': row.percentage,
+            'grade': row.grade,
+            'isAbsent': row.is_absent
+        })
+    return list(exams.values())
+
+def _profile_rankings(student_id):
+    """Monthly rankings with the class size of each exam, in one query"""
+    participants = select(func.count(MonthlyRanking.id))\
+        .where(MonthlyRanking.monthly_exam_id == MonthlyExam.id)\
+        .correlate(MonthlyExam).scalar_subquery()
+    rows = db.session.query(MonthlyRanking, MonthlyExam.title, MonthlyExam.month, MonthlyExam.year, participants)\
+        .join(MonthlyExam, MonthlyExam.id == MonthlyRanking.monthly_exam_id)\
+        .filter(MonthlyRanking.user_id == student_id)\
+        .order_by(MonthlyExam.year.desc(), MonthlyExam.month.desc(), MonthlyExam.id.desc())
+    
+    return [{
+        'monthlyExamId': ranking.monthly_exam_id,
+        'title': title,
+        'month': month,
+        'year': year,
+        'position': ranking.position,
+        'previousPosition': ranking.previous_position,
+        'totalStudents': total_students,
+        'finalTotal': ranking.final_total,
+        'maxPossibleTotal': ranking.max_possible_total,
+        'percentage': ranking.percentage,
+        'grade': ranking.grade,
+        'gpa': ranking.gpa,
+        'isFinal': ranking.is_final
+    } for ranking, title, month, year, total_students in rows]
+
+@students_bp.route('/<int:student_id>/profile', methods=['GET'])
+@login_required
+@require_role(UserRole.TEACHER, UserRole.SUPER_USER)
+def get_student_profile(student_id):
+    """
+    Student 360 profile in one request
+    include: comma-separated subset of PROFILE_SECTIONS (default: all)
+    recent: number of recent fees / attendance days (default 10, max 100)
+    Each section costs a fixed number of queries, however much history the student has.
+    """
+    try:
+        include = [s.strip() for s in request.args.get('include', '').split(',') if s.strip()] or list(PROFILE_SECTIONS)
+        unknown = [s for s in include if s not in PROFILE_SECTIONS]
+        if unknown:
+            return error_response(f'Unknown sections: {", ".join(unknown)}', 400)
+        recent = min(max(request.args.get('recent', 10, type=int), 1), 100)
+        
+        query = User.query.filter(User.id == student_id, User.role == UserRole.STUDENT)
+        if 'batches' in include:
+            query = query.options(selectinload(User.batches))
+        student = query.first()
+        
+        if not student:
+            return error_response('Student not found', 404)
+        
+        data = {'id': student.id}
+        if 'profile' in include:
+            data['profile'] = {
+                'id': student.id,
+                'studentId': f"STU{(student.created_at or datetime.now()).year}{student.id:04d}",
+                'firstName': student.first_name,
+                'lastName': student.last_name,
+                'fullName': student.full_name,
+                'phoneNumber': student.phoneNumber or '',
+                'email': student.email,
+                'guardianName': student.guardian_name or '',
+                'guardianPhone': student.guardian_phone or '',
+                'motherName': student.mother_name or '',
+                'address': student.address or '',
+                'isActive': student.is_active,
+                'isArchived': student.is_archived,
+                'archiveReason': student.archive_reason,
+                'createdAt': student.created_at.isoformat() if student.created_at else None,
+                'lastLogin': student.last_login.isoformat() if student.last_login else None
+            }
+        
+        if 'batches' in include:
+            counts = Batch.student_counts([batch.id for batch in student.batches]) if student.batches else {}
+            data['batches'] = [{
+                'id': batch.id,
+                'name': batch.name,
+                'description': batch.description,
+                'isActive': batch.is_active,
+                'isArchived': batch.is_archived,
+                'currentStudents': counts.get(batch.id, {}).get('active_unarchived', 0)
+            } for batch in student.batches]
+        
+        if 'fees' in include:
+            data['fees'] = _profile_fees(student.id, recent)
+        if 'attendance' in include:
+            data['attendance'] = _profile_attendance(student.id, recent)
+        if 'marks' in include:
+            data['marks'] = _profile_marks(student.id)
+        if 'rankings' in include:
+            data['rankings'] = _profile_rankings(student.id)
+        
+        return success_response('Student profile retrieved successfully', data)
+        
+    except Exception as e:
+        return error_response(f'Failed to retrieve student profile: {str(e)}', 500)
+
 @students_bp.route('/bulk-import', methods=['POST'])
 @login_required
 @require_role(UserRole.TEACHER, UserRole.SUPER_USER)
 def bulk_import_students():
-    """Bulk import students from CSV data"""
+    """
+    Bulk import students
+    Accepts a CSV upload (multipart field "file", or a raw text/csv body) that
+    is streamed in chunks, or JSON {"students": [...]} for existing clients.
+    An optional batchId (query string / form / JSON) enrolls rows without one.
+    Chunks are committed as they go; see import_students for row outcomes.
+    """
     try:
-        data = request.get_json()
+        default_batch_id = request.args.get('batchId') or request.form.get('batchId')
         
-        if not data or 'students' not in data:
-            return error_response('Students data is required', 400)
-        
-        students_data = data['students']
-        successful_imports = []
-        failed_imports = []
+        if 'file' in request.files:
+            rows = iter_csv_rows(request.files['file'].stream)
+        elif request.mimetype in ('text/csv', 'application/csv'):
+            rows = iter_csv_rows(request.stream)
+        else:
+            data = request.get_json(silent=True)
+            if not data or 'students' not in data:
+                return error_response('Students data is required', 400)
+            rows = data['students']
+            default_batch_id = default_batch_id or data.get('batchId')
         
-        for idx, student_data in enumerate(students_data):
+        if default_batch_id is not None:
             try:
-                # Validate required fields
-                if not all(field in student_data for field in ['firstName', 'lastName', 'phoneNumber']):
-                    failed_imports.append({
-                        'row': idx + 1,
-                        'error': 'Missing required fields (firstName, lastName, phoneNumber)',
-                        'data': student_data
-                    })
-                    continue
-                
-                # Validate phone number
-                phone = validate_phone(student_data['phoneNumber'])
-                if not phone:
-                    failed_imports.append({
-                        'row': idx + 1,
-                        'error': 'Invalid phone number format',
-                        'data': student_data
-                    })
-                    continue
-                
-                # Check if student already exists
-                existing_user = User.query.filter_by(phoneNumber=phone).first()
-                if existing_user:
-                    failed_imports.append({
-                        'row': idx + 1,
-                        'error': 'Student with this phone number already exists',
-                        'data': student_data
-                    })
-                    continue
-                
-                # Generate student ID if not provided
-                student_id = student_data.get('studentId')
-                if not student_id:
-                    current_year = datetime.now().year
-                    count = User.query.filter(User.role == UserRole.STUDENT).count()
-                    student_id = f"{current_year}{count + len(successful_imports) + 1:04d}"
-                
-                # Create new student
-                student = User(
-                    phoneNumber=phone,  # This will be guardian phone for login
-                    first_name=student_data['firstName'].strip(),
-                    last_name=student_data['lastName'].strip(),
-                    email=student_data.get('email', '').strip() if student_data.get('email') else None,
-                    role=UserRole.STUDENT,
-                    is_active=True
-                )
-                
-                # Generate unique password for student
-                from utils.password_generator import generate_simple_unique_password
-                unique_password = generate_simple_unique_password(student_data['firstName'].strip(), phone)
-                student.password_hash = generate_password_hash(unique_password)
-                
-                db.session.add(student)
-                db.session.flush()
-                
-                # Assign to batch if provided
-                batch_id = student_data.get('batchId')
-                if batch_id:
-                    batch = Batch.query.get(batch_id)
-                    if batch:
-                        student.batches.append(batch)
-                
-                successful_imports.append({
-                    'row': idx + 1,
-                    'studentId': student_id,
-                    'name': f"{student.first_name} {student.last_name}",
-                    'phone': phone
-                })
-                
-            except Exception as e:
-                failed_imports.append({
-                    'row': idx + 1,
-                    'error': str(e),
-                    'data': student_data
-                })
-        
-        if successful_imports:
-            db.session.commit()
-        else:
-            db.session.rollback()
+                default_batch_id = int(default_batch_id)
+            except (TypeError, ValueError):
+                return error_response('Invalid batchId', 400)
         
-        return success_response('Bulk import completed', {
-            'successful': len(successful_imports),
-            'failed': len(failed_imports),
-            'successfulImports': successful_imports,
-            'failedImports': failed_imports
-        })
+        report = import_students(rows, default_batch_id=default_batch_id)
+        
+        return success_response('Bulk import completed', report.to_dict())
         
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return error_response('CSV file must be UTF-8 encoded', 400)
     except Exception as e:
         db.session.rollback()
         return error_response(f'Failed to import students: {str(e)}', 500)
@@ -11,6 +11,7 @@ from datetime import datetime
 from dataclasses import dataclass
 from flask import current_app
 from models import SmsLog, SmsTemplate, User, Settings, db
+from utils.phone import normalize_phone, gateway_phone
 
 logger = logging.getLogger(__name__)
 
@@ -349,8 +350,8 @@ def send_bulk_attendance_sms(attendance_data, batch_name, date, teacher_name):
             # Determine user if phone number provided
             logged_user = None
             if not user_id and message.recipient:
-                clean_phone = self.clean_phone_number(message.recipient)
-                logged_user = User.query.filter_by(phoneNumber=clean_phone).first()
+                phone_e164 = normalize_phone(message.recipient)
+                logged_user = User.query.filter_by(phone_e164=phone_e164).first() if phone_e164 else None
                 if logged_user:
                     user_id = logged_user.id
             
@@ -388,21 +389,8 @@ def send_bulk_attendance_sms(attendance_data, batch_name, date, teacher_name):
         return content
     
     def clean_phone_number(self, phone: str) -> str:
-        """Clean and format phone number"""
-        # Remove all non-digit characters
-        clean = ''.join(filter(str.isdigit, phone))
-        
-        # Handle Bangladesh phone numbers
-        if clean.startswith('88'):
-            clean = clean[2:]  # Remove country code
-        elif clean.startswith('0'):
-            clean = clean[1:]  # Remove leading zero
-        
-        # Add country code for international format
-        if len(clean) == 11 and clean.startswith('1'):
-            return f"88{clean}"
-        
-        return clean
+        """Clean and format phone number for the gateway (8801XXXXXXXXX)"""
+        return gateway_phone(phone) or ''.join(filter(str.isdigit, phone or ''))
     
     def contains_unicode(self, text: str) -> bool:
         """Check if text contains Unicode characters (Bengali)"""
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test archiving and restoring a batch with its students in bulk
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, UserRole, Batch
+from routes.batches import batches_bp
+from utils.session_claims import user_validity_cache
+
+
+def test_archive_and_restore_batch():
+    """Counts, epoch bumps, and restore matching only this batch's marker"""
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    app.register_blueprint(batches_bp, url_prefix='/api/batches')
+
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='T', last_name='One', password_hash='x',
+                       role=UserRole.TEACHER)
+        # Unescaped, LIKE would read _ and % in this name as wildcards matching "MathX100 extra"
+        batch = Batch(name='Math_100%', start_date=date(2026, 1, 1))
+        other = Batch(name='MathX100 extra', start_date=date(2026, 1, 1))
+        only_here = User(phoneNumber='01711111111', first_name='Amin', last_name='Rahman', password_hash='x')
+        also_other = User(phoneNumber='01722222222', first_name='Nila', last_name='Das', password_hash='x',
+                          is_archived=True, archive_reason='Archived with batch: MathX100 extra')
+        teacher.batches.append(batch)
+        only_here.batches.append(batch)
+        also_other.batches.extend([batch, other])
+        db.session.add_all([teacher, batch, other, only_here, also_other])
+        db.session.commit()
+        ids = {'teacher': teacher.id, 'batch': batch.id, 'only_here': only_here.id, 'also_other': also_other.id}
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = ids['teacher']
+        session['user_role'] = 'teacher'
+
+    def users():
+        with app.app_context():
+            return {name: (user.is_archived, user.auth_epoch, user.archive_reason)
+                    for name, user in ((name, db.session.get(User, ids[name]))
+                                       for name in ('teacher', 'only_here', 'also_other'))}
+
+    user_validity_cache.prime(ids['only_here'], True, 0)
+    response = client.post(f"/api/batches/{ids['batch']}/archive", json={'reason': 'Term over'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['data']['archived_students'] == 1
+    assert users() == {
+        'teacher': (False, 0, None),
+        'only_here': (True, 1, 'Archived with batch: Math_100%'),
+        'also_other': (True, 0, 'Archived with batch: MathX100 extra'),
+    }
+    # Sessions already checked in this process are re-validated on the next request
+    assert user_validity_cache.stats()['entries'] == 0
+
+    response = client.post(f"/api/batches/{ids['batch']}/restore", json={})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['data']['restored_students'] == 1
+    assert users() == {
+        'teacher': (False, 0, None),
+        'only_here': (False, 2, None),
+        'also_other': (True, 0, 'Archived with batch: MathX100 extra'),
+    }
+
+
+if __name__ == '__main__':
+    test_archive_and_restore_batch()
+    print("✅ Batch archive tests passed")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test parallel bulk password hashing
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import bcrypt
+from utils.bulk_credentials import hash_passwords
+
+
+def test_parallel_hashes_match_input_order():
+    """Hashes come back in input order and verify with bcrypt"""
+    passwords = [f'Student{i:04d}' for i in range(24)]
+    progress = []
+    hashes = hash_passwords(passwords, rounds=4, workers=2, chunk_size=8,
+                            progress=lambda done, total: progress.append((done, total)))
+
+    assert len(hashes) == len(passwords)
+    for password, password_hash in zip(passwords, hashes):
+        assert bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    assert progress == [(8, 24), (16, 24), (24, 24)]
+
+
+if __name__ == '__main__':
+    test_parallel_hashes_match_input_order()
+    print("✅ Bulk credential tests passed")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the batched exam autosave endpoint and the final submit
+"""
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, UserRole, Batch, OnlineExam, ExamQuestion, StudentExamAttempt
+from routes.simple_online_exams import simple_exams_bp, _parse_answer_deltas, MAX_AUTOSAVE_ANSWERS
+
+
+def test_answers_are_normalised():
+    """Question numbers become string keys, answers upper case, null clears"""
+    assert _parse_answer_deltas({1: 'a', '2': 'B', '3': None}) == {'1': 'A', '2': 'B', '3': None}
+
+
+def test_invalid_answers_are_rejected():
+    """Bad question numbers, answers and oversized flushes raise ValueError"""
+    for answers in ({'x': 'A'}, {'0': 'A'}, {'1': 'E'}, ['A'],
+                    {str(i): 'A' for i in range(1, MAX_AUTOSAVE_ANSWERS + 2)}):
+        try:
+            _parse_answer_deltas(answers)
+        except ValueError:
+            continue
+        raise AssertionError(f'{answers!r} was accepted')
+
+
+def _exam_client(answers=None):
+    """A student client with a three-question exam, and an in-progress attempt unless answers is False"""
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    app.register_blueprint(simple_exams_bp, url_prefix='/api/simple-exams')
+
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='T', last_name='One', password_hash='x', role=UserRole.TEACHER)
+        student = User(phoneNumber='01711111111', first_name='Amin', last_name='Rahman', password_hash='x')
+        batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+        db.session.add_all([teacher, student, batch])
+        db.session.flush()
+        exam = OnlineExam(batch_id=batch.id, title='Algebra', class_name='HSC', book_name='Math', chapter_name='1',
+                          duration_minutes=30, total_questions=3, created_by=teacher.id)
+        db.session.add(exam)
+        db.session.flush()
+        db.session.add_all([
+            ExamQuestion(exam_id=exam.id, question_number=n, question_text=f'Q{n}', option_a='a', option_b='b',
+                         option_c='c', option_d='d', correct_answer='A')
+            for n in (1, 2, 3)
+        ])
+        if answers is not False:
+            db.session.add(StudentExamAttempt(exam_id=exam.id, student_id=student.id, answers=json.dumps(answers or {})))
+        db.session.commit()
+        exam_id, student_id = exam.id, student.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = student_id
+        session['user_role'] = 'student'
+    return app, client, exam_id
+
+
+def _saved(app, exam_id):
+    """The stored answers and last applied seq of the exam's attempt"""
+    with app.app_context():
+        attempt = StudentExamAttempt.query.filter_by(exam_id=exam_id).one()
+        return json.loads(attempt.answers), attempt.answer_seq
+
+
+def test_autosave_applies_each_flush_once():
+    """Newer flushes are merged; replayed or older ones are acknowledged as duplicates"""
+    app, client, exam_id = _exam_client()
+    url = f'/api/simple-exams/api/exam/{exam_id}/autosave'
+
+    response = client.post(url, json={'seq': 1, 'answers': {'1': 'a', '2': 'B'}})
+    assert response.get_json() == {'message': 'Answers saved', 'seq': 1, 'saved': 2}
+    assert _saved(app, exam_id) == ({'1': 'A', '2': 'B'}, 1)
+
+    response = client.post(url, json={'seq': 3, 'answers': {'2': 'C', '3': 'D'}})
+    assert response.get_json()['seq'] == 3
+    assert _saved(app, exam_id) == ({'1': 'A', '2': 'C', '3': 'D'}, 3)
+
+    for seq in (3, 2):
+        response = client.post(url, json={'seq': seq, 'answers': {'1': 'D'}})
+        assert response.status_code == 200
+        assert response.get_json() == {'message': 'Already saved', 'seq': 3, 'duplicate': True}
+    assert _saved(app, exam_id) == ({'1': 'A', '2': 'C', '3': 'D'}, 3)
+
+    assert client.post(url, json={'answers': {'1': 'A'}}).status_code == 400
+    assert client.post(url, json={'seq': 4, 'answers': {'1': 'E'}}).status_code == 400
+
+
+def test_autosave_null_clears_the_answer():
+    """A null answer removes the question from the saved answers"""
+    app, client, exam_id = _exam_client({'1': 'A', '2': 'B'})
+    response = client.post(f'/api/simple-exams/api/exam/{exam_id}/autosave', json={'seq': 1, 'answers': {'2': None}})
+    assert response.status_code == 200, response.get_json()
+    assert _saved(app, exam_id) == ({'1': 'A'}, 1)
+
+
+def test_autosave_without_an_attempt_is_not_found():
+    """Flushes for an exam the student hasn't started get 404"""
+    _, client, exam_id = _exam_client(False)
+    response = client.post(f'/api/simple-exams/api/exam/{exam_id}/autosave', json={'seq': 1, 'answers': {'1': 'A'}})
+    assert response.status_code == 404
+
+
+def test_unsaved_answers_sent_with_submit_are_scored():
+    """Answers autosave never acknowledged are merged before the attempt is scored"""
+    # Autosave has saved questions 1 and 2; the change to 2 and question 3 are still unsent
+    _, client, exam_id = _exam_client({'1': 'A', '2': 'B'})
+
+    assert client.post(f'/api/simple-exams/api/exam/{exam_id}/submit', json={'answers': {'2': 'Z'}}).status_code == 400
+    response = client.post(f'/api/simple-exams/api/exam/{exam_id}/submit', json={'answers': {'2': 'A', '3': 'A'}})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['score'] == 3
+
+if __name__ == '__main__':
+    test_answers_are_normalised()
+    test_invalid_answers_are_rejected()
+    test_autosave_applies_each_flush_once()
+    test_autosave_null_clears_the_answer()
+    test_autosave_without_an_attempt_is_not_found()
+    test_unsaved_answers_sent_with_submit_are_scored()
+    print("✅ Exam autosave tests passed")
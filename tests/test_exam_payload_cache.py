@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test splicing of cached exam payloads into responses
+"""
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, UserRole, Batch, OnlineExam, ExamQuestion
+from routes.simple_online_exams import simple_exams_bp
+from utils.exam_payload_cache import exam_payload_cache, payload_response_body
+
+
+PAYLOAD = '"exam": {"id": 1, "title": "\\u09ac\\u09be\\u0982\\u09b2\\u09be"}, "questions": [{"question_number": 1}]'
+
+
+def test_payload_is_spliced_into_fields():
+    """The response is one valid JSON object with the fields and the payload"""
+    body = json.loads(payload_response_body({'message': 'Exam started', 'attempt_id': 7}, PAYLOAD))
+    assert body['attempt_id'] == 7
+    assert body['exam']['title'] == 'বাংলা'
+    assert body['questions'] == [{'question_number': 1}]
+
+
+def test_payload_without_fields():
+    """No leading comma when there are no other fields"""
+    assert json.loads(payload_response_body({}, PAYLOAD))['exam']['id'] == 1
+
+
+def test_renamed_batch_and_teacher_reach_cached_payloads():
+    """Batch and creator names aren't part of the cached exam version, so they are added per response"""
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    app.register_blueprint(simple_exams_bp, url_prefix='/api/simple-exams')
+
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='Karim', last_name='Sir', password_hash='x', role=UserRole.TEACHER)
+        student = User(phoneNumber='01711111111', first_name='Amin', last_name='Rahman', password_hash='x')
+        batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+        student.batches.append(batch)
+        db.session.add_all([teacher, student, batch])
+        db.session.flush()
+        exam = OnlineExam(batch_id=batch.id, title='Algebra', class_name='HSC', book_name='Math', chapter_name='1',
+                          duration_minutes=30, total_questions=1, created_by=teacher.id)
+        db.session.add(exam)
+        db.session.flush()
+        db.session.add(ExamQuestion(exam_id=exam.id, question_number=1, question_text='Q1', option_a='a',
+                                    option_b='b', option_c='c', option_d='d', correct_answer='A'))
+        db.session.commit()
+        ids = (exam.id, student.id, batch.id, teacher.id)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = ids[1]
+        session['user_role'] = 'student'
+
+    exam_payload_cache.invalidate(ids[0])
+    started = client.post(f'/api/simple-exams/api/exam/{ids[0]}/start').get_json()
+    assert (started['exam']['batch_name'], started['exam']['creator_name']) == ('HSC 2026', 'Karim Sir')
+
+    with app.app_context():
+        db.session.get(Batch, ids[2]).name = 'HSC 2026 (Morning)'
+        db.session.get(User, ids[3]).last_name = 'Uddin'
+        db.session.commit()
+
+    hits = exam_payload_cache.hits
+    resumed = client.post(f'/api/simple-exams/api/exam/{ids[0]}/start').get_json()
+    assert resumed['message'] == 'Resuming exam'
+    assert (resumed['exam']['batch_name'], resumed['exam']['creator_name']) == ('HSC 2026 (Morning)', 'Karim Uddin')
+    assert resumed['questions'] == started['questions']
+    assert exam_payload_cache.hits == hits + 1
+
+
+if __name__ == '__main__':
+    test_payload_is_spliced_into_fields()
+    test_payload_without_fields()
+    test_renamed_batch_and_teacher_reach_cached_payloads()
+    print("✅ Exam payload cache tests passed")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Test answer-vector scoring of online exam attempts
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.exam_scoring import AnswerKey, answer_vector, score_vector, score_attempts
+
+KEY = AnswerKey(numbers=(1, 2, 3, 4), answers=('A', 'B', 'C', 'D'))
+
+
+def test_answers_align_with_key():
+    """Answers are ordered by question number; missing ones are blank"""
+    assert answer_vector(KEY, '{"3": "c", "1": "A", "9": "B"}') == ('A', '', 'C', '')
+    assert answer_vector(KEY, None) == ('', '', '', '')
+
+
+def test_bulk_scoring():
+    """Each attempt is scored against the same key"""
+    results = score_attempts(KEY, [(1, {'1': 'A', '2': 'B'}), (2, '{"1": "B", "4": "D"}'), (3, '')], total_questions=4)
+    assert [(r['attempt_id'], r['score'], r['percentage']) for r in results] == [(1, 2, 50.0), (2, 1, 25.0), (3, 0, 0.0)]
+    assert score_vector(KEY, KEY.answers) == 4
+
+
+if __name__ == '__main__':
+    test_answers_align_with_key()
+    test_bulk_scoring()
+    print("✅ Exam scoring tests passed")
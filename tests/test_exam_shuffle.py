@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test deterministic exam shuffles and mapping answers back
+"""
+import json
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.exam_payload_cache import ExamPayload
+from utils.exam_shuffle import attempt_permutations, unshuffle_answers
+
+QUESTIONS = [
+    {'id': n, 'exam_id': 1, 'question_number': n, 'question_text': f'Q{n}',
+     'option_a': f'a{n}', 'option_b': f'b{n}', 'option_c': f'c{n}', 'option_d': f'd{n}'}
+    for n in range(1, 9)
+]
+
+
+def test_permutations_are_stable_per_attempt():
+    """Same attempt and version give the same order; other attempts differ"""
+    first = attempt_permutations(7, '20260301100000000000', 8)
+    assert first == attempt_permutations(7, '20260301100000000000', 8)
+    assert sorted(first[0]) == list(range(8))
+    assert all(sorted(order) == [0, 1, 2, 3] for order in first[1])
+    assert first != attempt_permutations(8, '20260301100000000000', 8)
+
+
+def test_permutations_never_change():
+    """Saved answers are decoded with these orders, so they must not drift across releases"""
+    assert attempt_permutations(7, '20260301100000000000', 8) == (
+        [6, 5, 2, 3, 1, 7, 4, 0],
+        [[1, 3, 2, 0], [1, 3, 0, 2], [2, 3, 0, 1], [0, 3, 1, 2],
+         [3, 1, 0, 2], [3, 2, 0, 1], [2, 0, 1, 3], [1, 2, 0, 3]]
+    )
+    assert attempt_permutations(12, '20260301100000000000', 3) == (
+        [2, 1, 0], [[3, 2, 0, 1], [2, 3, 0, 1], [1, 2, 0, 3]]
+    )
+    assert unshuffle_answers({'1': 'A', '2': 'b', '3': 'D'}, 12, '20260301100000000000', [1, 2, 3]) == \
+        {'1': 'D', '2': 'D', '3': 'D'}
+
+
+def test_rendered_payload_maps_back_to_original_options():
+    """A displayed letter is scored as the original option it shows"""
+    payload = ExamPayload({'exam': {'id': 1}, 'questions': QUESTIONS})
+    assert json.loads('{' + payload.render() + '}')['questions'] == QUESTIONS
+
+    version = '20260301100000000000'
+    shown = json.loads('{' + payload.render(None, *attempt_permutations(3, version, 8)) + '}')['questions']
+    assert sorted(q['question_number'] for q in shown) == list(range(1, 9))
+
+    # Pick whichever displayed letter shows the original option C
+    answers = {str(q['question_number']): next(l for l in 'ABCD' if q[f'option_{l.lower()}'].startswith('c'))
+               for q in shown}
+    original = unshuffle_answers(answers, 3, version, list(range(1, 9)))
+    assert original == {str(n): 'C' for n in range(1, 9)}
+
+
+def test_unshuffled_attempts_are_unchanged():
+    """Attempts without a shuffle version keep their answers"""
+    assert unshuffle_answers({'1': 'B'}, 3, None, [1]) == {'1': 'B'}
+
+
+if __name__ == '__main__':
+    test_permutations_are_stable_per_attempt()
+    test_permutations_never_change()
+    test_rendered_payload_maps_back_to_original_options()
+    test_unshuffled_attempts_are_unchanged()
+    print("✅ Exam shuffle tests passed")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test exam attempt deadline checks and the auto-submit sweep
+"""
+import json
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, UserRole, Batch, OnlineExam, ExamQuestion, StudentExamAttempt
+import utils.exam_sweeper as exam_sweeper
+from utils.exam_sweeper import attempt_expired, sweep_expired_attempts
+
+START = datetime(2026, 3, 1, 10, 0)
+EXAM = SimpleNamespace(duration_minutes=30)
+ATTEMPT = SimpleNamespace(start_time=START)
+
+
+def _app(grace_minutes):
+    app = Flask(__name__)
+    app.config['EXAM_SWEEP_GRACE_MINUTES'] = grace_minutes
+    return app
+
+
+def test_deadline_includes_grace():
+    """An attempt expires only after its duration plus the grace period"""
+    with _app(2).app_context():
+        assert not attempt_expired(ATTEMPT, EXAM, START + timedelta(minutes=31))
+        assert attempt_expired(ATTEMPT, EXAM, START + timedelta(minutes=32))
+
+
+def test_without_grace():
+    """With no grace, the attempt expires at its deadline"""
+    with _app(0).app_context():
+        assert not attempt_expired(ATTEMPT, EXAM, START + timedelta(minutes=29, seconds=59))
+        assert attempt_expired(ATTEMPT, EXAM, START + timedelta(minutes=30))
+
+
+def _sweep_app():
+    """An exam of 4 questions (all answered A), with one expired and one live attempt"""
+    app = _app(2)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='T', last_name='One', password_hash='x', role=UserRole.TEACHER)
+        students = [User(phoneNumber=f'0171111111{i}', first_name=f'S{i}', last_name='X', password_hash='x') for i in range(3)]
+        batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+        db.session.add_all([teacher, batch, *students])
+        db.session.flush()
+        exam = OnlineExam(batch_id=batch.id, title='Algebra', class_name='HSC', book_name='Math', chapter_name='1',
+                          duration_minutes=30, total_questions=4, created_by=teacher.id)
+        db.session.add(exam)
+        db.session.flush()
+        db.session.add_all([
+            ExamQuestion(exam_id=exam.id, question_number=n, question_text=f'Q{n}', option_a='a', option_b='b',
+                         option_c='c', option_d='d', correct_answer='A')
+            for n in range(1, 5)
+        ])
+        db.session.add_all([
+            StudentExamAttempt(exam_id=exam.id, student_id=students[0].id, start_time=START,
+                               answers=json.dumps({'1': 'A', '2': 'A', '3': 'B'})),
+            StudentExamAttempt(exam_id=exam.id, student_id=students[1].id, start_time=START + timedelta(minutes=20),
+                               answers=json.dumps({'1': 'A'})),
+            StudentExamAttempt(exam_id=exam.id, student_id=students[2].id, start_time=START,
+                               answers=json.dumps({'1': 'A'}), status='submitted', score=1, percentage=25.0,
+                               submit_time=START + timedelta(minutes=10)),
+        ])
+        db.session.commit()
+    return app
+
+
+def _attempts():
+    return [(a.status, a.score, a.percentage, a.submit_time, a.time_taken_minutes)
+            for a in StudentExamAttempt.query.order_by(StudentExamAttempt.id)]
+
+
+def test_sweep_submits_only_expired_attempts():
+    """The expired attempt is scored and closed at its deadline; a second run changes nothing"""
+    app = _sweep_app()
+    now = START + timedelta(minutes=40)
+    with app.app_context():
+        report = sweep_expired_attempts(now)
+        assert (report['expired_attempts'], report['exams'], report['auto_submitted']) == (1, 1, 1)
+        expected = [
+            ('auto_submitted', 2, 50.0, START + timedelta(minutes=30), 30),
+            ('in_progress', None, None, None, None),
+            ('submitted', 1, 25.0, START + timedelta(minutes=10), None),
+        ]
+        assert _attempts() == expected
+
+        report = sweep_expired_attempts(now)
+        assert (report['expired_attempts'], report['auto_submitted']) == (0, 0)
+        assert _attempts() == expected
+
+
+def test_sweep_skips_attempts_submitted_meanwhile():
+    """An attempt the student submits after it was selected keeps its own result"""
+    app = _sweep_app()
+    select_expired = exam_sweeper.expired_attempts
+
+    def submit_after_select(now, exam_id=None):
+        rows = select_expired(now, exam_id)
+        db.session.execute(db.update(StudentExamAttempt).where(StudentExamAttempt.id == rows[0].id)
+                           .values(status='submitted', score=3, percentage=75.0))
+        db.session.commit()
+        return rows
+
+    exam_sweeper.expired_attempts = submit_after_select
+    try:
+        with app.app_context():
+            report = sweep_expired_attempts(START + timedelta(minutes=40))
+            assert (report['expired_attempts'], report['auto_submitted']) == (1, 0)
+            assert _attempts()[0][:3] == ('submitted', 3, 75.0)
+    finally:
+        exam_sweeper.expired_attempts = select_expired
+
+
+if __name__ == '__main__':
+    test_deadline_includes_grace()
+    test_without_grace()
+    test_sweep_submits_only_expired_attempts()
+    test_sweep_skips_attempts_submitted_meanwhile()
+    print("✅ Exam sweeper tests passed")
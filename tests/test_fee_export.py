@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the streamed CSV and the XLSX fee ledger exports
+"""
+import csv
+import io
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, Batch, Fee, FeeStatus
+import utils.fee_export as fee_export
+from openpyxl import load_workbook
+from utils.fee_export import EXPORT_HEADERS, fee_export_statement, iter_fee_rows, iter_csv, iter_xlsx
+
+
+def _app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def _fees():
+    db.create_all()
+    batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+    student = User(phoneNumber='01711111111', first_name='আমিন', last_name='Rahman', password_hash='x')
+    db.session.add_all([
+        Fee(user=student, batch=batch, amount=500, late_fee=50, discount=20, due_date=date(2026, month, 28),
+            status=FeeStatus.PAID if month == 1 else FeeStatus.PENDING)
+        for month in range(1, 6)
+    ])
+    db.session.commit()
+    return batch
+
+
+def test_csv_export_streams_in_batches():
+    """BOM and header come first, then one chunk per batch of rows across yield_per fetches"""
+    original = fee_export.EXPORT_BATCH_SIZE
+    fee_export.EXPORT_BATCH_SIZE = 2
+    try:
+        with _app().app_context():
+            batch = _fees()
+            chunks = list(iter_csv(iter_fee_rows(fee_export_statement(batch.id, [2026]))))
+    finally:
+        fee_export.EXPORT_BATCH_SIZE = original
+
+    assert chunks[0].startswith('﻿')
+    assert list(csv.reader(io.StringIO(chunks[0][1:]))) == [EXPORT_HEADERS]
+    # 5 rows in batches of 2: two full chunks and the remainder
+    assert [len(list(csv.reader(io.StringIO(chunk)))) for chunk in chunks[1:]] == [2, 2, 1]
+
+    rows = list(csv.reader(io.StringIO(''.join(chunks)[1:])))[1:]
+    assert [row[7] for row in rows] == ['1', '2', '3', '4', '5']
+    assert rows[0][2] == 'আমিন Rahman'
+    assert (rows[0][14], rows[0][15], rows[1][15]) == ('530.0', 'paid', 'pending')
+
+
+def test_xlsx_export_holds_every_row():
+    """The saved workbook is sent back in chunks and reads back with every row"""
+    with _app().app_context():
+        batch = _fees()
+        statement = fee_export_statement(batch.id, [2026])
+        chunks = list(iter_xlsx(iter_fee_rows(statement), chunk_size=1024))
+
+    assert len(chunks) > 1 and all(len(chunk) == 1024 for chunk in chunks[:-1])
+    sheet = load_workbook(io.BytesIO(b''.join(chunks)), read_only=True)['Fees']
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert rows[0] == EXPORT_HEADERS
+    assert [row[7] for row in rows[1:]] == [1, 2, 3, 4, 5]
+    assert rows[1][2] == 'আমিন Rahman'
+    assert (rows[1][14], rows[1][15], rows[2][15]) == (530, 'paid', 'pending')
+
+
+if __name__ == '__main__':
+    test_csv_export_streams_in_batches()
+    test_xlsx_export_holds_every_row()
+    print("✅ Fee export tests passed")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the fee grid batch save with cells that succeed and cells that fail
+"""
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, UserRole, Batch, Fee, FeeStatus
+from routes.fees_new import fees_bp
+
+
+def test_mixed_results_are_reported_per_cell():
+    """Valid cells are saved while rejected ones come back with an error"""
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    app.register_blueprint(fees_bp, url_prefix='/api/fees')
+
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='T', last_name='One', password_hash='x', role=UserRole.TEACHER)
+        enrolled = User(phoneNumber='01711111111', first_name='Amin', last_name='Rahman', password_hash='x')
+        outsider = User(phoneNumber='01722222222', first_name='Nila', last_name='Das', password_hash='x')
+        batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+        enrolled.batches.append(batch)
+        db.session.add_all([teacher, enrolled, outsider, batch])
+        db.session.flush()
+        db.session.add(Fee(user_id=enrolled.id, batch_id=batch.id, amount=Decimal('400'),
+                           due_date=date(2026, 2, 28), status=FeeStatus.PENDING))
+        db.session.commit()
+        teacher_id, enrolled_id, outsider_id, batch_id = teacher.id, enrolled.id, outsider.id, batch.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = teacher_id
+        session['user_role'] = 'teacher'
+
+    response = client.post('/api/fees/save-monthly-batch', json={
+        'batch_id': batch_id,
+        'year': 2026,
+        'changes': [
+            {'student_id': enrolled_id, 'month': 1, 'amount': 500},
+            {'student_id': enrolled_id, 'month': 2, 'amount': 450},
+            {'student_id': outsider_id, 'month': 1, 'amount': 500},
+            {'student_id': enrolled_id, 'month': 13, 'amount': 500},
+        ]
+    })
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()['data']
+    assert (data['saved'], data['failed']) == (2, 2)
+
+    results = {(r['student_id'], r['month']): r for r in data['results']}
+    assert results[(enrolled_id, 1)]['action'] == 'created' and results[(enrolled_id, 1)]['fee_id']
+    assert results[(enrolled_id, 2)]['action'] == 'updated'
+    assert not results[(outsider_id, 1)]['success'] and 'not enrolled' in results[(outsider_id, 1)]['error']
+    assert not results[(enrolled_id, 13)]['success']
+
+    with app.app_context():
+        fees = {fee.period_month: fee for fee in Fee.query.filter_by(batch_id=batch_id)}
+        assert sorted(fees) == [1, 2]
+        assert (fees[1].amount, fees[2].amount) == (500, 450)
+        assert all(fee.user_id == enrolled_id for fee in fees.values())
+
+
+if __name__ == '__main__':
+    test_mixed_results_are_reported_per_cell()
+    print("✅ Fee grid save tests passed")
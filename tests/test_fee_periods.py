@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test that fee period queries use the composite period index
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import text
+from models import db, Fee, FeeStatus
+from utils.fee_summary import _period_filters
+
+
+def _app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def _plan(query):
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return ' / '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')))
+
+
+def test_period_columns_follow_due_date():
+    """period_year and period_month are generated from due_date"""
+    with _app().app_context():
+        db.create_all()
+        db.session.add(Fee(user_id=1, batch_id=1, amount=500, due_date=date(2025, 2, 28), status=FeeStatus.PENDING))
+        db.session.commit()
+        fee = Fee.query.filter(*Fee.in_period(2025, 2)).one()
+        assert (fee.period_year, fee.period_month) == (2025, 2)
+        assert Fee.query.filter(*Fee.in_period(2025, 3)).count() == 0
+
+
+def test_fee_queries_search_the_period_index():
+    """Grid loads, single-fee lookups and summaries are index searches, not scans"""
+    with _app().app_context():
+        db.create_all()
+        queries = [
+            Fee.query.filter(Fee.batch_id == 1, *Fee.in_period(2025)),
+            Fee.query.filter(Fee.user_id == 7, Fee.batch_id == 1, *Fee.in_period(2025, 1)),
+            Fee.query.filter(*_period_filters(1, 1, 2025)),
+        ]
+        for query in queries:
+            plan = _plan(query)
+            assert 'USING INDEX ix_fees_batch_period_user' in plan or 'USING COVERING INDEX ix_fees_batch_period_user' in plan, plan
+            assert 'period_year=?' in plan, plan
+
+
+if __name__ == '__main__':
+    test_period_columns_follow_due_date()
+    test_fee_queries_search_the_period_index()
+    print("✅ Fee period tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test that cached fee summaries follow fee writes from any process
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import update
+from models import db, Fee, FeeStatus
+from utils.fee_summary import FeeSummaryCache
+
+
+def _app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def _fees():
+    db.create_all()
+    db.session.add_all([
+        Fee(user_id=1, batch_id=1, amount=500, due_date=date(2026, 1, 31), status=FeeStatus.PENDING),
+        Fee(user_id=1, batch_id=1, amount=500, due_date=date(2026, 2, 28), status=FeeStatus.PENDING),
+        Fee(user_id=1, batch_id=2, amount=700, due_date=date(2026, 1, 31), status=FeeStatus.PENDING),
+    ])
+    db.session.commit()
+
+
+def _write_elsewhere(batch_id, month, **values):
+    """A Core UPDATE, as another worker's write looks to this process"""
+    db.session.execute(
+        update(Fee).where(Fee.batch_id == batch_id, *Fee.in_period(2026, month))
+        .values(updated_at=datetime.utcnow(), **values)
+    )
+    db.session.commit()
+
+
+def test_write_to_the_period_refreshes_the_summary():
+    """A fee changed outside this process's cache is picked up on the next get"""
+    with _app().app_context():
+        _fees()
+        cache = FeeSummaryCache()
+        assert cache.get(1, 1, 2026)['total_amount'] == 500
+        _write_elsewhere(1, 1, amount=650)
+        assert cache.get(1, 1, 2026)['total_amount'] == 650
+        assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_unrelated_writes_keep_the_summary_cached():
+    """Pending fees of other periods or batches don't touch the summary"""
+    with _app().app_context():
+        _fees()
+        cache = FeeSummaryCache()
+        cache.get(1, 1, 2026)
+        _write_elsewhere(1, 2, amount=800)
+        _write_elsewhere(2, 1, amount=900)
+        cache.get(1, 1, 2026)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_payment_in_another_period_refreshes_recent_payments():
+    """Recent payments span periods, so any payment in the batch is a change"""
+    with _app().app_context():
+        _fees()
+        cache = FeeSummaryCache()
+        cache.get(1, 1, 2026)
+        _write_elsewhere(1, 2, status=FeeStatus.PAID, paid_date=date.today())
+        cache.get(1, 1, 2026)
+        assert (cache.hits, cache.misses) == (0, 2)
+
+
+if __name__ == '__main__':
+    test_write_to_the_period_refreshes_the_summary()
+    test_unrelated_writes_keep_the_summary_cached()
+    test_payment_in_another_period_refreshes_recent_payments()
+    print("✅ Fee summary tests passed")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the overdue fee sweep and guardian reminders
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from models import db, User, Batch, Fee, FeeStatus, Settings, SmsLog
+import routes.sms
+from utils.fee_summary import FeeSummaryCache
+from utils.fee_sweeper import sweep_overdue_fees
+
+TODAY = date(2026, 3, 10)
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', FEE_LATE_FEE_AMOUNT=50, FEE_LATE_FEE_PERCENT=10,
+                      FEE_OVERDUE_GRACE_DAYS=0)
+    db.init_app(app)
+    return app
+
+
+def _student(first_name, phone, guardian_phone=None, is_active=True):
+    student = User(phoneNumber=phone, guardian_phone=guardian_phone, first_name=first_name,
+                   last_name='Rahman', password_hash='x', is_active=is_active)
+    db.session.add(student)
+    return student
+
+
+def _fee(student, batch, amount, due_date, status=FeeStatus.PENDING):
+    fee = Fee(user=student, batch=batch, amount=amount, due_date=due_date, status=status)
+    db.session.add(fee)
+    return fee
+
+
+def test_sweep_marks_past_due_fees_overdue_with_late_fee():
+    """Only PENDING fees past due change; a dry run writes nothing"""
+    with _app().app_context():
+        db.create_all()
+        batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+        student = _student('Amin', '01711111111')
+        past_due = _fee(student, batch, 500, date(2026, 2, 28))
+        not_due = _fee(student, batch, 500, date(2026, 3, 31))
+        paid = _fee(student, batch, 500, date(2026, 1, 31), FeeStatus.PAID)
+        db.session.commit()
+        summary_cache = FeeSummaryCache()
+        assert summary_cache.get(batch.id)['total_amount'] == 1500
+
+        report = sweep_overdue_fees(TODAY, dry_run=True)
+        assert (report['overdue_fees'], report['late_fees_applied']) == (1, 100.0)
+        assert db.session.get(Fee, past_due.id).status == FeeStatus.PENDING
+
+        report = sweep_overdue_fees(TODAY, send_reminders=False)
+        assert report['overdue_fees'] == 1
+        db.session.expire_all()
+        assert (past_due.status, float(past_due.late_fee)) == (FeeStatus.OVERDUE, 100.0)
+        assert (not_due.status, float(not_due.late_fee or 0)) == (FeeStatus.PENDING, 0)
+        assert paid.status == FeeStatus.PAID
+        # The swept rows' updated_at refreshes cached summaries in every process
+        assert summary_cache.get(batch.id)['total_amount'] == 1600
+
+        assert sweep_overdue_fees(TODAY, send_reminders=False)['overdue_fees'] == 0
+
+
+def test_one_reminder_per_guardian():
+    """Siblings share one SMS; templates with stray braces still render"""
+    sent = []
+    original = routes.sms.send_sms_via_api
+    routes.sms.send_sms_via_api = lambda phone, message: sent.append((phone, message)) or {'success': True}
+    try:
+        with _app().app_context():
+            db.create_all()
+            db.session.add(Settings(key='sms_template_fee_reminder', value={
+                'message': '{student_name}: {amount} BDT by {due_date} {0} {unknown}'}))
+            batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+            amin = _student('Amin', '01711111111', '01799999999')
+            bina = _student('Bina', '01722222222', '01799999999')
+            chaity = _student('Chaity', '01733333333')
+            dipu = _student('Dipu', '01744444444', '01799999999', is_active=False)
+            _fee(amin, batch, 500, date(2026, 2, 28))
+            _fee(bina, batch, 300, date(2026, 1, 31))
+            _fee(chaity, batch, 400, date(2026, 2, 28))
+            _fee(dipu, batch, 400, date(2026, 2, 28))
+            db.session.commit()
+
+            report = sweep_overdue_fees(TODAY, send_reminders=True)
+
+            assert (report['reminders'], report['reminders_sent'], report['reminders_failed']) == (2, 2, 0)
+            assert sorted(sent) == [
+                ('+8801733333333', 'Chaity Rahman: 490 BDT by 28/02/2026 {0} {unknown}'),
+                ('+8801799999999', 'Amin Rahman, Bina Rahman: 980 BDT by 31/01/2026 {0} {unknown}'),
+            ]
+            assert SmsLog.query.count() == 2
+    finally:
+        routes.sms.send_sms_via_api = original
+
+
+if __name__ == '__main__':
+    test_sweep_marks_past_due_fees_overdue_with_late_fee()
+    test_one_reminder_per_guardian()
+    print("✅ Fee sweeper tests passed")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test item analysis statistics against hand-computed values
+"""
+import random
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import item_analysis
+from utils.exam_scoring import AnswerKey
+
+KEY = AnswerKey(numbers=(1, 2), answers=('A', 'A'))
+ANSWERS = [{'1': 'A', '2': 'A'}, {'1': 'A', '2': 'B'}, {'1': 'C'}, '{"1": "A", "2": "A"}']
+
+
+def _check(analysis):
+    first, second = analysis['items']
+    assert (first['p_value'], second['p_value']) == (0.75, 0.5)
+    assert first['point_biserial'] == 0.5774 and second['point_biserial'] == 0.5774
+    assert analysis['kr20'] == 0.7273
+    assert first['distractors']['C'] == {'count': 1, 'share': 0.25}
+    assert second['blank'] == {'count': 1, 'share': 0.25}
+    assert 'too_hard' not in first['flags'] and first['flags'] == []
+
+
+def test_python_statistics():
+    """The pure-Python fallback matches the hand-computed statistics"""
+    numpy = item_analysis.np
+    item_analysis.np = None
+    try:
+        _check(item_analysis.compute_item_analysis(KEY, ANSWERS))
+    finally:
+        item_analysis.np = numpy
+
+
+def test_numpy_statistics():
+    """The NumPy matrix path (numpy is in requirements.txt) matches the same values"""
+    numpy = item_analysis.np
+    assert numpy is not None, 'numpy is not installed; run pip install -r requirements.txt'
+    analysis = item_analysis.compute_item_analysis(KEY, ANSWERS)
+    assert analysis['engine'] == 'numpy'
+    _check(analysis)
+
+    # Both engines agree on a larger random exam
+    rng = random.Random(7)
+    key = AnswerKey(numbers=tuple(range(1, 21)), answers=tuple(rng.choice('ABCD') for _ in range(20)))
+    answers = [{str(n): rng.choice('AABCD') for n in key.numbers} for _ in range(60)]
+    with_numpy = item_analysis.compute_item_analysis(key, answers)
+    item_analysis.np = None
+    try:
+        without_numpy = item_analysis.compute_item_analysis(key, answers)
+    finally:
+        item_analysis.np = numpy
+    assert {**with_numpy, 'engine': None} == {**without_numpy, 'engine': None}
+
+
+def test_no_attempts():
+    """An exam without submissions has no item statistics"""
+    assert item_analysis.compute_item_analysis(KEY, [])['items'] == []
+
+
+if __name__ == '__main__':
+    test_python_statistics()
+    test_numpy_statistics()
+    test_no_attempts()
+    print("✅ Item analysis tests passed")
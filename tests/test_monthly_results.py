@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the monthly results calculation: fixed query count, upserts and ranking
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import event
+from models import (db, User, UserRole, Batch, Exam, ExamSubmission, SubmissionStatus, Attendance,
+                    AttendanceStatus, Fee, FeeStatus, MonthlyResult)
+from routes.results import results_bp
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    app.register_blueprint(results_bp, url_prefix='/api/results')
+    return app
+
+
+def _batch(name, scores):
+    """A batch whose students scored `scores` out of 100 in one March exam"""
+    teacher = User.query.filter_by(role=UserRole.TEACHER).first()
+    batch = Batch(name=name, start_date=date(2026, 1, 1))
+    exam = Exam(title=f'{name} test', duration=60, total_marks=100, created_by=teacher.id,
+                start_time=datetime(2026, 3, 10, 10), end_time=datetime(2026, 3, 10, 11))
+    exam.batches.append(batch)
+    db.session.add_all([batch, exam])
+    first = User.query.count()
+    for i, score in enumerate(scores):
+        student = User(phoneNumber=f'0171{first + i:07d}', first_name=f'Student{i}', last_name=name,
+                       password_hash='x')
+        student.batches.append(batch)
+        db.session.add_all([
+            student,
+            ExamSubmission(exam=exam, user=student, submitted_at=datetime(2026, 3, 10, 11), total_marks=100,
+                           obtained_marks=score, status=SubmissionStatus.SUBMITTED),
+            Attendance(user=student, batch=batch, date=date(2026, 3, 5), status=AttendanceStatus.PRESENT),
+            Fee(user=student, batch=batch, amount=500, due_date=date(2026, 3, 31), status=FeeStatus.PAID),
+        ])
+    db.session.commit()
+    return batch.id
+
+
+def _setup(app):
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='T', last_name='One', password_hash='x',
+                       role=UserRole.TEACHER)
+        db.session.add(teacher)
+        db.session.commit()
+        teacher_id = teacher.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = teacher_id
+        session['user_role'] = 'teacher'
+    return client
+
+
+def _calculate(app, client, batch_id):
+    """Run the calculation and return the number of statements it executed"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.post('/api/results/calculate', json={'batch_id': batch_id, 'month': 3, 'year': 2026})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 201, response.get_json()
+    return len(statements)
+
+
+def _results(app, batch_id):
+    with app.app_context():
+        return [(r.user.first_name, r.percentage, r.rank, r.fee_status)
+                for r in MonthlyResult.query.filter_by(batch_id=batch_id).order_by(MonthlyResult.user_id)]
+
+
+def test_query_count_does_not_grow_with_students():
+    """Three and twelve students take the same number of statements"""
+    app = _app()
+    client = _setup(app)
+    with app.app_context():
+        small = _batch('Small', [50, 60, 70])
+        large = _batch('Large', list(range(40, 100, 5)))
+    assert _calculate(app, client, small) == _calculate(app, client, large)
+    assert len(_results(app, large)) == 12
+
+
+def test_recalculation_updates_rows_in_place():
+    """A second run updates the existing results instead of adding new ones"""
+    app = _app()
+    client = _setup(app)
+    with app.app_context():
+        batch_id = _batch('Physics', [50, 80])
+    _calculate(app, client, batch_id)
+    with app.app_context():
+        ids = [r.id for r in MonthlyResult.query.order_by(MonthlyResult.id)]
+        submission = ExamSubmission.query.filter_by(obtained_marks=50).one()
+        submission.obtained_marks = 90
+        db.session.commit()
+
+    _calculate(app, client, batch_id)
+    with app.app_context():
+        assert [r.id for r in MonthlyResult.query.order_by(MonthlyResult.id)] == ids
+    assert _results(app, batch_id) == [('Student0', 90.0, 1, 'paid'), ('Student1', 80.0, 2, 'paid')]
+
+
+def test_tied_totals_share_a_rank():
+    """Equal percentages get the same rank and the next rank is skipped"""
+    app = _app()
+    client = _setup(app)
+    with app.app_context():
+        batch_id = _batch('Chemistry', [70, 90, 70, 60])
+    _calculate(app, client, batch_id)
+    assert [(name, rank) for name, _, rank, _ in _results(app, batch_id)] == [
+        ('Student0', 2), ('Student1', 1), ('Student2', 2), ('Student3', 4)
+    ]
+
+
+if __name__ == '__main__':
+    test_query_count_does_not_grow_with_students()
+    test_recalculation_updates_rows_in_place()
+    test_tied_totals_share_a_rank()
+    print("✅ Monthly results tests passed")
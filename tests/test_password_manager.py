@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite-backed student password store and its JSON migration
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from werkzeug.security import generate_password_hash
+import utils.password_manager as password_manager
+from migrate_student_passwords_to_sqlite import migrate_student_passwords
+
+
+def _use_store(directory):
+    """Point the module at a fresh database file"""
+    password_manager.PASSWORD_DB = os.path.join(directory, 'student_passwords.db')
+    password_manager._local.conn = None
+
+
+def test_store_lookup_and_overwrite():
+    """A phone keeps one row however it is written; a new password replaces the old one"""
+    _use_store(tempfile.mkdtemp())
+    assert password_manager.set_student_password('01712345678', 'AB1234cd') == 'AB1234cd'
+    assert password_manager.verify_student_password('+8801712345678', 'AB1234cd')
+    assert password_manager.get_student_password('8801712345678') == 'AB1234cd'
+
+    generated = password_manager.set_student_password('+8801712345678')
+    assert generated != 'AB1234cd'
+    assert not password_manager.verify_student_password('01712345678', 'AB1234cd')
+    assert password_manager.verify_student_password('01712345678', generated)
+    assert len(password_manager.load_passwords()) == 1
+
+    assert password_manager.remove_plain_password('01712345678')
+    assert password_manager.get_all_student_passwords()[0]['password'] == 'Password already collected'
+    assert password_manager.delete_student_password('01712345678')
+    assert not password_manager.verify_student_password('01712345678', generated)
+
+
+def test_migration_can_run_twice():
+    """The JSON file is imported once and existing rows are never overwritten"""
+    directory = tempfile.mkdtemp()
+    _use_store(directory)
+    password_manager.set_student_password('01812345678', 'NEWpass1')
+
+    json_path = os.path.join(directory, 'student_passwords.json')
+    with open(json_path, 'w') as f:
+        json.dump({
+            '01712345678': {'password_hash': generate_password_hash('OLDpass1'), 'plain': 'OLDpass1'},
+            '01812345678': {'password_hash': generate_password_hash('stale')},
+            '01912345678': {'plain': 'no hash'}
+        }, f)
+
+    assert migrate_student_passwords(json_path)
+    assert not os.path.exists(json_path) and os.path.exists(json_path + '.imported')
+    assert migrate_student_passwords(json_path)
+
+    assert password_manager.verify_student_password('01712345678', 'OLDpass1')
+    assert password_manager.verify_student_password('01812345678', 'NEWpass1')
+    assert len(password_manager.load_passwords()) == 2
+
+    # Re-importing a restored copy changes nothing
+    assert password_manager.import_json_passwords(json_path + '.imported') == (0, 3)
+
+
+if __name__ == '__main__':
+    test_store_lookup_and_overwrite()
+    test_migration_can_run_twice()
+    print("✅ Password manager tests passed")
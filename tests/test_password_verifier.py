@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test the login password verification service
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import tempfile
+
+import bcrypt
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from utils.password_verifier import PasswordVerifier, LoginThrottled, VerifierBusy, check_password
+
+
+def test_check_password_accepts_bcrypt_and_werkzeug_hashes():
+    """Both hash formats stored in the users table verify"""
+    bcrypt_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('utf-8')
+    assert check_password(bcrypt_hash, 'secret')
+    assert check_password(generate_password_hash('secret'), 'secret')
+    assert not check_password(bcrypt_hash, 'wrong')
+    assert not check_password('not-a-hash', 'secret')
+    assert not check_password(None, 'secret')
+
+
+def test_failed_pair_is_negatively_cached():
+    """Repeating a wrong password is rejected without hashing again"""
+    verifier = PasswordVerifier()
+    password_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('utf-8')
+    assert not verifier.verify('+8801712345678', password_hash, 'wrong')
+    assert not verifier.verify('+8801712345678', password_hash, 'wrong')
+    assert verifier.stats == {'verified': 1, 'negative_hits': 1, 'rejected_busy': 0, 'throttled': 0}
+    assert verifier.verify('+8801712345678', password_hash, 'secret')
+
+
+def test_phone_is_throttled_after_repeated_failures():
+    """Five failures block the phone until the window passes or a login succeeds"""
+    verifier = PasswordVerifier()
+    for _ in range(5):
+        verifier.check_throttle('+8801712345678')
+        verifier.record_failure('+8801712345678')
+    try:
+        verifier.check_throttle('+8801712345678')
+        assert False, 'expected LoginThrottled'
+    except LoginThrottled as e:
+        assert e.retry_after > 0
+    verifier.check_throttle('+8801812345678')
+    verifier.record_success('+8801712345678')
+    verifier.check_throttle('+8801712345678')
+
+
+def test_verification_fails_fast_when_all_slots_are_held():
+    """Slots are lock files, so holders in any process count against the cap"""
+    app = Flask(__name__)
+    app.config.update(LOGIN_VERIFY_SLOTS=2, LOGIN_VERIFY_SLOT_DIR=tempfile.mkdtemp())
+    verifier = PasswordVerifier()
+    password_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('utf-8')
+    with app.app_context():
+        held = [verifier._acquire_slot(), verifier._acquire_slot()]
+        assert verifier._acquire_slot() is None
+        try:
+            verifier.verify('+8801712345678', password_hash, 'secret')
+            assert False, 'expected VerifierBusy'
+        except VerifierBusy:
+            assert verifier.stats['rejected_busy'] == 1
+        held[0].release()
+        assert verifier.verify('+8801712345678', password_hash, 'secret')
+        held[1].release()
+
+
+if __name__ == '__main__':
+    test_check_password_accepts_bcrypt_and_werkzeug_hashes()
+    test_failed_pair_is_negatively_cached()
+    test_phone_is_throttled_after_repeated_failures()
+    test_verification_fails_fast_when_all_slots_are_held()
+    print("✅ Password verifier tests passed")
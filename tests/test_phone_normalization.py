@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test phone number normalization helpers
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.phone import normalize_phone, local_phone, gateway_phone, e164_to_local
+
+
+def test_normalize_accepts_common_formats():
+    """All common ways of writing the same number map to one E.164 value"""
+    for raw in ['01712345678', '1712345678', '8801712345678', '+880 1712-345678',
+                '00 880 1712 345678', '88001712345678']:
+        assert normalize_phone(raw) == '+8801712345678', raw
+
+
+def test_normalize_rejects_invalid_numbers():
+    """Landlines, short numbers and empty values are rejected"""
+    for raw in [None, '', '12345', '0212345678', '017123456789', '02712345678']:
+        assert normalize_phone(raw) is None, raw
+
+
+def test_local_and_gateway_formats():
+    """Derived formats are consistent with the stored E.164 value"""
+    assert local_phone('+8801712345678') == '01712345678'
+    assert gateway_phone('01712345678') == '8801712345678'
+    assert e164_to_local(None) is None
+
+
+if __name__ == '__main__':
+    test_normalize_accepts_common_formats()
+    test_normalize_rejects_invalid_numbers()
+    test_local_and_gateway_formats()
+    print("✅ Phone normalization tests passed")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test merging of cached results analytics slices
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import update
+from models import db, User, Batch, MonthlyResult
+from utils.results_analytics import build_results_analytics, analytics_etag, ResultsAnalyticsCache
+
+
+def _slice(count, sum_percentage, sum_attendance, grades, top):
+    return {'count': count, 'sum_percentage': sum_percentage, 'sum_attendance': sum_attendance,
+            'grades': grades, 'top': [{'id': i, 'percentage': p, 'student_name': f'S{i}'} for i, p in top]}
+
+
+SLICES = {
+    (1, 1): _slice(2, 150.0, 180.0, {'A': 1, 'C': 1}, [(1, 80.0), (2, 70.0)]),
+    (1, 2): _slice(1, 90.0, 100.0, {'A+': 1}, [(3, 90.0)]),
+    (2, 1): _slice(1, 30.0, 50.0, {'F': 1, None: 0}, [(4, 30.0)]),
+}
+
+
+def test_batch_view_only_uses_its_slices():
+    """A batch's analytics merge that batch's months only"""
+    analytics = build_results_analytics(SLICES, 2026, batch_id=1)
+    assert analytics['total_results'] == 3
+    assert analytics['average_performance'] == 80.0
+    assert [m['month'] for m in analytics['monthly_trends']] == [1, 2]
+    assert analytics['monthly_trends'][0]['avg_percentage'] == 75.0
+    assert [r['student_name'] for r in analytics['top_performers']] == ['S3', 'S1', 'S2']
+    assert 'id' not in analytics['top_performers'][0]
+
+
+def test_all_batches_view_merges_months():
+    """Without a batch, slices of the same month add up and grades are combined"""
+    analytics = build_results_analytics(SLICES, 2026)
+    january = analytics['monthly_trends'][0]
+    assert january['student_count'] == 3 and january['avg_percentage'] == 60.0
+    assert analytics['grade_distribution'][-1] == {'grade': None, 'count': 0}
+    assert {g['grade']: g['count'] for g in analytics['grade_distribution']}['F'] == 1
+    assert analytics_etag(analytics) != analytics_etag(build_results_analytics(SLICES, 2026, batch_id=1))
+
+
+def _app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def test_results_written_by_another_worker_reach_every_cache():
+    """Each worker's cache reloads the recalculated slice on its next read"""
+    with _app().app_context():
+        db.create_all()
+        batches = [Batch(name=f'Batch {i}', start_date=date(2026, 1, 1)) for i in (1, 2)]
+        student = User(phoneNumber='01711111111', first_name='Amin', last_name='Rahman', password_hash='x')
+        db.session.add_all(batches + [student])
+        db.session.flush()
+        db.session.add_all([
+            MonthlyResult(user_id=student.id, batch_id=batch.id, month=month, year=2026, percentage=50.0, grade='C')
+            for batch in batches for month in (1, 2)
+        ])
+        db.session.commit()
+
+        worker_a, worker_b = ResultsAnalyticsCache(), ResultsAnalyticsCache()
+        other_batch, etag = worker_a.get(batches[1].id, 2026)
+        assert worker_a.get(None, 2026)[0]['average_performance'] == 50.0
+        assert worker_b.get(batches[0].id, 2026)[0]['average_performance'] == 50.0
+
+        # Worker B recalculates January of batch 1
+        db.session.execute(
+            update(MonthlyResult).where(MonthlyResult.batch_id == batches[0].id, MonthlyResult.month == 1)
+            .values(percentage=90.0, grade='A+', calculated_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+        assert worker_a.get(batches[0].id, 2026)[0]['average_performance'] == 70.0
+        assert worker_a.get(None, 2026)[0]['average_performance'] == 60.0
+        assert worker_b.get(batches[0].id, 2026)[0]['average_performance'] == 70.0
+        # The other batch's view was kept
+        assert worker_a.get(batches[1].id, 2026) == (other_batch, etag)
+
+        MonthlyResult.query.filter_by(batch_id=batches[0].id, month=2).delete()
+        db.session.commit()
+        assert worker_a.get(batches[0].id, 2026)[0]['total_results'] == 1
+
+
+if __name__ == '__main__':
+    test_batch_view_only_uses_its_slices()
+    test_all_batches_view_merges_months()
+    test_results_written_by_another_worker_reach_every_cache()
+    print("✅ Results analytics tests passed")
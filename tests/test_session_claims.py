@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test signed session claims, the user validity cache and epoch revocation
+"""
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import update
+from models import db, User, Batch
+from utils.session_claims import (
+    CLAIMS_SESSION_KEY,
+    UserValidityCache,
+    issue_session_claims,
+    load_session_claims,
+)
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    return app
+
+
+def _student():
+    db.create_all()
+    student = User(phoneNumber='01711111111', first_name='Amin', last_name='Rahman', password_hash='x')
+    active = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+    inactive = Batch(name='HSC 2025', start_date=date(2025, 1, 1), is_active=False)
+    student.batches.extend([active, inactive])
+    db.session.add(student)
+    db.session.commit()
+    return student, active
+
+
+def test_claims_round_trip():
+    """Issued claims load back unchanged; tampered tokens are rejected"""
+    app = _app()
+    with app.app_context():
+        student, active = _student()
+        with app.test_request_context():
+            from flask import session
+            issued = issue_session_claims(student)
+            assert issued.batch_ids == {active.id}
+            assert load_session_claims() == issued
+
+            session[CLAIMS_SESSION_KEY] = session[CLAIMS_SESSION_KEY][:-2] + 'xx'
+            assert load_session_claims() is None
+
+
+def test_validity_is_cached_until_the_ttl_expires():
+    """Writes from elsewhere are seen once the cached entry expires"""
+    app = _app()
+    app.config['USER_VALIDITY_TTL'] = 0.2
+    with app.app_context():
+        student, _ = _student()
+        cache = UserValidityCache()
+        with app.test_request_context():
+            claims = issue_session_claims(student)
+        cache.prime(student.id, True, claims.epoch)
+
+        # Another worker deactivates the user with a Core UPDATE
+        db.session.execute(update(User).where(User.id == student.id).values(is_active=False))
+        db.session.commit()
+        assert cache.is_valid(claims)
+        assert (cache.hits, cache.misses) == (1, 0)
+
+        time.sleep(0.25)
+        assert not cache.is_valid(claims)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_security_changes_bump_the_epoch():
+    """Password and enrollment changes revoke claims issued before them"""
+    app = _app()
+    with app.app_context():
+        student, active = _student()
+        cache = UserValidityCache()
+        with app.test_request_context():
+            claims = issue_session_claims(student)
+        assert cache.is_valid(claims)
+
+        student.password_hash = 'y'
+        db.session.commit()
+        cache.invalidate(student.id)
+        assert student.auth_epoch == claims.epoch + 1
+        assert not cache.is_valid(claims)
+
+        with app.test_request_context():
+            claims = issue_session_claims(student)
+        student.batches.remove(active)
+        db.session.commit()
+        cache.invalidate(student.id)
+        assert student.auth_epoch == claims.epoch + 1
+        assert not cache.is_valid(claims)
+
+
+def test_unrelated_changes_keep_the_epoch():
+    """Profile edits and re-assigning the same batches leave sessions alone"""
+    app = _app()
+    with app.app_context():
+        student, _ = _student()
+        epoch = student.auth_epoch
+        batches = list(student.batches)
+
+        student.first_name = 'Aminul'
+        student.batches.clear()
+        student.batches.extend(batches)
+        db.session.commit()
+        assert student.auth_epoch == epoch
+
+
+if __name__ == '__main__':
+    test_claims_round_trip()
+    test_validity_is_cached_until_the_ttl_expires()
+    test_security_changes_bump_the_epoch()
+    test_unrelated_changes_keep_the_epoch()
+    print("✅ Session claims tests passed")
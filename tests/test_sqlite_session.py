@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite session store
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask, session
+from utils.sqlite_session import init_sqlite_session
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SESSION_SQLITE_PATH=db_path)
+    interface = init_sqlite_session(app)
+
+    @app.route('/set/<value>')
+    def set_value(value):
+        session['value'] = value
+        return 'ok'
+
+    @app.route('/get')
+    def get_value():
+        return session.get('value', '')
+
+    return app, interface
+
+
+def test_session_round_trip_and_skipped_writes():
+    """Sessions persist and unchanged sessions are not rewritten"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app, interface = make_app(str(Path(tmp) / 'sessions.db'))
+        client = app.test_client()
+
+        client.get('/set/hello')
+        assert client.get('/get').data == b'hello'
+        assert client.get('/get').data == b'hello'
+        assert interface._stats['writes'] == 1
+        assert interface._stats['skipped_writes'] == 2
+        assert interface.get_metrics()['sessions'] == 1
+
+
+def test_expired_sessions_deleted_in_batches():
+    """Cleanup removes every expired row across several batches"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app, interface = make_app(str(Path(tmp) / 'sessions.db'))
+        interface.cleanup_batch_size = 10
+        interface._conn.executemany(
+            "INSERT INTO sessions (id, data, expiry) VALUES (?, ?, ?)",
+            [(f'session:{i}', b'x', 1) for i in range(25)]
+        )
+        assert interface._delete_expired_sessions() == 25
+        assert interface.get_metrics()['sessions'] == 0
+
+
+if __name__ == '__main__':
+    test_session_round_trip_and_skipped_writes()
+    test_expired_sessions_deleted_in_batches()
+    print("✅ SQLite session store tests passed")
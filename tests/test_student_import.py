@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test the chunked bulk student import
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import event, select
+from models import db, User, Batch, user_batches
+from utils.student_import import import_students
+
+
+def _app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['BCRYPT_LOG_ROUNDS'] = 4
+    db.init_app(app)
+    return app
+
+
+def _row(first_name, phone, **extra):
+    return dict(firstName=first_name, lastName='Rahman', phoneNumber=phone, **extra)
+
+
+def _setup():
+    db.create_all()
+    batch = Batch(name='HSC 2026', start_date=date(2026, 1, 1))
+    db.session.add(batch)
+    db.session.add(User(phoneNumber='01700000001', phone_e164='+8801700000001', first_name='Existing',
+                        last_name='Student', password_hash='x'))
+    db.session.commit()
+    return batch.id
+
+
+def test_duplicate_phones_within_and_across_chunks():
+    """Repeats in a chunk, in a later chunk, or of an existing user fail by row"""
+    with _app().app_context():
+        _setup()
+        rows = [
+            _row('Amin', '01711111111'),
+            _row('Amin Again', '+8801711111111'),   # same chunk
+            _row('Bina', '01722222222'),
+            _row('Bina Again', '8801722222222'),    # next chunk
+            _row('Existing', '01700000001'),        # already in the database
+            _row('Chaity', '01733333333'),
+        ]
+        report = import_students(rows, chunk_size=2).to_dict()
+
+        assert report['successful'] == 3
+        assert [(f['row'], f['error']) for f in report['failedImports']] == [
+            (2, 'Duplicate phone number in import'),
+            (4, 'Duplicate phone number in import'),
+            (5, 'Student with this phone number already exists'),
+        ]
+        phones = db.session.scalars(select(User.phone_e164).order_by(User.phone_e164)).all()
+        assert phones == ['+8801700000001', '+8801711111111', '+8801722222222', '+8801733333333']
+
+
+def test_each_inserted_row_gets_its_batch_link():
+    """Rows are enrolled in their own batch or the default one; rejected rows are not"""
+    with _app().app_context():
+        batch_id = _setup()
+        rows = [
+            _row('Amin', '01711111111'),
+            _row('Bina', '01722222222', batchId=str(batch_id)),
+            _row('Chaity', '01733333333', batchId='999'),
+            _row('Dipu', '01744444444'),
+        ]
+        report = import_students(rows, default_batch_id=batch_id, chunk_size=3).to_dict()
+
+        assert report['successful'] == 3
+        assert report['failedImports'][0]['error'] == 'Batch not found'
+        links = db.session.execute(
+            select(User.first_name, user_batches.c.batch_id).join(user_batches, user_batches.c.user_id == User.id)
+            .order_by(User.first_name)
+        ).all()
+        assert [tuple(link) for link in links] == [('Amin', batch_id), ('Bina', batch_id), ('Dipu', batch_id)]
+
+
+def test_failed_chunk_keeps_earlier_chunks():
+    """A chunk whose insert fails is reported by row; chunks before and after it stay imported"""
+    with _app().app_context():
+        _setup()
+        user_inserts = []
+
+        def fail_second_insert(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO users'):
+                user_inserts.append(statement)
+                if len(user_inserts) == 2:
+                    raise RuntimeError('disk full')
+
+        event.listen(db.engine, 'before_cursor_execute', fail_second_insert)
+        try:
+            rows = [_row(name, f'0171111111{i}') for i, name in enumerate(['Amin', 'Bina', 'Chaity', 'Dipu', 'Esha'])]
+            report = import_students(rows, chunk_size=2).to_dict()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', fail_second_insert)
+
+        assert [s['row'] for s in report['successfulImports']] == [1, 2, 5]
+        assert [(f['row'], f['error'].split(':')[0]) for f in report['failedImports']] == [
+            (3, 'Chunk insert failed'), (4, 'Chunk insert failed')
+        ]
+        names = db.session.scalars(select(User.first_name).where(User.first_name != 'Existing')
+                                   .order_by(User.first_name)).all()
+        assert names == ['Amin', 'Bina', 'Esha']
+        ids = dict(db.session.execute(select(User.phoneNumber, User.id)).all())
+        assert [s['studentId'] for s in report['successfulImports']] == [
+            f"STU{datetime.utcnow().year}{ids[s['phone']]:04d}" for s in report['successfulImports']
+        ]
+
+
+if __name__ == '__main__':
+    test_duplicate_phones_within_and_across_chunks()
+    test_each_inserted_row_gets_its_batch_link()
+    test_failed_chunk_keeps_earlier_chunks()
+    print("✅ Student import tests passed")
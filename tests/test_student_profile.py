@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test that the student profile endpoint runs a fixed number of queries
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from sqlalchemy import event
+from models import (db, User, UserRole, Batch, Fee, FeeStatus, Attendance, AttendanceStatus,
+                    MonthlyExam, IndividualExam, MonthlyMark, MonthlyRanking)
+from routes.students import students_bp
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+    app.register_blueprint(students_bp, url_prefix='/api/students')
+    return app
+
+
+def _student_with_history(teacher, months):
+    """A student in `months` batches with a fee, attendance day, marks and ranking per month"""
+    student = User(phoneNumber=f'0171000000{months}', first_name='Amin', last_name='Rahman',
+                   password_hash='x', role=UserRole.STUDENT)
+    db.session.add(student)
+    for month in range(1, months + 1):
+        batch = Batch(name=f'Batch {months}-{month}', start_date=date(2026, 1, 1))
+        student.batches.append(batch)
+        exam = MonthlyExam(title=f'Month {month}', month=month, year=2026, total_marks=100, pass_marks=33,
+                           start_date=datetime(2026, month, 1), end_date=datetime(2026, month, 28),
+                           batch=batch, created_by=teacher.id)
+        individual = IndividualExam(monthly_exam=exam, title='Physics', subject='Physics', marks=100,
+                                    exam_date=datetime(2026, month, 10), duration=60)
+        db.session.add_all([
+            Fee(user=student, batch=batch, amount=500, due_date=date(2026, month, 10),
+                status=FeeStatus.PAID if month % 2 else FeeStatus.PENDING),
+            Attendance(user=student, batch=batch, date=date(2026, month, 5), status=AttendanceStatus.PRESENT),
+            MonthlyMark(monthly_exam=exam, individual_exam=individual, user=student,
+                        marks_obtained=70, total_marks=100, percentage=70.0),
+            MonthlyRanking(monthly_exam=exam, user=student, position=1),
+        ])
+    db.session.commit()
+    return student.id
+
+
+def _profile_queries(app, client, student_id):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.get(f'/api/students/{student_id}/profile')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data'], len(statements)
+
+
+def test_profile_query_count_does_not_grow_with_history():
+    """A student with one month of history and one with six cost the same queries"""
+    app = _app()
+    with app.app_context():
+        db.create_all()
+        teacher = User(phoneNumber='01900000000', first_name='Teacher', last_name='One',
+                       password_hash='x', role=UserRole.TEACHER)
+        db.session.add(teacher)
+        db.session.commit()
+        small = _student_with_history(teacher, 1)
+        large = _student_with_history(teacher, 6)
+        teacher_id = teacher.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = teacher_id
+        session['user_role'] = 'teacher'
+
+    small_profile, small_queries = _profile_queries(app, client, small)
+    large_profile, large_queries = _profile_queries(app, client, large)
+
+    assert len(small_profile['batches']) == 1 and len(large_profile['batches']) == 6
+    assert large_profile['fees']['summary']['totalFees'] == 6
+    assert large_profile['attendance']['summary']['presentDays'] == 6
+    assert len(large_profile['marks']) == 6 and len(large_profile['rankings']) == 6
+    assert small_queries == large_queries, (small_queries, large_queries)
+    # identity + student + batches + batch counts + fees (2) + attendance (2) + marks + rankings
+    assert large_queries == 10, large_queries
+
+
+if __name__ == '__main__':
+    test_profile_query_count_does_not_grow_with_history()
+    print("✅ Student profile tests passed")
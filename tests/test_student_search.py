@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Test student search query building and keyset cursors
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.student_search import build_match_query, encode_cursor, decode_cursor
+
+
+def test_words_become_prefix_terms():
+    """Every word must prefix-match; quotes can't break out of a term"""
+    assert build_match_query('rahim abd') == '"rahim"* "abd"*'
+    assert build_match_query('a"b') == '"a"* "b"*'
+    assert build_match_query('  ') is None
+
+
+def test_phone_input_is_one_normalized_term():
+    """International phone input matches the stored local format"""
+    assert build_match_query('+880 1712-345') == '"01712345"*'
+    assert build_match_query('0171') == '"0171"*'
+
+
+def test_cursor_round_trip():
+    """Cursors decode to the values they were built from"""
+    cursor = encode_cursor(['Rahim', 'Hossain', 42])
+    assert decode_cursor(cursor) == ['Rahim', 'Hossain', 42]
+    try:
+        decode_cursor('not-a-cursor')
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_words_become_prefix_terms()
+    test_phone_input_is_one_normalized_term()
+    test_cursor_round_trip()
+    print("✅ Student search tests passed")
@@ -1,11 +1,15 @@
 """
 Utilities package for SmartGardenHub
-Exposes authentication helpers, response formatting, and password generation utilities.
+Exposes authentication helpers, response formatting, phone normalization, and password generation utilities.
 """
 from .auth import (
     login_required,
     require_role,
     get_current_user,
+    get_current_identity,
+    get_current_claims,
+    clear_current_identity,
+    Identity,
     get_current_user_id,
     get_current_user_role,
     is_teacher_or_admin,
@@ -22,6 +26,13 @@ from .response import (
     paginated_response,
     serialize_data,
 )
+from .phone import (
+    normalize_phone,
+    local_phone,
+    gateway_phone,
+    e164_to_local,
+    e164_to_gateway,
+)
 from .password_generator import (
     generate_unique_student_password,
     generate_secure_student_password,
@@ -30,10 +41,12 @@ from .password_generator import (
 )
 
 __all__ = [
-    'login_required', 'require_role', 'get_current_user', 'get_current_user_id', 'get_current_user_role',
+    'login_required', 'require_role', 'get_current_user', 'get_current_identity', 'get_current_claims', 'clear_current_identity', 'Identity',
+    'get_current_user_id', 'get_current_user_role',
     'is_teacher_or_admin', 'is_admin', 'is_student', 'check_batch_access', 'check_user_access',
     'generate_password_hash', 'check_password_hash',
     'success_response', 'error_response', 'paginated_response', 'serialize_data',
+    'normalize_phone', 'local_phone', 'gateway_phone', 'e164_to_local', 'e164_to_gateway',
     'generate_unique_student_password', 'generate_secure_student_password', 'generate_simple_unique_password',
     'validate_student_password_strength'
 ]
@@ -3,10 +3,63 @@ Authentication Utilities
 Decorators and helper functions for authentication and authorization
 """
 from functools import wraps
-from flask import session, jsonify, request
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional
+from flask import session, jsonify, request, g, current_app
+from sqlalchemy.orm import joinedload
 from models import User, UserRole
+from .session_claims import (
+    SessionClaims,
+    claims_mode_enabled,
+    issue_session_claims,
+    load_session_claims,
+    user_validity_cache,
+)
 import bcrypt
 
+@dataclass
+class Identity:
+    """Request-scoped identity of the logged-in user"""
+    user: User
+    role: UserRole
+    batch_ids: FrozenSet[int] = field(default_factory=frozenset)
+    
+    @property
+    def user_id(self) -> int:
+        return self.user.id
+    
+    @property
+    def is_active(self) -> bool:
+        return bool(self.user.is_active)
+
+def get_current_identity() -> Optional[Identity]:
+    """
+    Load the current user's identity once per request and cache it on flask.g
+    The user row and its batches are fetched with a single joined query, so
+    later access to user.batches does not trigger a lazy load.
+    """
+    if '_identity' in g:
+        return g._identity
+    
+    identity = None
+    user_id = session.get('user_id')
+    if user_id:
+        user = User.query.options(joinedload(User.batches)).filter(User.id == user_id).first()
+        if user:
+            identity = Identity(
+                user=user,
+                role=user.role,
+                batch_ids=frozenset(batch.id for batch in user.batches if batch.is_active)
+            )
+    
+    g._identity = identity
+    return identity
+
+def clear_current_identity():
+    """Drop the cached identity (after login/logout changes the session)"""
+    g.pop('_identity', None)
+    g.pop('_claims', None)
+
 def generate_password_hash(password):
     """Generate password hash using bcrypt"""
     if isinstance(password, str):
@@ -21,6 +74,31 @@ def check_password_hash(hashed_password, password):
         hashed_password = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password, hashed_password)
 
+def get_current_claims() -> Optional[SessionClaims]:
+    """Verified session claims for this request (signature checked once)"""
+    if '_claims' not in g:
+        g._claims = load_session_claims()
+    return g._claims
+
+def _authenticate_from_claims(user_id):
+    """
+    Authenticate without loading the user row in the common case
+    Valid claims only need the TTL validity cache; missing or stale claims
+    are (re-)issued from a single identity query.
+    """
+    claims = get_current_claims()
+    if claims and claims.user_id == user_id:
+        if not user_validity_cache.is_valid(claims):
+            return False
+        if not claims.is_stale(current_app.config.get('AUTH_CLAIMS_MAX_AGE', 12 * 60 * 60)):
+            return True
+    
+    identity = get_current_identity()
+    if not identity or not identity.is_active:
+        return False
+    g._claims = issue_session_claims(identity.user, identity.batch_ids)
+    return True
+
 def login_required(f):
     """Decorator to require user login"""
     @wraps(f)
@@ -30,9 +108,15 @@ def login_required(f):
         if not user_id:
             return jsonify({'error': 'Authentication required', 'success': False}), 401
         
-        # Check if user still exists and is active
-        user = User.query.get(user_id)
-        if not user or not user.is_active:
+        if claims_mode_enabled():
+            if not _authenticate_from_claims(user_id):
+                session.clear()
+                return jsonify({'error': 'Invalid session', 'success': False}), 401
+            return f(*args, **kwargs)
+        
+        # Check if user still exists and is active (loaded once per request)
+        identity = get_current_identity()
+        if not identity or not identity.is_active:
             session.clear()
             return jsonify({'error': 'Invalid session', 'success': False}), 401
         
@@ -67,11 +151,9 @@ def require_role(*allowed_roles):
     return decorator
 
 def get_current_user():
-    """Get current user from session"""
-    user_id = session.get('user_id')
-    if user_id:
-        return User.query.get(user_id)
-    return None
+    """Get current user from session (cached for the rest of the request)"""
+    identity = get_current_identity()
+    return identity.user if identity else None
 
 def get_current_user_id():
     """Get current user ID from session"""
@@ -112,6 +194,12 @@ def check_batch_access(user, batch_id):
     
     if is_student():
         # Students can only access their enrolled batches
+        claims = get_current_claims() if claims_mode_enabled() else None
+        if claims and claims.user_id == user.id:
+            return int(batch_id) in claims.batch_ids
+        identity = get_current_identity()
+        if identity and identity.user_id == user.id:
+            return int(batch_id) in identity.batch_ids
         user_batch_ids = [batch.id for batch in user.batches if batch.is_active]
         return int(batch_id) in user_batch_ids
     
@@ -0,0 +1,176 @@
+"""
+Exam Payload Cache
+Pre-serialized JSON of an online exam and its questions (without correct
+answers), versioned by the exam's updated_at. Payloads are kept in process
+memory and written once to a shared cache directory, so every worker
+serves exam start/resume without loading or serializing the questions.
+Each question is held as encoded pieces, so a per-attempt question and
+option order is applied by joining strings rather than re-serializing.
+Anything that changes an exam's questions must bump its updated_at.
+Names from other tables (batch, creator) aren't covered by that version,
+so they are left out of the cache and added to each response.
+"""
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Tuple
+from flask import current_app
+from models import ExamQuestion
+
+logger = logging.getLogger(__name__)
+
+
+OPTION_KEYS = ('option_a', 'option_b', 'option_c', 'option_d')
+RELATED_NAME_KEYS = ('batch_name', 'creator_name')
+
+
+def exam_payload_version(exam):
+    return exam.updated_at.strftime('%Y%m%d%H%M%S%f') if exam.updated_at else '0'
+
+
+def build_exam_payload(exam):
+    """Exam dict (without related names) and its questions (without answers) in question_number order"""
+    questions = ExamQuestion.query.filter_by(exam_id=exam.id).order_by(ExamQuestion.question_number).all()
+    exam_dict = {k: v for k, v in exam.to_dict().items() if k not in RELATED_NAME_KEYS}
+    return {'exam': exam_dict, 'questions': [q.to_dict(include_answer=False) for q in questions]}
+
+
+def exam_related_names(exam):
+    """batch_name and creator_name as in OnlineExam.to_dict (eager-load batch and creator to avoid queries)"""
+    return {
+        'batch_name': exam.batch.name if exam.batch else None,
+        'creator_name': f"{exam.creator.first_name} {exam.creator.last_name}" if exam.creator else 'Unknown'
+    }
+
+
+class ExamPayload:
+    """Encoded exam payload that renders the '"exam": ..., "questions": [...]' fragment"""
+
+    def __init__(self, document):
+        self.document_json = json.dumps(document)
+        self.exam = document['exam']
+        self.question_count = len(document['questions'])
+        # '{"id": ..., "question_text": ...' without the options and closing brace
+        self._heads = [json.dumps({k: v for k, v in q.items() if k not in OPTION_KEYS})[:-1] for q in document['questions']]
+        self._options = [[json.dumps(q.get(k)) for k in OPTION_KEYS] for q in document['questions']]
+        self._questions = self._render_questions(range(self.question_count))
+
+    def _question(self, i, option_order=None):
+        options = self._options[i]
+        order = option_order or range(len(OPTION_KEYS))
+        return self._heads[i] + ''.join(
+            f', "{key}": {options[original]}' for key, original in zip(OPTION_KEYS, order)
+        ) + '}'
+
+    def _render_questions(self, order, option_orders=None):
+        return ', '.join(self._question(i, option_orders[i] if option_orders else None) for i in order)
+
+    def render(self, names=None, question_order=None, option_orders=None):
+        """
+        Fragment with the exam (plus per-request names) and its questions
+        question_order / option_orders give a per-attempt index order.
+        """
+        exam_json = json.dumps({**self.exam, **(names or {})})
+        if question_order is None:
+            questions = self._questions
+        else:
+            questions = self._render_questions(question_order, option_orders)
+        return f'"exam": {exam_json}, "questions": [{questions}]'
+
+
+def payload_response_body(fields, payload):
+    """JSON object of fields with a cached payload fragment spliced in"""
+    body = json.dumps(fields)
+    return body[:-1] + (', ' if fields else '') + payload + '}'
+
+
+class ExamPayloadCache:
+    """In-memory exam payloads backed by one JSON file per exam version"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[str, ExamPayload]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _directory(self):
+        try:
+            return current_app.config.get('EXAM_PAYLOAD_CACHE_DIR')
+        except RuntimeError:
+            return None
+
+    def _path(self, directory, exam_id, version):
+        return os.path.join(directory, f'{exam_id}-{version}.json')
+
+    def _read(self, exam_id, version):
+        directory = self._directory()
+        if not directory:
+            return None
+        try:
+            with open(self._path(directory, exam_id, version), encoding='utf-8') as f:
+                return ExamPayload(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, exam_id, version, document_json):
+        """Atomically publish a payload file and remove older versions of the exam"""
+        directory = self._directory()
+        if not directory:
+            return
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = self._path(directory, exam_id, version)
+            handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(handle, 'w', encoding='utf-8') as f:
+                f.write(document_json)
+            os.replace(temp_path, path)
+            for old_path in glob.glob(os.path.join(directory, f'{exam_id}-*.json')):
+                if old_path != path:
+                    os.remove(old_path)
+        except OSError as e:
+            # The payload is still served from memory; other workers rebuild it
+            logger.warning(f"Exam payload cache write failed for exam {exam_id}: {e}")
+
+    def get(self, exam):
+        """ExamPayload for the exam's current version, built on a miss"""
+        version = exam_payload_version(exam)
+        entry = self._entries.get(exam.id)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        payload = self._read(exam.id, version)
+        if payload is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            payload = ExamPayload(build_exam_payload(exam))
+            self._write(exam.id, version, payload.document_json)
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[exam.id] = (version, payload)
+        return payload
+
+    def invalidate(self, exam_id):
+        """Forget an exam (e.g. after it is deleted)"""
+        with self._lock:
+            self._entries.pop(exam_id, None)
+        directory = self._directory()
+        if directory:
+            for path in glob.glob(os.path.join(directory, f'{exam_id}-*.json')):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+exam_payload_cache = ExamPayloadCache()
@@ -0,0 +1,115 @@
+"""
+Exam Scoring
+Scores simple online exam attempts against an answer key loaded once per
+exam as a tuple aligned to question order. Each attempt's answers become a
+vector in the same order, so scoring is an element-wise comparison, and a
+whole exam can be re-graded in one pass with a single executemany UPDATE.
+"""
+import json
+from collections import namedtuple
+
+from sqlalchemy import bindparam, update
+from models import db, ExamQuestion, StudentExamAttempt
+from utils.exam_shuffle import unshuffle_answers
+
+SUBMITTED_STATUSES = ('submitted', 'auto_submitted')
+
+AnswerKey = namedtuple('AnswerKey', ['numbers', 'answers'])
+
+
+def load_answer_key(exam_id):
+    """(question numbers, correct answers) in question order, in one query"""
+    rows = db.session.query(ExamQuestion.question_number, ExamQuestion.correct_answer)\
+        .filter(ExamQuestion.exam_id == exam_id)\
+        .order_by(ExamQuestion.question_number).all()
+    return AnswerKey(tuple(row[0] for row in rows), tuple((row[1] or '').upper() for row in rows))
+
+
+def load_answer_keys(exam_ids):
+    """Answer keys of several exams in one query, keyed by exam id"""
+    rows = db.session.query(ExamQuestion.exam_id, ExamQuestion.question_number, ExamQuestion.correct_answer)\
+        .filter(ExamQuestion.exam_id.in_(exam_ids))\
+        .order_by(ExamQuestion.exam_id, ExamQuestion.question_number).all()
+    keys = {}
+    for exam_id, number, answer in rows:
+        numbers, answers = keys.setdefault(exam_id, ([], []))
+        numbers.append(number)
+        answers.append((answer or '').upper())
+    return {exam_id: AnswerKey(tuple(numbers), tuple(answers)) for exam_id, (numbers, answers) in keys.items()}
+
+
+def answer_vector(key, answers):
+    """A student's answers aligned with the key ('' for unanswered)"""
+    if isinstance(answers, str):
+        answers = json.loads(answers) if answers else {}
+    answers = answers or {}
+    return tuple((answers.get(str(number)) or '').upper() for number in key.numbers)
+
+
+def attempt_vector(key, attempt_id, answers, shuffle_version=None):
+    """Answer vector of an attempt in the original option letters"""
+    if isinstance(answers, str):
+        answers = json.loads(answers) if answers else {}
+    if shuffle_version:
+        answers = unshuffle_answers(answers, attempt_id, shuffle_version, key.numbers)
+    return answer_vector(key, answers)
+
+
+def score_vector(key, vector):
+    """Number of positions where the answer matches the key"""
+    return sum(map(str.__eq__, vector, key.answers))
+
+
+def score_percentage(score, total_questions):
+    return round(score / total_questions * 100, 2) if total_questions else 0
+
+
+def score_attempts(key, attempts, total_questions):
+    """
+    Score (attempt_id, answers[, shuffle_version]) rows against one key
+    Returns [{'attempt_id', 'score', 'percentage'}].
+    """
+    results = []
+    for attempt_id, answers, *shuffle_version in attempts:
+        score = score_vector(key, attempt_vector(key, attempt_id, answers, *shuffle_version))
+        results.append({
+            'attempt_id': attempt_id,
+            'score': score,
+            'percentage': score_percentage(score, total_questions)
+        })
+    return results
+
+
+def regrade_exam(exam):
+    """
+    Re-score every submitted attempt of an exam against its current key
+    Only attempts whose score changes are written, with one executemany
+    UPDATE. The caller commits. Returns a report dict.
+    """
+    key = load_answer_key(exam.id)
+    attempts = db.session.query(
+        StudentExamAttempt.id, StudentExamAttempt.answers, StudentExamAttempt.shuffle_version, StudentExamAttempt.score
+    ).filter(
+        StudentExamAttempt.exam_id == exam.id,
+        StudentExamAttempt.status.in_(SUBMITTED_STATUSES)
+    ).all()
+
+    previous = {row.id: row.score for row in attempts}
+    scored = score_attempts(key, ((row.id, row.answers, row.shuffle_version) for row in attempts), exam.total_questions)
+    changed = [result for result in scored if result['score'] != previous[result['attempt_id']]]
+
+    if changed:
+        table = StudentExamAttempt.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('attempt_id'))
+            .values(score=bindparam('score'), percentage=bindparam('percentage')),
+            changed
+        )
+
+    return {
+        'exam_id': exam.id,
+        'attempts': len(scored),
+        'changed': len(changed),
+        'passed': sum(1 for result in scored if result['percentage'] >= exam.pass_marks)
+    }
@@ -0,0 +1,55 @@
+"""
+Exam Shuffle
+Deterministic per-attempt question and option order for simple online
+exams. The permutations are derived from (attempt id, exam version), so a
+resumed attempt sees the same order and nothing but the version has to be
+stored. Answers are saved in the letters the student saw and mapped back
+to the original options when they are scored or shown.
+
+Stored answers depend on these orders forever, so they are built from
+SHA-256 alone (indexes sorted by their digest) rather than random.shuffle,
+whose output Python doesn't promise to keep across versions.
+"""
+import hashlib
+
+OPTION_LETTERS = 'ABCD'
+
+
+def _order(attempt_id, version, label, count):
+    """range(count) sorted by sha256('attempt_id:version:label:index')"""
+    return sorted(range(count), key=lambda i: hashlib.sha256(
+        f'{attempt_id}:{version}:{label}:{i}'.encode('utf-8')
+    ).digest())
+
+
+def attempt_permutations(attempt_id, version, question_count):
+    """
+    (question order, option orders) for an attempt
+    question order lists question indexes (in question_number order) as
+    displayed; option_orders[i][d] is the original option shown in
+    position d of question i.
+    """
+    question_order = _order(attempt_id, version, 'questions', question_count)
+    option_orders = [_order(attempt_id, version, f'options-{i}', len(OPTION_LETTERS)) for i in range(question_count)]
+    return question_order, option_orders
+
+
+def unshuffle_answers(answers, attempt_id, version, question_numbers):
+    """
+    Map an attempt's answers from displayed letters to the original options
+    question_numbers are the exam's question numbers in order; answers
+    for unknown questions or letters are passed through unchanged.
+    """
+    if not version or not answers:
+        return answers or {}
+    _, option_orders = attempt_permutations(attempt_id, version, len(question_numbers))
+    index = {str(number): i for i, number in enumerate(question_numbers)}
+
+    original = {}
+    for number, answer in answers.items():
+        i = index.get(str(number))
+        letter = (answer or '').upper()
+        if i is not None and letter and letter in OPTION_LETTERS:
+            letter = OPTION_LETTERS[option_orders[i][OPTION_LETTERS.index(letter)]]
+        original[number] = letter or answer
+    return original
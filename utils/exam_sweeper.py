@@ -0,0 +1,115 @@
+"""
+Exam Deadline Sweeper
+Scheduled job that auto-submits simple online exam attempts still
+in_progress after start_time + duration_minutes (plus a grace period for
+the browser's own auto-submit). Expired attempts are scored with the bulk
+answer-key scorer and written with one executemany UPDATE.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from apscheduler.triggers.interval import IntervalTrigger
+from flask import current_app
+from sqlalchemy import bindparam, update
+from models import db, OnlineExam, StudentExamAttempt
+from utils.exam_scoring import load_answer_keys, AnswerKey, score_attempts
+
+logger = logging.getLogger(__name__)
+
+
+def _grace():
+    return timedelta(minutes=current_app.config.get('EXAM_SWEEP_GRACE_MINUTES', 2))
+
+
+def attempt_expired(attempt, exam, now=None):
+    """Whether an attempt is past its deadline plus the sweep grace period"""
+    now = now or datetime.utcnow()
+    return attempt.start_time + timedelta(minutes=exam.duration_minutes) + _grace() <= now
+
+
+def expired_attempts(now, exam_id=None):
+    """
+    In-progress attempts whose deadline (plus grace) has passed
+    The (status, start_time) index narrows the scan to in-progress attempts
+    started before now - grace; each exam's duration is applied per row.
+    """
+    cutoff = now - _grace()
+    query = db.session.query(
+        StudentExamAttempt.id, StudentExamAttempt.exam_id, StudentExamAttempt.answers,
+        StudentExamAttempt.shuffle_version, StudentExamAttempt.start_time, OnlineExam.duration_minutes, OnlineExam.total_questions
+    ).join(OnlineExam, OnlineExam.id == StudentExamAttempt.exam_id).filter(
+        StudentExamAttempt.status == 'in_progress',
+        StudentExamAttempt.start_time < cutoff
+    )
+    if exam_id:
+        query = query.filter(StudentExamAttempt.exam_id == exam_id)
+    return [row for row in query if row.start_time + timedelta(minutes=row.duration_minutes) <= cutoff]
+
+
+def sweep_expired_attempts(now=None, exam_id=None):
+    """
+    Auto-submit and score every expired attempt, optionally of one exam
+    Returns a report dict.
+    """
+    now = now or datetime.utcnow()
+    rows = expired_attempts(now, exam_id)
+    report = {'swept_at': now.isoformat(), 'expired_attempts': len(rows), 'exams': 0, 'auto_submitted': 0}
+    if not rows:
+        return report
+
+    keys = load_answer_keys({row.exam_id for row in rows})
+    report['exams'] = len(keys)
+    updates = []
+    for row in rows:
+        key = keys.get(row.exam_id, AnswerKey((), ()))
+        scored = score_attempts(key, [(row.id, row.answers, row.shuffle_version)], row.total_questions)[0]
+        scored.update({
+            'submit_time': row.start_time + timedelta(minutes=row.duration_minutes),
+            'time_taken_minutes': row.duration_minutes
+        })
+        updates.append(scored)
+
+    # The status guard skips attempts the student submitted since they were selected
+    table = StudentExamAttempt.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('attempt_id'), table.c.status == 'in_progress')
+        .values(
+            status='auto_submitted',
+            score=bindparam('score'),
+            percentage=bindparam('percentage'),
+            submit_time=bindparam('submit_time'),
+            time_taken_minutes=bindparam('time_taken_minutes')
+        ),
+        updates
+    )
+    db.session.commit()
+    report['auto_submitted'] = result.rowcount
+    logger.info(f"Exam sweep: {result.rowcount} expired attempts auto-submitted")
+    return report
+
+
+def init_exam_sweeper(app, scheduler):
+    """Schedule the deadline sweep on an APScheduler scheduler"""
+    def job():
+        with app.app_context():
+            try:
+                report = sweep_expired_attempts()
+                if report['expired_attempts']:
+                    logger.info(f"Exam deadline sweep finished: {report}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Exam deadline sweep failed: {e}", exc_info=True)
+            finally:
+                db.session.remove()
+
+    scheduler.add_job(
+        job,
+        trigger=IntervalTrigger(seconds=app.config.get('EXAM_SWEEP_INTERVAL_SECONDS', 60)),
+        id='exam_deadline_sweep',
+        name='Exam Deadline Sweep',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    return scheduler
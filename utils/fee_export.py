@@ -0,0 +1,125 @@
+"""
+Fee Ledger Export
+Streams fee rows joined to student and batch names straight from a
+yield_per cursor into CSV, so memory use doesn't grow with the number of
+fees exported. XLSX goes through an openpyxl write-only workbook (see
+requirements.txt): memory stays flat too, but the first byte is only sent
+once the whole file is built.
+"""
+import csv
+import io
+import os
+import tempfile
+
+from sqlalchemy import select
+from models import db, Fee, FeeStatus, User, Batch
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+EXPORT_BATCH_SIZE = 1000  # Rows fetched per round trip and written per CSV chunk
+
+EXPORT_HEADERS = [
+    'Fee ID', 'Student ID', 'Student Name', 'Phone', 'Guardian Phone', 'Batch',
+    'Year', 'Month', 'Due Date', 'Amount', 'Exam Fee', 'Other Fee', 'Late Fee',
+    'Discount', 'Total', 'Status', 'Paid Date', 'Payment Method', 'Transaction ID'
+]
+
+
+def xlsx_available():
+    return Workbook is not None
+
+
+def fee_export_statement(batch_id=None, years=None, status=None):
+    """Fee rows with student and batch names, in ledger order"""
+    statement = select(
+        Fee.id, Fee.user_id, User.created_at, User.first_name, User.last_name,
+        User.phoneNumber, User.guardian_phone, Batch.name,
+        Fee.period_year, Fee.period_month, Fee.due_date,
+        Fee.amount, Fee.exam_fee, Fee.other_fee, Fee.late_fee, Fee.discount,
+        Fee.status, Fee.paid_date, Fee.payment_method, Fee.transaction_id
+    ).join(User, User.id == Fee.user_id).join(Batch, Batch.id == Fee.batch_id)
+
+    if batch_id:
+        statement = statement.where(Fee.batch_id == batch_id)
+    if years:
+        statement = statement.where(Fee.period_year.in_(years))
+    if status:
+        statement = statement.where(Fee.status == status)
+
+    return statement.order_by(Batch.name, Fee.period_year, User.first_name, User.last_name, Fee.user_id, Fee.period_month)
+
+
+def iter_fee_rows(statement):
+    """Yield export rows while fetching EXPORT_BATCH_SIZE rows at a time"""
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result:
+        amounts = [float(value or 0) for value in (row.amount, row.exam_fee, row.other_fee, row.late_fee, row.discount)]
+        yield [
+            row.id,
+            f"STU{row.created_at.year if row.created_at else ''}{row.user_id:04d}",
+            f"{row.first_name} {row.last_name}",
+            row.phoneNumber or '',
+            row.guardian_phone or '',
+            row.name,
+            row.period_year,
+            row.period_month,
+            row.due_date.isoformat() if row.due_date else '',
+            *amounts,
+            sum(amounts[:4]) - amounts[4],
+            row.status.value if isinstance(row.status, FeeStatus) else (row.status or ''),
+            row.paid_date.isoformat() if row.paid_date else '',
+            row.payment_method or '',
+            row.transaction_id or ''
+        ]
+
+
+def iter_csv(rows):
+    """CSV text in chunks of EXPORT_BATCH_SIZE rows; the header goes out first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the UTF-8 (Bangla) names correctly
+    buffer.write('﻿')
+    writer.writerow(EXPORT_HEADERS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_xlsx(rows, chunk_size=64 * 1024):
+    """
+    XLSX bytes from an openpyxl write-only workbook
+    Rows are spilled to a temporary file as they are written; a zip can't be
+    sent before it is finished, so nothing is yielded until every row has
+    been written and the saved workbook is then streamed back in chunks.
+    Use CSV when a large export must start downloading immediately.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Fees')
+    sheet.append(EXPORT_HEADERS)
+    for row in rows:
+        sheet.append(row)
+
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
@@ -0,0 +1,143 @@
+"""
+Fee Summary
+Fee collection statistics computed with one conditional-aggregation query,
+recent payments with joined student and batch names, and a process-local
+cache per (batch, month, year). Each lookup checks a one-row version of the
+fees behind the summary, so a fee written by any worker refreshes it; the
+TTL only bounds date-dependent figures (overdue, recent payments).
+"""
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+from flask import current_app
+from sqlalchemy import and_, case, func, true
+from models import db, Fee, FeeStatus, User, Batch
+
+RECENT_PAYMENT_DAYS = 30
+RECENT_PAYMENT_LIMIT = 10
+
+SummaryKey = Tuple[Optional[int], Optional[int], Optional[int]]
+
+
+def _period_filters(batch_id, month, year):
+    filters = []
+    if batch_id:
+        filters.append(Fee.batch_id == batch_id)
+    if year:
+        filters.extend(Fee.in_period(year, month))
+    return filters
+
+
+def compute_fee_summary(batch_id=None, month=None, year=None):
+    """Fee statistics for the filtered fee set in two queries"""
+    net = func.coalesce(Fee.amount, 0) + func.coalesce(Fee.late_fee, 0) - func.coalesce(Fee.discount, 0)
+    is_paid = Fee.status == FeeStatus.PAID
+    # Overdue fees are still unpaid; PENDING fees past due count as overdue until the nightly sweep flips them
+    is_pending = Fee.status.in_([FeeStatus.PENDING, FeeStatus.OVERDUE])
+    is_overdue = (Fee.status == FeeStatus.OVERDUE) | ((Fee.status == FeeStatus.PENDING) & (Fee.due_date < date.today()))
+
+    totals = db.session.query(
+        func.count(Fee.id),
+        func.coalesce(func.sum(case((is_paid, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((is_pending, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((is_overdue, 1), else_=0)), 0),
+        func.coalesce(func.sum(net), 0),
+        func.coalesce(func.sum(case((is_paid, net), else_=0)), 0),
+        func.coalesce(func.sum(case((is_pending, net), else_=0)), 0),
+    ).filter(*_period_filters(batch_id, month, year)).one()
+    total_fees, paid_fees, pending_fees, overdue_fees, total_amount, paid_amount, pending_amount = totals
+
+    recent = db.session.query(
+        Fee.id, net.label('net_amount'), Fee.paid_date, Fee.payment_method,
+        User.first_name, User.last_name, Batch.name
+    ).join(User, User.id == Fee.user_id)\
+     .join(Batch, Batch.id == Fee.batch_id)\
+     .filter(is_paid, Fee.paid_date >= date.today() - timedelta(days=RECENT_PAYMENT_DAYS))
+    if batch_id:
+        recent = recent.filter(Fee.batch_id == batch_id)
+    recent = recent.order_by(Fee.paid_date.desc()).limit(RECENT_PAYMENT_LIMIT)
+
+    collection_rate = (float(paid_amount) / float(total_amount) * 100) if total_amount > 0 else 0
+
+    return {
+        'total_fees': total_fees,
+        'paid_fees': int(paid_fees),
+        'pending_fees': int(pending_fees),
+        'overdue_fees': int(overdue_fees),
+        'total_amount': float(total_amount),
+        'paid_amount': float(paid_amount),
+        'pending_amount': float(pending_amount),
+        'collection_rate': round(collection_rate, 2),
+        'recent_payments': [{
+            'id': row.id,
+            'amount': float(row.net_amount),
+            'paid_date': row.paid_date.isoformat(),
+            'student_name': f"{row.first_name} {row.last_name}",
+            'batch_name': row.name,
+            'payment_method': row.payment_method
+        } for row in recent]
+    }
+
+
+def fee_summary_version(batch_id=None, month=None, year=None):
+    """
+    Count and latest updated_at of the fees in the period, and of the
+    batch's paid fees (recent payments span periods), in one query.
+    Fee writers must bump updated_at; deletes change the counts.
+    """
+    in_period = and_(*Fee.in_period(year, month)) if year else true()
+    is_paid = Fee.status == FeeStatus.PAID
+    query = db.session.query(
+        func.count(case((in_period, Fee.id))),
+        func.max(case((in_period, Fee.updated_at))),
+        func.count(case((is_paid, Fee.id))),
+        func.max(case((is_paid, Fee.updated_at)))
+    )
+    if batch_id:
+        query = query.filter(Fee.batch_id == batch_id)
+    return tuple(query.one())
+
+
+class FeeSummaryCache:
+    """Process-local cache of fee summaries per (batch_id, month, year), checked against fee_summary_version"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries: Dict[SummaryKey, Tuple[dict, float, tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self):
+        try:
+            return current_app.config.get('FEE_SUMMARY_CACHE_TTL', 300)
+        except RuntimeError:
+            return 300
+
+    def get(self, batch_id=None, month=None, year=None):
+        """Cached summary, recomputed when its fees changed or the TTL passed"""
+        key = (batch_id or None, (month or None) if year else None, year or None)
+        version = fee_summary_version(*key)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic() and entry[2] == version:
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        summary = compute_fee_summary(*key)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (summary, time.monotonic() + self._ttl(), version)
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+fee_summary_cache = FeeSummaryCache()
+
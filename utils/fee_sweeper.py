@@ -0,0 +1,195 @@
+"""
+Overdue Fee Sweeper
+Nightly job that moves past-due PENDING fees to OVERDUE with one UPDATE,
+adds the configured late fee in the same statement, and sends one
+fee_reminder SMS per guardian in chunks. A dry run reports what the sweep
+would change without writing anything.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from apscheduler.triggers.cron import CronTrigger
+from flask import current_app
+from sqlalchemy import func, insert, update
+from models import db, Fee, FeeStatus, User, SmsLog, SmsStatus
+from utils.phone import e164_to_local
+from utils.sms_templates import get_sms_template
+
+logger = logging.getLogger(__name__)
+
+
+def _late_fee():
+    """SQL for the late fee: flat FEE_LATE_FEE_AMOUNT plus FEE_LATE_FEE_PERCENT of the amount"""
+    flat = current_app.config.get('FEE_LATE_FEE_AMOUNT', 0) or 0
+    percent = current_app.config.get('FEE_LATE_FEE_PERCENT', 0) or 0
+    return func.round(flat + func.coalesce(Fee.amount, 0) * percent / 100.0, 2)
+
+
+def _overdue_filter(today):
+    grace_days = current_app.config.get('FEE_OVERDUE_GRACE_DAYS', 0)
+    return (Fee.status == FeeStatus.PENDING, Fee.due_date < today - timedelta(days=grace_days))
+
+
+def _reminder_rows(fee_filter, extra=0):
+    """
+    One reminder per guardian phone, covering all of that guardian's students
+    extra is added to each fee's amount (the late fee a dry run would apply).
+    """
+    net = (func.coalesce(Fee.amount, 0) + func.coalesce(Fee.exam_fee, 0) + func.coalesce(Fee.other_fee, 0)
+           + func.coalesce(Fee.late_fee, 0) - func.coalesce(Fee.discount, 0) + extra)
+    rows = db.session.query(
+        func.coalesce(User.guardian_phone_e164, User.phone_e164).label('phone'),
+        User.id, User.first_name, User.last_name,
+        func.sum(net).label('amount'),
+        func.min(Fee.due_date).label('due_date')
+    ).join(User, User.id == Fee.user_id)\
+     .filter(*fee_filter, User.is_active == True, User.is_archived == False)\
+     .group_by(User.id)\
+     .order_by('phone', User.id)
+
+    guardians = {}
+    for row in rows:
+        if not row.phone:
+            continue
+        guardian = guardians.setdefault(row.phone, {'phone': row.phone, 'user_id': row.id, 'students': [],
+                                                    'amount': 0.0, 'due_date': row.due_date})
+        guardian['students'].append(f"{row.first_name} {row.last_name}")
+        guardian['amount'] += float(row.amount or 0)
+        guardian['due_date'] = min(guardian['due_date'], row.due_date)
+    return list(guardians.values())
+
+
+def _reminder_message(template, guardian):
+    # Plain replace: teacher-edited templates may contain other braces
+    message = template.replace('{student_name}', ', '.join(guardian['students']))
+    message = message.replace('{amount}', f"{guardian['amount']:.0f}")
+    message = message.replace('{due_date}', guardian['due_date'].strftime('%d/%m/%Y'))
+    return message
+
+
+def send_fee_reminders(guardians, chunk_size=None):
+    """
+    Send fee_reminder SMS, committing the SMS log of each chunk on its own
+    Returns (sent, failed).
+    """
+    from routes.sms import send_sms_via_api
+
+    chunk_size = chunk_size or current_app.config.get('FEE_REMINDER_CHUNK_SIZE', 100)
+    template = get_sms_template('fee_reminder')
+    sent = failed = 0
+
+    guardians = iter(guardians)
+    while True:
+        chunk = list(islice(guardians, chunk_size))
+        if not chunk:
+            break
+        logs = []
+        for guardian in chunk:
+            message = _reminder_message(template, guardian)
+            result = send_sms_via_api(guardian['phone'], message)
+            ok = bool(result.get('success'))
+            sent += ok
+            failed += not ok
+            logs.append({
+                'user_id': guardian['user_id'],
+                'phone_number': e164_to_local(guardian['phone']),
+                'message': message,
+                'status': SmsStatus.SENT if ok else SmsStatus.FAILED,
+                'api_response': result,
+                'cost': 1 if ok else 0,
+                'sent_at': datetime.utcnow() if ok else None,
+                'created_at': datetime.utcnow()
+            })
+        db.session.execute(insert(SmsLog.__table__), logs)
+        db.session.commit()
+        logger.info(f"Fee reminders: {sent} sent, {failed} failed")
+
+    return sent, failed
+
+
+def sweep_overdue_fees(today=None, dry_run=False, send_reminders=None):
+    """
+    Mark past-due fees overdue, apply late fees and remind guardians
+    Returns a report dict; with dry_run nothing is written or sent.
+    """
+    today = today or date.today()
+    if send_reminders is None:
+        send_reminders = current_app.config.get('FEE_REMINDER_SMS_ENABLED', False)
+    late_fee = _late_fee()
+    fee_filter = _overdue_filter(today)
+
+    count, amount, late_fees = db.session.query(
+        func.count(Fee.id),
+        func.coalesce(func.sum(Fee.amount), 0),
+        func.coalesce(func.sum(late_fee), 0)
+    ).filter(*fee_filter).one()
+
+    report = {
+        'date': today.isoformat(),
+        'dry_run': dry_run,
+        'overdue_fees': count,
+        'overdue_amount': float(amount),
+        'late_fees_applied': float(late_fees),
+        'reminders': 0,
+        'reminders_sent': 0,
+        'reminders_failed': 0
+    }
+    if count == 0:
+        return report
+
+    if dry_run:
+        guardians = _reminder_rows(fee_filter, late_fee)
+        report['reminders'] = len(guardians)
+        report['reminder_preview'] = [
+            {'phone': e164_to_local(g['phone']), 'students': g['students'], 'amount': g['amount']}
+            for g in guardians[:20]
+        ]
+        return report
+
+    # Stamp the swept rows so the reminders select exactly what this run changed
+    # (the new updated_at is also what refreshes every worker's cached fee summaries)
+    swept_at = datetime.utcnow()
+    result = db.session.execute(
+        update(Fee)
+        .where(*fee_filter)
+        .values(
+            status=FeeStatus.OVERDUE,
+            late_fee=func.coalesce(Fee.late_fee, 0) + late_fee,
+            updated_at=swept_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    report['overdue_fees'] = result.rowcount
+    logger.info(f"Fee sweep: {result.rowcount} fees marked overdue")
+
+    if send_reminders:
+        guardians = _reminder_rows((Fee.status == FeeStatus.OVERDUE, Fee.updated_at == swept_at))
+        report['reminders'] = len(guardians)
+        report['reminders_sent'], report['reminders_failed'] = send_fee_reminders(guardians)
+
+    return report
+
+
+def init_fee_sweeper(app, scheduler):
+    """Schedule the nightly sweep on an APScheduler scheduler"""
+    def job():
+        with app.app_context():
+            try:
+                report = sweep_overdue_fees()
+                logger.info(f"Overdue fee sweep finished: {report}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Overdue fee sweep failed: {e}", exc_info=True)
+            finally:
+                db.session.remove()
+
+    scheduler.add_job(
+        job,
+        trigger=CronTrigger(hour=app.config.get('FEE_SWEEP_HOUR', 1), minute=30),
+        id='overdue_fee_sweep',
+        name='Overdue Fee Sweep',
+        replace_existing=True
+    )
+    return scheduler
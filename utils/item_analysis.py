@@ -0,0 +1,199 @@
+"""
+Item Analysis
+Per-question statistics for a simple online exam: difficulty (p-value),
+point-biserial discrimination against the rest score, distractor
+frequencies and KR-20 reliability. All submitted attempts are decoded
+once into a student x question matrix computed with NumPy (see
+requirements.txt); a pure-Python fallback gives the same numbers where
+NumPy can't be installed. Results are cached per exam until its answer
+key or submitted attempts change.
+"""
+import json
+import math
+import threading
+from typing import Dict, Tuple
+
+from sqlalchemy import func
+from models import db, ExamQuestion, StudentExamAttempt
+from utils.exam_scoring import SUBMITTED_STATUSES, AnswerKey, answer_vector
+from utils.exam_shuffle import unshuffle_answers
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHOICES = ('A', 'B', 'C', 'D')
+TOO_EASY = 0.9  # p-value above which a question is flagged
+TOO_HARD = 0.2
+LOW_DISCRIMINATION = 0.2
+
+
+def _round(value, digits=4):
+    return None if value is None else round(float(value), digits)
+
+
+def _pearson(xs, ys):
+    """Pearson correlation; None when either side has no variance"""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    syy = sum((y - mean_y) ** 2 for y in ys)
+    return sxy / math.sqrt(sxx * syy) if sxx and syy else None
+
+
+def _statistics_python(correct):
+    """(p-values, point-biserials, total score variance) from a list of 0/1 rows"""
+    students, items = len(correct), len(correct[0])
+    totals = [sum(row) for row in correct]
+    p_values = [sum(row[j] for row in correct) / students for j in range(items)]
+    point_biserials = [
+        _pearson([row[j] for row in correct], [total - row[j] for row, total in zip(correct, totals)])
+        for j in range(items)
+    ]
+    mean = sum(totals) / students
+    variance = sum((t - mean) ** 2 for t in totals) / students
+    return p_values, point_biserials, variance
+
+
+def _statistics_numpy(correct):
+    matrix = np.asarray(correct, dtype=float)
+    totals = matrix.sum(axis=1)
+    rest = totals[:, None] - matrix
+    p_values = matrix.mean(axis=0)
+    centred_items = matrix - p_values
+    centred_rest = rest - rest.mean(axis=0)
+    sxy = (centred_items * centred_rest).sum(axis=0)
+    denominator = np.sqrt((centred_items ** 2).sum(axis=0) * (centred_rest ** 2).sum(axis=0))
+    point_biserials = [float(s / d) if d else None for s, d in zip(sxy, denominator)]
+    return [float(p) for p in p_values], point_biserials, float(totals.var())
+
+
+def _flags(p_value, point_biserial):
+    flags = []
+    if p_value > TOO_EASY:
+        flags.append('too_easy')
+    elif p_value < TOO_HARD:
+        flags.append('too_hard')
+    if point_biserial is None or point_biserial < LOW_DISCRIMINATION:
+        flags.append('low_discrimination')
+    return flags
+
+
+def compute_item_analysis(key, answer_sets, questions=None):
+    """
+    Item statistics for answer dicts/JSON scored against an AnswerKey
+    questions optionally maps question_number to its text.
+    """
+    questions = questions or {}
+    vectors = [answer_vector(key, answers) for answers in answer_sets]
+    items = len(key.numbers)
+    if not vectors or not items:
+        return {'attempts': len(vectors), 'questions': items, 'engine': None, 'mean_score': None,
+                'kr20': None, 'items': []}
+
+    correct = [[int(a == k) for a, k in zip(vector, key.answers)] for vector in vectors]
+    statistics = _statistics_numpy if np is not None else _statistics_python
+    p_values, point_biserials, variance = statistics(correct)
+
+    # KR-20 reliability of the whole exam
+    item_variance = sum(p * (1 - p) for p in p_values)
+    kr20 = (items / (items - 1)) * (1 - item_variance / variance) if items > 1 and variance else None
+
+    students = len(vectors)
+    result_items = []
+    for j, number in enumerate(key.numbers):
+        counts = {choice: 0 for choice in CHOICES}
+        blank = 0
+        for vector in vectors:
+            if vector[j] in counts:
+                counts[vector[j]] += 1
+            else:
+                blank += 1
+        result_items.append({
+            'question_number': number,
+            'question_text': questions.get(number),
+            'correct_answer': key.answers[j],
+            'p_value': _round(p_values[j]),
+            'point_biserial': _round(point_biserials[j]),
+            'distractors': {
+                choice: {'count': count, 'share': _round(count / students)}
+                for choice, count in counts.items()
+            },
+            'blank': {'count': blank, 'share': _round(blank / students)},
+            'flags': _flags(p_values[j], point_biserials[j])
+        })
+
+    return {
+        'attempts': students,
+        'questions': items,
+        'engine': 'numpy' if np is not None else 'python',
+        'mean_score': _round(sum(map(sum, correct)) / students, 2),
+        'kr20': _round(kr20),
+        'items': result_items
+    }
+
+
+def _exam_version(exam_id):
+    """Cheap fingerprint of an exam's answer key and submitted attempts"""
+    key = db.session.query(ExamQuestion.question_number, ExamQuestion.correct_answer)\
+        .filter(ExamQuestion.exam_id == exam_id)\
+        .order_by(ExamQuestion.question_number).all()
+    attempts = db.session.query(
+        func.count(StudentExamAttempt.id), func.max(StudentExamAttempt.submit_time), func.sum(StudentExamAttempt.score)
+    ).filter(
+        StudentExamAttempt.exam_id == exam_id,
+        StudentExamAttempt.status.in_(SUBMITTED_STATUSES)
+    ).one()
+    answer_key = AnswerKey(tuple(row[0] for row in key), tuple((row[1] or '').upper() for row in key))
+    return answer_key, (answer_key, tuple(attempts))
+
+
+class ItemAnalysisCache:
+    """Process-local item analysis per exam, recomputed when its version changes"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[tuple, dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, exam_id):
+        key, version = _exam_version(exam_id)
+        entry = self._entries.get(exam_id)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        attempts = db.session.query(
+            StudentExamAttempt.id, StudentExamAttempt.answers, StudentExamAttempt.shuffle_version
+        ).filter(
+            StudentExamAttempt.exam_id == exam_id,
+            StudentExamAttempt.status.in_(SUBMITTED_STATUSES)
+        ).all()
+        questions = dict(db.session.query(ExamQuestion.question_number, ExamQuestion.question_text)
+                         .filter(ExamQuestion.exam_id == exam_id).all())
+        # Distractor counts are reported in the original option letters
+        answers = [
+            unshuffle_answers(json.loads(row.answers) if row.answers else {}, row.id, row.shuffle_version, key.numbers)
+            for row in attempts
+        ]
+        analysis = compute_item_analysis(key, answers, questions)
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[exam_id] = (version, analysis)
+        return analysis
+
+    def invalidate(self, exam_id):
+        with self._lock:
+            self._entries.pop(exam_id, None)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+item_analysis_cache = ItemAnalysisCache()
@@ -1,16 +1,72 @@
 """
 Local Password Manager for Students
-Stores and verifies student passwords locally without database dependency
+Stores and verifies student passwords locally without database dependency.
+Credentials live in an indexed SQLite table (one row per phone) so every
+operation touches a single row and concurrent gunicorn workers don't lose writes.
 """
 import json
 import os
 import random
+import sqlite3
 import string
+import threading
+from contextlib import contextmanager
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.phone import normalize_phone
 
 # Get the project root directory (where app.py is located)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-PASSWORD_FILE = os.path.join(PROJECT_ROOT, 'student_passwords.json')
+PASSWORD_FILE = os.path.join(PROJECT_ROOT, 'student_passwords.json')  # Legacy store, see import_json_passwords
+PASSWORD_DB = os.environ.get('STUDENT_PASSWORD_DB', os.path.join(PROJECT_ROOT, 'student_passwords.db'))
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS student_passwords (
+    phone_key TEXT PRIMARY KEY,
+    phone_number TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    plain TEXT,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID
+"""
+UPSERT_SQL = (
+    "INSERT INTO student_passwords (phone_key, phone_number, password_hash, plain) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(phone_key) DO UPDATE SET phone_number = excluded.phone_number, "
+    "password_hash = excluded.password_hash, plain = excluded.plain, updated_at = CURRENT_TIMESTAMP"
+)
+IMPORT_SQL = (
+    "INSERT INTO student_passwords (phone_key, phone_number, password_hash, plain) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(phone_key) DO NOTHING"
+)
+
+_local = threading.local()
+
+def _phone_key(phone_number):
+    """Rows are keyed by E.164 so every way of writing a number hits the same row"""
+    return normalize_phone(phone_number) or str(phone_number)
+
+def _connection():
+    """One connection per thread (and per forked worker process)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(PASSWORD_DB, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(CREATE_TABLE_SQL)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+@contextmanager
+def _transaction():
+    """Run several statements in one write transaction"""
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
 
 def generate_student_password(length=8):
     """Generate a random password for student"""
@@ -18,26 +74,33 @@ def generate_student_password(length=8):
     uppercase = ''.join(random.choices(string.ascii_uppercase, k=2))
     digits = ''.join(random.choices(string.digits, k=4))
     lowercase = ''.join(random.choices(string.ascii_lowercase, k=2))
-    
+
     password = uppercase + digits + lowercase
     return password
 
 def load_passwords():
-    """Load passwords from local file"""
+    """Load all stored passwords as {phone: {'password_hash', 'plain'?}}"""
     try:
-        if os.path.exists(PASSWORD_FILE):
-            with open(PASSWORD_FILE, 'r') as f:
-                return json.load(f)
-        return {}
+        passwords = {}
+        for row in _connection().execute("SELECT phone_number, password_hash, plain FROM student_passwords"):
+            entry = {'password_hash': row['password_hash']}
+            if row['plain'] is not None:
+                entry['plain'] = row['plain']
+            passwords[row['phone_number']] = entry
+        return passwords
     except Exception as e:
         print(f"Error loading passwords: {e}")
         return {}
 
 def save_passwords(passwords):
-    """Save passwords to local file"""
+    """Upsert many {phone: {'password_hash', 'plain'?}} entries in one transaction"""
     try:
-        with open(PASSWORD_FILE, 'w') as f:
-            json.dump(passwords, f, indent=2)
+        rows = [
+            (_phone_key(phone), phone, data['password_hash'], data.get('plain'))
+            for phone, data in passwords.items() if data.get('password_hash')
+        ]
+        with _transaction() as conn:
+            conn.executemany(UPSERT_SQL, rows)
         return True
     except Exception as e:
         print(f"Error saving passwords: {e}")
@@ -51,77 +114,83 @@ def set_student_password(phone_number, password=None):
     """
     if password is None:
         password = generate_student_password()
-    
-    # Load existing passwords
-    passwords = load_passwords()
-    
-    # Store hashed password
-    passwords[phone_number] = {
-        'password_hash': generate_password_hash(password),
-        'plain': password  # Store plain text temporarily for teacher to see
-    }
-    
-    # Save to file
-    save_passwords(passwords)
-    
+
+    # Store hashed password, plus plain text temporarily for teacher to see
+    _connection().execute(
+        UPSERT_SQL,
+        (_phone_key(phone_number), phone_number, generate_password_hash(password), password)
+    )
+
     return password
 
 def verify_student_password(phone_number, password):
     """Verify student password from local storage"""
-    passwords = load_passwords()
-    
-    if phone_number not in passwords:
+    row = _connection().execute(
+        "SELECT password_hash FROM student_passwords WHERE phone_key = ?", (_phone_key(phone_number),)
+    ).fetchone()
+
+    if row is None:
         return False
-    
-    stored = passwords[phone_number]
-    
-    # Check against hashed password
-    if 'password_hash' in stored:
-        return check_password_hash(stored['password_hash'], password)
-    
-    return False
+
+    return check_password_hash(row['password_hash'], password)
 
 def get_student_password(phone_number):
     """Get student's plain password (for teacher to see)"""
-    passwords = load_passwords()
-    
-    if phone_number in passwords and 'plain' in passwords[phone_number]:
-        return passwords[phone_number]['plain']
-    
-    return None
+    row = _connection().execute(
+        "SELECT plain FROM student_passwords WHERE phone_key = ?", (_phone_key(phone_number),)
+    ).fetchone()
+
+    return row['plain'] if row else None
 
 def remove_plain_password(phone_number):
     """Remove plain text password (after teacher has seen it)"""
-    passwords = load_passwords()
-    
-    if phone_number in passwords and 'plain' in passwords[phone_number]:
-        del passwords[phone_number]['plain']
-        save_passwords(passwords)
-        return True
-    
-    return False
+    cursor = _connection().execute(
+        "UPDATE student_passwords SET plain = NULL, updated_at = CURRENT_TIMESTAMP "
+        "WHERE phone_key = ? AND plain IS NOT NULL",
+        (_phone_key(phone_number),)
+    )
+    return cursor.rowcount > 0
 
 def get_all_student_passwords():
     """Get all student passwords (for teacher dashboard)"""
-    passwords = load_passwords()
-    result = []
-    
-    for phone, data in passwords.items():
-        result.append({
-            'phoneNumber': phone,
-            'password': data.get('plain', 'Password already collected'),
-            'hasPassword': True
-        })
-    
-    return result
+    rows = _connection().execute(
+        "SELECT phone_number, plain FROM student_passwords ORDER BY phone_key"
+    )
+
+    return [{
+        'phoneNumber': row['phone_number'],
+        'password': row['plain'] if row['plain'] is not None else 'Password already collected',
+        'hasPassword': True
+    } for row in rows]
 
 def delete_student_password(phone_number):
     """Delete student password"""
-    passwords = load_passwords()
-    
-    if phone_number in passwords:
-        del passwords[phone_number]
-        save_passwords(passwords)
-        return True
-    
-    return False
+    cursor = _connection().execute(
+        "DELETE FROM student_passwords WHERE phone_key = ?", (_phone_key(phone_number),)
+    )
+    return cursor.rowcount > 0
+
+def import_json_passwords(json_path=PASSWORD_FILE):
+    """
+    One-time import of the legacy student_passwords.json file
+    Rows already in the SQLite store win over the JSON copy.
+    Returns (imported, skipped).
+    """
+    if not os.path.exists(json_path):
+        return 0, 0
+
+    with open(json_path, 'r') as f:
+        passwords = json.load(f)
+
+    rows = [
+        (_phone_key(phone), phone, data['password_hash'], data.get('plain'))
+        for phone, data in passwords.items()
+        if isinstance(data, dict) and data.get('password_hash')
+    ]
+
+    with _transaction() as conn:
+        before = conn.total_changes
+        conn.executemany(IMPORT_SQL, rows)
+        imported = conn.total_changes - before
+
+    return imported, len(passwords) - imported
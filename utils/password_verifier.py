@@ -0,0 +1,168 @@
+"""
+Password Verification Service
+Caps concurrent password hash checks across all worker processes with a
+fixed set of lock files, so a login spike can't pin every worker on
+hashing: a request that finds no free slot fails fast. Adds a short-lived
+per-phone negative cache and per-phone failure throttling.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Dict, Tuple
+
+import bcrypt
+from flask import current_app
+from werkzeug.security import check_password_hash as werkzeug_check_password_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers run without the cross-process cap
+    fcntl = None
+
+
+class VerifierBusy(Exception):
+    """Raised when every verification slot is taken"""
+
+
+class LoginThrottled(Exception):
+    """Raised when a phone number has too many recent failed logins"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Too many failed login attempts, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+def check_password(password_hash, password):
+    """Check a password against a bcrypt or werkzeug hash"""
+    if not password_hash or not password:
+        return False
+    try:
+        if password_hash.startswith('$2'):
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        return werkzeug_check_password_hash(password_hash, password)
+    except ValueError:
+        # Unknown or malformed hash format
+        return False
+
+
+class _VerifySlot:
+    """One held slot file; releasing unlocks it (so does the process exiting)"""
+
+    def __init__(self, fd=None):
+        self._fd = fd
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class PasswordVerifier:
+    """Slot-capped, fail-fast password verification with negative caching and throttling"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._negative: Dict[bytes, float] = {}
+        self._failures: Dict[str, Tuple[int, float]] = {}
+        self.stats = {'verified': 0, 'negative_hits': 0, 'rejected_busy': 0, 'throttled': 0}
+
+    def _config(self, key, default):
+        try:
+            return current_app.config.get(key, default)
+        except RuntimeError:
+            return default
+
+    def _acquire_slot(self):
+        """
+        Lock a free slot file shared by every worker process
+        Returns None when all LOGIN_VERIFY_SLOTS are held elsewhere.
+        """
+        directory = self._config('LOGIN_VERIFY_SLOT_DIR', None)
+        if fcntl is None or not directory:
+            return _VerifySlot()
+        os.makedirs(directory, exist_ok=True)
+        slots = self._config('LOGIN_VERIFY_SLOTS', 4)
+        start = random.randrange(slots)
+        for i in range(slots):
+            fd = os.open(os.path.join(directory, f'slot-{(start + i) % slots}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            return _VerifySlot(fd)
+        return None
+
+    # THROTTLING
+
+    def check_throttle(self, phone):
+        """Raise LoginThrottled if the phone has exhausted its failure budget"""
+        entry = self._failures.get(phone)
+        if entry is None:
+            return
+        count, window_end = entry
+        now = time.monotonic()
+        if window_end <= now:
+            self._failures.pop(phone, None)
+        elif count >= self._config('LOGIN_MAX_FAILURES', 5):
+            self.stats['throttled'] += 1
+            raise LoginThrottled(int(window_end - now) + 1)
+
+    def record_failure(self, phone):
+        now = time.monotonic()
+        with self._lock:
+            count, window_end = self._failures.get(phone, (0, 0))
+            if window_end <= now:
+                count, window_end = 0, now + self._config('LOGIN_THROTTLE_WINDOW', 300)
+            self._failures[phone] = (count + 1, window_end)
+
+    def record_success(self, phone):
+        self._failures.pop(phone, None)
+
+    # VERIFICATION
+
+    def _negative_key(self, phone, password_hash, password):
+        # Keyed on the stored hash too, so a password change invalidates entries
+        return hashlib.blake2b(
+            '\0'.join((phone, password_hash, password)).encode('utf-8'), digest_size=16
+        ).digest()
+
+    def verify(self, phone, password_hash, password):
+        """
+        Verify a password while holding a verification slot
+        Raises VerifierBusy when all slots are in use instead of queueing.
+        """
+        if not password_hash or not password:
+            return False
+
+        key = self._negative_key(phone, password_hash, password)
+        expires = self._negative.get(key)
+        if expires is not None:
+            if expires > time.monotonic():
+                self.stats['negative_hits'] += 1
+                return False
+            self._negative.pop(key, None)
+
+        slot = self._acquire_slot()
+        if slot is None:
+            self.stats['rejected_busy'] += 1
+            raise VerifierBusy()
+        try:
+            valid = check_password(password_hash, password)
+        finally:
+            slot.release()
+        self.stats['verified'] += 1
+
+        if not valid:
+            with self._lock:
+                if len(self._negative) >= 10000:
+                    now = time.monotonic()
+                    self._negative = {k: v for k, v in self._negative.items() if v > now}
+                self._negative[key] = time.monotonic() + self._config('LOGIN_NEGATIVE_CACHE_TTL', 60)
+        return valid
+
+
+password_verifier = PasswordVerifier()
@@ -0,0 +1,64 @@
+"""
+Phone Number Utilities
+Single source of truth for Bangladeshi mobile number normalization
+"""
+import re
+from functools import lru_cache
+
+_NON_DIGITS = re.compile(r'\D')
+
+COUNTRY_CODE = '880'
+E164_PREFIX = '+880'
+
+
+@lru_cache(maxsize=4096)
+def normalize_phone(phone):
+    """
+    Normalize a Bangladeshi mobile number to E.164 format (+8801XXXXXXXXX)
+    Accepts local (01XXXXXXXXX), national (1XXXXXXXXX) and international
+    (880..., +880..., 00880...) forms with any separators.
+    Returns None when the number is not a valid mobile number.
+    """
+    if not phone:
+        return None
+
+    digits = _NON_DIGITS.sub('', str(phone))
+
+    if digits.startswith('00'):
+        digits = digits[2:]
+
+    if digits.startswith(COUNTRY_CODE) and len(digits) in (13, 14):
+        # 8801XXXXXXXXX (standard) or 88001XXXXXXXXX (legacy with trunk zero)
+        digits = digits[3:]
+
+    if len(digits) == 10 and digits.startswith('1'):
+        digits = '0' + digits
+
+    if len(digits) == 11 and digits.startswith('01'):
+        return E164_PREFIX + digits[1:]
+
+    return None
+
+
+def e164_to_local(phone_e164):
+    """Convert a stored E.164 number to the local 11-digit format (01XXXXXXXXX)"""
+    if not phone_e164:
+        return None
+    return '0' + phone_e164[len(E164_PREFIX):]
+
+
+def e164_to_gateway(phone_e164):
+    """Convert a stored E.164 number to the BulkSMSBD format (8801XXXXXXXXX)"""
+    if not phone_e164:
+        return None
+    return phone_e164[1:]
+
+
+def local_phone(phone):
+    """Validate any phone input and return the local 11-digit format, or None"""
+    return e164_to_local(normalize_phone(phone))
+
+
+def gateway_phone(phone):
+    """Validate any phone input and return the SMS gateway format, or None"""
+    return e164_to_gateway(normalize_phone(phone))
@@ -101,16 +101,21 @@ def serialize_user(user, include_sensitive=False):
         user_data['batches'] = [serialize_batch(batch) for batch in getattr(user, 'batches', []) if getattr(batch, 'is_active', False)]
     return user_data
 
-def serialize_batch(batch):
-    """Serialize batch model"""
+def serialize_batch(batch, student_count=None):
+    """
+    Serialize batch model
+    Pass student_count (e.g. from Batch.student_counts) when serializing many
+    batches; otherwise it is counted with one query per batch.
+    """
     batch_data = serialize_model(batch)
     class_name = None
     description = getattr(batch, 'description', None)
     if description and ' - ' in description:
         class_name = description.split(' - ')[0]
     batch_data['class'] = class_name
-    students = getattr(batch, 'students', [])
-    batch_data['student_count'] = len([s for s in students if getattr(s, 'is_active', False)])
+    if student_count is None:
+        student_count = batch.current_students if hasattr(batch, 'current_students') else 0
+    batch_data['student_count'] = student_count
     batch_data['currentStudents'] = batch_data['student_count']
     batch_data['maxStudents'] = getattr(batch, 'max_students', 50) or 50
     batch_data['isActive'] = getattr(batch, 'is_active', True)
@@ -0,0 +1,197 @@
+"""
+Results Analytics
+Precomputed monthly result analytics per (batch, year): the month series,
+grade histogram and top-10 performers. Aggregates are kept per
+(batch, month) slice, and every read checks one grouped version query of
+the year's results, so whichever worker calculated a month, each worker
+reloads only the slices that changed. The merged views carry an ETag for
+conditional GETs.
+"""
+import calendar
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func, select
+from models import db, MonthlyResult, User, Batch
+
+TOP_PERFORMERS = 10
+
+SliceKey = Tuple[int, int]  # (batch_id, month)
+ViewKey = Tuple[Optional[int], int]  # (batch_id or None for all batches, year)
+
+
+def _empty_slice():
+    return {'count': 0, 'sum_percentage': 0.0, 'sum_attendance': 0.0, 'grades': {}, 'top': []}
+
+
+def load_result_slices(year, batch_id=None, month=None):
+    """Aggregates and top performers per (batch, month) of a year in two queries"""
+    filters = [MonthlyResult.year == year]
+    if batch_id:
+        filters.append(MonthlyResult.batch_id == batch_id)
+    if month:
+        filters.append(MonthlyResult.month == month)
+
+    slices: Dict[SliceKey, dict] = {}
+    grade_rows = db.session.query(
+        MonthlyResult.batch_id, MonthlyResult.month, MonthlyResult.grade,
+        func.count(MonthlyResult.id),
+        func.coalesce(func.sum(MonthlyResult.percentage), 0),
+        func.coalesce(func.sum(MonthlyResult.attendance_percentage), 0)
+    ).filter(*filters).group_by(MonthlyResult.batch_id, MonthlyResult.month, MonthlyResult.grade)
+    for row_batch, row_month, grade, count, sum_percentage, sum_attendance in grade_rows:
+        entry = slices.setdefault((row_batch, row_month), _empty_slice())
+        entry['count'] += count
+        entry['sum_percentage'] += float(sum_percentage)
+        entry['sum_attendance'] += float(sum_attendance)
+        entry['grades'][grade] = entry['grades'].get(grade, 0) + count
+
+    position = func.row_number().over(
+        partition_by=(MonthlyResult.batch_id, MonthlyResult.month),
+        order_by=(MonthlyResult.percentage.desc(), MonthlyResult.id)
+    ).label('position')
+    ranked = select(MonthlyResult.id, position).where(*filters).subquery()
+    top_rows = db.session.query(
+        MonthlyResult.id, MonthlyResult.batch_id, MonthlyResult.month, MonthlyResult.percentage,
+        MonthlyResult.grade, MonthlyResult.rank, User.first_name, User.last_name, Batch.name
+    ).join(ranked, ranked.c.id == MonthlyResult.id)\
+     .join(User, User.id == MonthlyResult.user_id)\
+     .outerjoin(Batch, Batch.id == MonthlyResult.batch_id)\
+     .filter(ranked.c.position <= TOP_PERFORMERS)
+    for row in top_rows:
+        slices.setdefault((row.batch_id, row.month), _empty_slice())['top'].append({
+            'id': row.id,
+            'student_name': f"{row.first_name} {row.last_name}",
+            'batch_name': row.name or 'Unknown',
+            'month': calendar.month_name[row.month],
+            'percentage': row.percentage,
+            'grade': row.grade,
+            'rank': row.rank
+        })
+    return slices
+
+
+def load_slice_versions(year):
+    """Count and latest calculated_at per (batch, month) of a year; calculation rewrites calculated_at"""
+    rows = db.session.query(
+        MonthlyResult.batch_id, MonthlyResult.month, func.count(MonthlyResult.id), func.max(MonthlyResult.calculated_at)
+    ).filter(MonthlyResult.year == year).group_by(MonthlyResult.batch_id, MonthlyResult.month)
+    return {(batch_id, month): (count, calculated_at) for batch_id, month, count, calculated_at in rows}
+
+
+def build_results_analytics(slices, year, batch_id=None):
+    """Merge (batch, month) slices into the analytics payload"""
+    months: Dict[int, dict] = {}
+    grades: Dict[Optional[str], int] = {}
+    top = []
+    for (slice_batch, month), entry in slices.items():
+        if batch_id and slice_batch != batch_id:
+            continue
+        totals = months.setdefault(month, {'count': 0, 'sum_percentage': 0.0, 'sum_attendance': 0.0})
+        totals['count'] += entry['count']
+        totals['sum_percentage'] += entry['sum_percentage']
+        totals['sum_attendance'] += entry['sum_attendance']
+        for grade, count in entry['grades'].items():
+            grades[grade] = grades.get(grade, 0) + count
+        top.extend(entry['top'])
+
+    total_results = sum(m['count'] for m in months.values())
+    top.sort(key=lambda r: (-(r['percentage'] or 0), r['id']))
+
+    return {
+        'year': year,
+        'batch_id': batch_id,
+        'total_results': total_results,
+        'average_performance': round(sum(m['sum_percentage'] for m in months.values()) / total_results, 2) if total_results else 0,
+        'average_attendance': round(sum(m['sum_attendance'] for m in months.values()) / total_results, 2) if total_results else 0,
+        'monthly_trends': [{
+            'month': month,
+            'month_name': calendar.month_name[month],
+            'avg_percentage': round(totals['sum_percentage'] / totals['count'], 2),
+            'avg_attendance': round(totals['sum_attendance'] / totals['count'], 2),
+            'student_count': totals['count']
+        } for month, totals in sorted(months.items())],
+        'grade_distribution': [
+            {'grade': grade, 'count': count}
+            for grade, count in sorted(grades.items(), key=lambda g: (g[0] is None, g[0] or ''))
+        ],
+        'top_performers': [{k: v for k, v in row.items() if k != 'id'} for row in top[:TOP_PERFORMERS]]
+    }
+
+
+def analytics_etag(analytics):
+    return hashlib.sha1(json.dumps(analytics, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ResultsAnalyticsCache:
+    """
+    Process-local cache of results analytics per (batch_id, year)
+    Slices of a year are loaded together on first use; afterwards a slice
+    is reloaded when its version changes. The TTL only picks up renamed
+    students and batches.
+    """
+
+    def __init__(self):
+        self._years: Dict[int, Tuple[Dict[SliceKey, dict], Dict[SliceKey, tuple], float]] = {}
+        self._views: Dict[ViewKey, Tuple[dict, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self):
+        try:
+            return current_app.config.get('RESULTS_ANALYTICS_CACHE_TTL', 3600)
+        except RuntimeError:
+            return 3600
+
+    def _year_slices(self, year):
+        # Versions first: a write landing while slices load leaves a mismatch for the next read
+        versions = load_slice_versions(year)
+        entry = self._years.get(year)
+        if entry is None or entry[2] <= time.monotonic():
+            slices, expires, stale_batches = load_result_slices(year), time.monotonic() + self._ttl(), None
+        else:
+            changed = [key for key in versions.keys() | entry[1].keys() if versions.get(key) != entry[1].get(key)]
+            if not changed:
+                return entry[0]
+            # Swap in a new dict so views being built from the old one aren't mutated underneath
+            slices = {key: value for key, value in entry[0].items() if key not in changed}
+            for batch_id, month in changed:
+                slices.update(load_result_slices(year, batch_id, month))
+            expires, stale_batches = entry[2], {batch_id for batch_id, _ in changed}
+
+        with self._lock:
+            self._years[year] = (slices, versions, expires)
+            for key in [key for key in self._views if key[1] == year]:
+                if stale_batches is None or key[0] is None or key[0] in stale_batches:
+                    del self._views[key]
+        return slices
+
+    def get(self, batch_id=None, year=None):
+        """(analytics, etag) for a batch (or all batches) in a year"""
+        key = (batch_id or None, year)
+        slices = self._year_slices(year)
+        view = self._views.get(key)
+        if view is not None:
+            self.hits += 1
+            return view
+
+        self.misses += 1
+        analytics = build_results_analytics(slices, year, key[0])
+        view = (analytics, analytics_etag(analytics))
+        with self._lock:
+            self._views[key] = view
+        return view
+
+    def clear(self):
+        with self._lock:
+            self._years.clear()
+            self._views.clear()
+
+    def stats(self):
+        return {'years': len(self._years), 'views': len(self._views), 'hits': self.hits, 'misses': self.misses}
+
+results_analytics_cache = ResultsAnalyticsCache()
@@ -0,0 +1,165 @@
+"""
+Signed Session Claims
+Stateless identity claims stored in the session plus a short-TTL,
+process-local cache of user validity (active flag + revocation epoch).
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Tuple
+from flask import current_app, session
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import event, inspect
+from models import db, User
+
+CLAIMS_SESSION_KEY = 'auth_claims'
+CLAIMS_SALT = 'auth-claims'
+
+# Changes to these attributes revoke every outstanding session of the user;
+# batches is included because the claims carry the enrolled batch ids
+REVOKING_ATTRIBUTES = ('is_active', 'is_archived', 'password_hash', 'batches')
+
+@dataclass(frozen=True)
+class SessionClaims:
+    """Identity claims carried in the session"""
+    user_id: int
+    role: str
+    batch_ids: FrozenSet[int] = field(default_factory=frozenset)
+    issued_at: int = 0
+    epoch: int = 0
+
+    def to_payload(self):
+        return {
+            'uid': self.user_id,
+            'role': self.role,
+            'bids': sorted(self.batch_ids),
+            'iat': self.issued_at,
+            'epoch': self.epoch
+        }
+
+    def is_stale(self, max_age):
+        """Claims older than max_age are re-issued from the database"""
+        return time.time() - self.issued_at > max_age
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(
+            user_id=int(payload['uid']),
+            role=payload['role'],
+            batch_ids=frozenset(payload.get('bids') or ()),
+            issued_at=int(payload.get('iat') or 0),
+            epoch=int(payload.get('epoch') or 0)
+        )
+
+def _serializer():
+    return URLSafeSerializer(current_app.secret_key, salt=CLAIMS_SALT)
+
+def claims_mode_enabled():
+    """Whether requests should be authenticated from signed claims"""
+    return current_app.config.get('AUTH_MODE') == 'claims'
+
+def issue_session_claims(user, batch_ids=None):
+    """Sign claims for the user and store them in the session"""
+    if batch_ids is None:
+        batch_ids = [batch.id for batch in user.batches if batch.is_active]
+    claims = SessionClaims(
+        user_id=user.id,
+        role=user.role.value,
+        batch_ids=frozenset(batch_ids),
+        issued_at=int(time.time()),
+        epoch=user.auth_epoch or 0
+    )
+    session[CLAIMS_SESSION_KEY] = _serializer().dumps(claims.to_payload())
+    user_validity_cache.prime(user.id, bool(user.is_active), claims.epoch)
+    return claims
+
+def load_session_claims():
+    """
+    Verify and return the claims stored in the session
+    Returns None when claims are missing or tampered with. Stale claims are
+    still returned so their revocation epoch can be checked before re-issuing.
+    """
+    token = session.get(CLAIMS_SESSION_KEY)
+    if not token:
+        return None
+    try:
+        payload = _serializer().loads(token)
+    except BadSignature:
+        return None
+    try:
+        return SessionClaims.from_payload(payload)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class UserValidityCache:
+    """Process-local TTL cache of (is_active, auth_epoch) per user"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[bool, int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self):
+        try:
+            return current_app.config.get('USER_VALIDITY_TTL', 30)
+        except RuntimeError:
+            return 30
+
+    def prime(self, user_id, is_active, epoch):
+        """Store a freshly loaded state for the user"""
+        entry = (is_active, epoch, time.monotonic() + self._ttl())
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[user_id] = entry
+        return entry
+
+    def invalidate(self, user_id):
+        """Forget the cached state so the next check reloads it"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for user_id in [uid for uid, entry in self._entries.items() if entry[2] <= now]:
+            del self._entries[user_id]
+
+    def is_valid(self, claims: SessionClaims) -> bool:
+        """Check that the claimed user is still active and not revoked"""
+        entry = self._entries.get(claims.user_id)
+        if entry is not None and entry[2] > time.monotonic():
+            self.hits += 1
+        else:
+            self.misses += 1
+            row = db.session.query(User.is_active, User.auth_epoch).filter(User.id == claims.user_id).first()
+            if row is None:
+                self.invalidate(claims.user_id)
+                return False
+            entry = self.prime(claims.user_id, bool(row.is_active), row.auth_epoch or 0)
+        is_active, epoch, _ = entry
+        return is_active and epoch == claims.epoch
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+user_validity_cache = UserValidityCache()
+
+def revoke_user_sessions(user):
+    """Bump the user's revocation epoch; all previously issued claims become invalid"""
+    user.auth_epoch = (user.auth_epoch or 0) + 1
+    user_validity_cache.invalidate(user.id)
+
+@event.listens_for(User, 'before_update')
+def _revoke_on_security_change(mapper, connection, target):
+    """Deactivation, archiving, password and enrollment changes revoke outstanding sessions"""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in REVOKING_ATTRIBUTES):
+        revoke_user_sessions(target)
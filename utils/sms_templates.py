@@ -3,7 +3,7 @@ SMS Template Utilities
 Centralized SMS template management with database persistence
 """
 import logging
-from flask import session
+from flask import session, has_request_context
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +30,9 @@ def get_sms_template(template_type):
                 logger.debug(f"Using database template for {template_type}")
                 return saved_message
         
-        # PRIORITY 2: Fall back to session template (temporary override)
-        custom_templates = session.get('custom_templates', {})
+        # PRIORITY 2: Fall back to session template (temporary override);
+        # scheduled jobs have no session
+        custom_templates = session.get('custom_templates', {}) if has_request_context() else {}
         custom_template = custom_templates.get(template_type)
         
         if custom_template:
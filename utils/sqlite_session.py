@@ -0,0 +1,199 @@
+"""
+SQLite Session Store
+Server-side sessions in a WAL-mode SQLite table shared by all gunicorn
+workers. Sessions are only written when their contents changed (or their
+expiry is due for a refresh) and expired rows are deleted in small batches.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from flask_session.defaults import Defaults
+
+# Constant SQL so sqlite3's per-connection statement cache keeps them prepared
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    expiry INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+CREATE_EXPIRY_INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_sessions_expiry ON sessions (expiry)"
+SELECT_SQL = "SELECT data, expiry FROM sessions WHERE id = ?"
+UPSERT_SQL = (
+    "INSERT INTO sessions (id, data, expiry) VALUES (?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expiry = excluded.expiry"
+)
+DELETE_SQL = "DELETE FROM sessions WHERE id = ?"
+DELETE_EXPIRED_BATCH_SQL = (
+    "DELETE FROM sessions WHERE id IN "
+    "(SELECT id FROM sessions WHERE expiry <= ? LIMIT ?)"
+)
+METRICS_SQL = (
+    "SELECT COUNT(*), COALESCE(SUM(length(data)), 0), COALESCE(MAX(length(data)), 0), "
+    "COALESCE(SUM(expiry <= ?), 0) FROM sessions"
+)
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class SQLiteSessionInterface(ServerSideSessionInterface):
+    """Flask-Session backend storing sessions in a shared SQLite database"""
+
+    ttl = False
+
+    def __init__(
+        self,
+        app,
+        db_path,
+        key_prefix: str = Defaults.SESSION_KEY_PREFIX,
+        use_signer: bool = Defaults.SESSION_USE_SIGNER,
+        permanent: bool = Defaults.SESSION_PERMANENT,
+        sid_length: int = Defaults.SESSION_ID_LENGTH,
+        serialization_format: str = Defaults.SESSION_SERIALIZATION_FORMAT,
+        cleanup_n_requests: Optional[int] = Defaults.SESSION_CLEANUP_N_REQUESTS,
+        cleanup_batch_size: int = 500,
+        busy_timeout: float = 5.0,
+    ):
+        self.db_path = str(db_path)
+        self.cleanup_batch_size = cleanup_batch_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {'reads': 0, 'misses': 0, 'writes': 0, 'skipped_writes': 0, 'deletes': 0, 'expired_deleted': 0}
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(CREATE_TABLE_SQL)
+            conn.execute(CREATE_EXPIRY_INDEX_SQL)
+        finally:
+            # Don't leak a connection opened before gunicorn forks its workers
+            conn.close()
+
+        super().__init__(
+            app,
+            key_prefix=key_prefix,
+            use_signer=use_signer,
+            permanent=permanent,
+            sid_length=sid_length,
+            serialization_format=serialization_format,
+            cleanup_n_requests=cleanup_n_requests,
+        )
+
+    # CONNECTION HANDLING
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def _conn(self):
+        """One connection per thread, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    # STORAGE METHODS
+
+    def _retrieve_session_data(self, store_id: str) -> Optional[dict]:
+        row = self._conn.execute(SELECT_SQL, (store_id,)).fetchone()
+        now = int(time.time())
+        if row is None or row[1] <= now:
+            self._local.loaded = None
+            self._count('misses')
+            return None
+
+        data, expiry = row
+        self._local.loaded = (store_id, _digest(data), expiry)
+        self._count('reads')
+        return self.serializer.decode(data)
+
+    def _upsert_session(self, session_lifetime: timedelta, session: ServerSideSession, store_id: str) -> None:
+        data = self.serializer.encode(session)
+        lifetime = int(session_lifetime.total_seconds())
+        now = int(time.time())
+
+        # Skip the write when the same session was loaded unchanged and more
+        # than half of its lifetime remains
+        loaded = getattr(self._local, 'loaded', None)
+        if loaded is not None and loaded[0] == store_id:
+            _, digest, expiry = loaded
+            if digest == _digest(data) and expiry - now > lifetime // 2:
+                self._count('skipped_writes')
+                return
+
+        expiry = now + lifetime
+        self._conn.execute(UPSERT_SQL, (store_id, data, expiry))
+        self._local.loaded = (store_id, _digest(data), expiry)
+        self._count('writes')
+
+    def _delete_session(self, store_id: str) -> None:
+        self._conn.execute(DELETE_SQL, (store_id,))
+        self._local.loaded = None
+        self._count('deletes')
+
+    def _delete_expired_sessions(self) -> int:
+        """Delete expired sessions in short transactions so writers aren't blocked"""
+        now = int(time.time())
+        total = 0
+        while True:
+            deleted = self._conn.execute(DELETE_EXPIRED_BATCH_SQL, (now, self.cleanup_batch_size)).rowcount
+            total += deleted
+            if deleted < self.cleanup_batch_size:
+                break
+        if total:
+            self._count('expired_deleted', total)
+            self.app.logger.info(f"Deleted {total} expired sessions")
+        return total
+
+    # METRICS
+
+    def get_metrics(self):
+        """Session count and size in the store plus this worker's counters"""
+        count, total_bytes, max_bytes, expired = self._conn.execute(METRICS_SQL, (int(time.time()),)).fetchone()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            'sessions': count,
+            'expired_sessions': expired,
+            'total_bytes': total_bytes,
+            'average_bytes': round(total_bytes / count, 1) if count else 0,
+            'max_bytes': max_bytes,
+            'worker_pid': os.getpid(),
+            'worker_counters': stats,
+        }
+
+
+def init_sqlite_session(app):
+    """Install the SQLite session store on the app"""
+    config = app.config
+    app.session_interface = SQLiteSessionInterface(
+        app,
+        db_path=config['SESSION_SQLITE_PATH'],
+        key_prefix=config.get('SESSION_KEY_PREFIX', Defaults.SESSION_KEY_PREFIX),
+        use_signer=config.get('SESSION_USE_SIGNER', Defaults.SESSION_USE_SIGNER),
+        permanent=config.get('SESSION_PERMANENT', Defaults.SESSION_PERMANENT),
+        sid_length=config.get('SESSION_ID_LENGTH', Defaults.SESSION_ID_LENGTH),
+        serialization_format=config.get('SESSION_SERIALIZATION_FORMAT', Defaults.SESSION_SERIALIZATION_FORMAT),
+        cleanup_n_requests=config.get('SESSION_CLEANUP_N_REQUESTS', Defaults.SESSION_CLEANUP_N_REQUESTS),
+        cleanup_batch_size=config.get('SESSION_SQLITE_CLEANUP_BATCH', 500),
+    )
+    return app.session_interface
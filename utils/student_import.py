@@ -0,0 +1,216 @@
+"""
+Bulk Student Import
+Set-based import pipeline: rows are streamed in chunks, duplicates are found
+with one IN query per chunk, users and batch enrollments are inserted with
+executemany, and a row-level error report is returned at the end.
+"""
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import insert, select
+from models import db, User, UserRole, Batch, user_batches
+from utils.phone import normalize_phone, e164_to_local
+from utils.password_generator import generate_simple_unique_password
+from utils.bulk_credentials import hash_passwords, DEFAULT_ROUNDS
+
+IMPORT_CHUNK_SIZE = 500
+
+# Accepted CSV header spellings -> import field
+FIELD_ALIASES = {
+    'firstname': 'firstName', 'first_name': 'firstName', 'first name': 'firstName',
+    'lastname': 'lastName', 'last_name': 'lastName', 'last name': 'lastName',
+    'phonenumber': 'phoneNumber', 'phone_number': 'phoneNumber', 'phone': 'phoneNumber',
+    'email': 'email',
+    'guardianphone': 'guardianPhone', 'guardian_phone': 'guardianPhone',
+    'guardianname': 'guardianName', 'guardian_name': 'guardianName',
+    'batchid': 'batchId', 'batch_id': 'batchId',
+    'studentid': 'studentId', 'student_id': 'studentId',
+}
+
+REQUIRED_FIELDS = ('firstName', 'lastName', 'phoneNumber')
+
+
+def iter_csv_rows(stream, encoding='utf-8-sig'):
+    """Yield import rows from a binary CSV stream without reading it all into memory"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding=encoding, newline=''))
+    for row in reader:
+        yield {
+            FIELD_ALIASES.get(key.strip().lower(), key.strip()): (value.strip() if isinstance(value, str) else value)
+            for key, value in row.items() if key
+        }
+
+
+class StudentImportReport:
+    """Row-level outcome of an import"""
+
+    def __init__(self):
+        self.successful = []
+        self.failed = []
+
+    def fail(self, row_number, error, data):
+        self.failed.append({'row': row_number, 'error': error, 'data': data})
+
+    def to_dict(self):
+        return {
+            'successful': len(self.successful),
+            'failed': len(self.failed),
+            'successfulImports': self.successful,
+            'failedImports': sorted(self.failed, key=lambda failure: failure['row'])
+        }
+
+
+def _parse_batch_id(value):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return False
+
+
+def _import_chunk(chunk, report, seen_phones, seen_emails, valid_batch_ids, default_batch_id, rounds):
+    """Validate, insert and enroll one chunk of (row_number, data) pairs"""
+    candidates = []
+    for row_number, data in chunk:
+        if not isinstance(data, dict) or not all(data.get(field) for field in REQUIRED_FIELDS):
+            report.fail(row_number, 'Missing required fields (firstName, lastName, phoneNumber)', data)
+            continue
+
+        phone_e164 = normalize_phone(data['phoneNumber'])
+        if not phone_e164:
+            report.fail(row_number, 'Invalid phone number format', data)
+            continue
+        if phone_e164 in seen_phones:
+            report.fail(row_number, 'Duplicate phone number in import', data)
+            continue
+
+        email = (data.get('email') or '').strip() or None
+        if email and email in seen_emails:
+            report.fail(row_number, 'Duplicate email in import', data)
+            continue
+
+        batch_id = _parse_batch_id(data.get('batchId'))
+        if batch_id is None:
+            batch_id = default_batch_id
+        if batch_id is False or (batch_id is not None and batch_id not in valid_batch_ids):
+            report.fail(row_number, 'Batch not found', data)
+            continue
+
+        guardian_phone = data.get('guardianPhone')
+        guardian_e164 = normalize_phone(guardian_phone) if guardian_phone else None
+        if guardian_phone and not guardian_e164:
+            report.fail(row_number, 'Invalid guardian phone number format', data)
+            continue
+
+        seen_phones.add(phone_e164)
+        if email:
+            seen_emails.add(email)
+        candidates.append((row_number, data, phone_e164, email, guardian_e164, batch_id))
+
+    if not candidates:
+        return
+
+    # One IN query per chunk for phones and emails already in the database
+    existing_phones = set(db.session.scalars(
+        select(User.phone_e164).where(User.phone_e164.in_([c[2] for c in candidates]))
+    ))
+    emails = [c[3] for c in candidates if c[3]]
+    existing_emails = set(db.session.scalars(
+        select(User.email).where(User.email.in_(emails))
+    )) if emails else set()
+
+    new_students = []
+    for candidate in candidates:
+        row_number, data, phone_e164, email, _, _ = candidate
+        if phone_e164 in existing_phones:
+            report.fail(row_number, 'Student with this phone number already exists', data)
+        elif email in existing_emails:
+            report.fail(row_number, 'Student with this email already exists', data)
+        else:
+            new_students.append(candidate)
+
+    if not new_students:
+        return
+
+    password_hashes = hash_passwords(
+        [generate_simple_unique_password(c[1]['firstName'], e164_to_local(c[2])) for c in new_students],
+        rounds=rounds
+    )
+
+    now = datetime.utcnow()
+    user_rows = []
+    for (row_number, data, phone_e164, email, guardian_e164, _), password_hash in zip(new_students, password_hashes):
+        user_rows.append({
+            'phoneNumber': e164_to_local(phone_e164),
+            'phone_e164': phone_e164,
+            'first_name': data['firstName'].strip(),
+            'last_name': data['lastName'].strip(),
+            'email': email,
+            'guardian_name': data.get('guardianName') or None,
+            'guardian_phone': e164_to_local(guardian_e164),
+            'guardian_phone_e164': guardian_e164,
+            'password_hash': password_hash,
+            'role': UserRole.STUDENT,
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now,
+        })
+
+    try:
+        db.session.execute(insert(User.__table__), user_rows)
+        ids_by_phone = dict(db.session.execute(
+            select(User.phone_e164, User.id).where(User.phone_e164.in_([c[2] for c in new_students]))
+        ).all())
+
+        enrollments = [
+            {'user_id': ids_by_phone[c[2]], 'batch_id': c[5], 'enrollment_date': now, 'is_active': True}
+            for c in new_students if c[5] is not None
+        ]
+        if enrollments:
+            db.session.execute(insert(user_batches), enrollments)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for row_number, data, *_ in new_students:
+            report.fail(row_number, f'Chunk insert failed: {e}', data)
+        return
+
+    for row_number, data, phone_e164, *_ in new_students:
+        user_id = ids_by_phone[phone_e164]
+        report.successful.append({
+            'row': row_number,
+            'studentId': data.get('studentId') or f"STU{now.year}{user_id:04d}",
+            'name': f"{data['firstName'].strip()} {data['lastName'].strip()}",
+            'phone': e164_to_local(phone_e164)
+        })
+
+
+def import_students(rows, default_batch_id=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import students from an iterable of row dicts
+    Each chunk is committed on its own, so the import is not all-or-nothing:
+    a failing chunk doesn't undo the rows imported before it. A row naming a
+    missing or archived batch fails instead of being imported unenrolled.
+    Rows without a studentId are reported as STU<year><user id>.
+    Returns a StudentImportReport.
+    """
+    report = StudentImportReport()
+    valid_batch_ids = set(db.session.scalars(select(Batch.id).where(Batch.is_archived == False)))
+    rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS)
+    seen_phones, seen_emails = set(), set()
+
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(chunk, report, seen_phones, seen_emails, valid_batch_ids, default_batch_id, rounds)
+        current_app.logger.info(
+            f"Student import: {len(report.successful)} imported, {len(report.failed)} failed after row {chunk[-1][0]}"
+        )
+
+    return report
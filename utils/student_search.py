@@ -0,0 +1,128 @@
+"""
+Student Search
+SQLite FTS5 index over student name, phone, guardian name/phone and student
+id, kept in sync with the users table by triggers, plus keyset-pagination
+cursors and sparse field selection for the student list.
+"""
+import base64
+import json
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = 'students_fts'
+
+# Indexed text for a users row, as SQL over the trigger's NEW/OLD alias.
+# Phones are indexed whole, without the trunk zero and by their last 4 digits
+# so prefix queries like "0171", "1712" or "5678" all match.
+def _phone_terms(column):
+    value = f'COALESCE({column}, \'\')'
+    return f"{value} || ' ' || substr({value}, 2) || ' ' || substr({value}, -4)"
+
+def _index_values(row):
+    return ', '.join([
+        f"{row}.id",
+        f"COALESCE({row}.first_name, '') || ' ' || COALESCE({row}.last_name, '')",
+        _phone_terms(f'{row}."phoneNumber"'),
+        f"COALESCE({row}.guardian_name, '')",
+        _phone_terms(f'{row}.guardian_phone'),
+        f"'STU' || strftime('%Y', {row}.created_at) || printf('%04d', {row}.id)",
+    ])
+
+FTS_COLUMNS = 'rowid, name, phone, guardian_name, guardian_phone, student_id'
+
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, phone, guardian_name, guardian_phone, student_id,
+        tokenize = "unicode61 remove_diacritics 2", prefix = '2 3 4'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users
+    WHEN new.role = 'STUDENT' BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_COLUMNS}) VALUES ({_index_values('new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF first_name, last_name, "phoneNumber", guardian_name, guardian_phone, role ON users BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} ({FTS_COLUMNS}) SELECT {_index_values('new')} WHERE new.role = 'STUDENT';
+    END""",
+    # Supports the keyset order of the student list
+    "CREATE INDEX IF NOT EXISTS ix_users_role_name ON users (role, first_name, last_name, id)",
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"INSERT INTO {FTS_TABLE} ({FTS_COLUMNS}) SELECT {_index_values('users')} FROM users WHERE role = 'STUDENT'",
+]
+
+MATCH_FILTER = f"users.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_match)"
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_PHONE_LIKE = re.compile(r'^\+?[\d\s-]+$')
+
+
+def ensure_student_search_index(engine):
+    """
+    Create the FTS table, triggers and list index if missing
+    The index is (re)built from the users table when it was just created.
+    Returns False when the database doesn't support FTS5.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first() is not None
+            for statement in SEARCH_INDEX_DDL:
+                connection.execute(text(statement))
+            if not exists:
+                rebuild_student_search_index(connection)
+    except OperationalError as e:
+        # e.g. "no such module: fts5" - search falls back to LIKE filters
+        print(f"⚠️  Student search index unavailable: {e}")
+        return False
+    return True
+
+
+def rebuild_student_search_index(connection):
+    """Re-index every student"""
+    for statement in REBUILD_SQL:
+        connection.execute(text(statement))
+
+
+def build_match_query(search):
+    """
+    Turn free text into an FTS5 query: every word must prefix-match
+    Returns None when the text has no searchable words.
+    """
+    search = (search or '').strip()
+    if _PHONE_LIKE.match(search):
+        # "+880 1712-345" is one phone prefix, not three words
+        search = re.sub(r'\D', '', search)
+
+    terms = []
+    for token in _TOKEN.findall(search):
+        if token.isdigit() and token.startswith('880') and len(token) > 3:
+            token = '0' + token[3:]  # +880 1712... is stored as 01712...
+        terms.append('"' + token.replace('"', '""') + '"*')
+    return ' '.join(terms) or None
+
+
+def encode_cursor(values):
+    """Opaque keyset cursor for the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed cursors"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values